@@ -1,3 +1,4 @@
+import io
 import sys
 import os
 
@@ -7,9 +8,7 @@ sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', '..'))
 from api.index import app
 
 def handler(event, context):
-    from werkzeug.wrappers import Request, Response
-    from werkzeug.serving import WSGIRequestHandler
-    import io
+    # Called per invocation, so everything it needs is imported once above
     
     # Convert Netlify event to WSGI environ
     environ = {
@@ -17,8 +16,8 @@ def handler(event, context):
         'PATH_INFO': event.get('path', '/'),
         'QUERY_STRING': event.get('queryStringParameters', ''),
         'CONTENT_TYPE': event.get('headers', {}).get('content-type', ''),
-        'CONTENT_LENGTH': str(len(event.get('body', ''))),
-        'wsgi.input': io.StringIO(event.get('body', '')),
+        'CONTENT_LENGTH': str(len((event.get('body') or '').encode())),
+        'wsgi.input': io.BytesIO((event.get('body') or '').encode()),
         'wsgi.errors': sys.stderr,
         'wsgi.version': (1, 0),
         'wsgi.multithread': False,
@@ -1,23 +1,175 @@
-from flask import Flask, render_template, request, redirect, url_for, flash, session
+from flask import Flask, render_template, request, redirect, url_for, flash, session, g, abort, jsonify, Response, stream_with_context, get_template_attribute, make_response
 from flask_login import LoginManager, UserMixin, login_user, logout_user, login_required, current_user
-from werkzeug.security import check_password_hash
-from datetime import datetime, timedelta
-import sqlite3
+from datetime import timedelta
+import hmac
 import os
+import time
+
+from db import pool_stats
+import timestamps
+from pagination import get_page_args
+from repository import get_repository
+from user_cache import user_cache
+import hashing
+import metrics
+import sql_instrumentation
+import pass_tokens
+import change_feed
+import template_cache
+import data_versions
+import fragment_cache
 
 app = Flask(__name__)
 app.secret_key = os.environ.get('SESSION_SECRET', 'dev-secret-key')
+# Each worker loads compiled templates instead of compiling them on first render
+template_cache.install(app)
 
 login_manager = LoginManager()
 login_manager.init_app(app)
 login_manager.login_view = 'login'  # type: ignore
 
-def get_db_connection():
-    # Use SQLite for easier development setup
-    db_path = os.environ.get('DATABASE_PATH', 'gatepass.db')
-    conn = sqlite3.connect(db_path)
-    # Don't use row_factory here to maintain compatibility with existing index-based access
-    return conn
+# STORAGE_BACKEND: SQLite (migrated in place here) or the in-memory store
+get_repository()
+
+@app.before_request
+def start_background_tasks():
+    get_repository().start_background_tasks()
+
+@app.before_request
+def start_sql_stats():
+    g.request_started = time.perf_counter()
+    g.sql_stats = sql_instrumentation.start_request()
+
+@app.after_request
+def add_sql_timing(response):
+    stats = sql_instrumentation.finish_request()
+    started = g.get('request_started')
+    if stats is not None and started is not None:
+        total_ms = (time.perf_counter() - started) * 1000
+        response.headers.add('Server-Timing', stats.server_timing())
+        response.headers.add('Server-Timing', f'app;dur={total_ms:.1f}')
+        if sql_instrumentation.LOG_REQUESTS:
+            print(f"{request.method} {request.path} {response.status_code} "
+                  f"{total_ms:.1f} ms: {stats.summary()}")
+    return response
+
+# Process-local totals (cache, pool) are copied into the shared metric files
+# at most this often per worker, and always before /metrics is rendered
+METRICS_SYNC_SECONDS = float(os.environ.get('METRICS_SYNC_SECONDS', 1))
+
+@app.after_request
+def record_request_metrics(response):
+    started = g.get('request_started')
+    if started is None:
+        return response
+    elapsed = time.perf_counter() - started
+    labels = {
+        # Unmatched URLs share one label so 404 scans can't blow up cardinality
+        'endpoint': request.endpoint or 'unmatched',
+        'method': request.method,
+        'status': str(response.status_code),
+        'role': current_user.role if current_user.is_authenticated else 'anonymous',
+    }
+    metrics.counter('http_requests_total', 'Requests handled', **labels).inc()
+    metrics.histogram('http_request_duration_seconds', 'Request latency', **labels).observe(elapsed)
+    stats = g.get('sql_stats')
+    if stats is not None:
+        metrics.histogram('http_request_db_seconds', 'SQL time per request',
+                          endpoint=labels['endpoint']).observe(stats.seconds)
+        metrics.counter('db_statements_total', 'SQL statements executed by requests',
+                        endpoint=labels['endpoint']).inc(stats.statements)
+    metrics.sync(max_age=METRICS_SYNC_SECONDS)
+    return response
+
+def collect_process_metrics():
+    cache = user_cache.stats()
+    metrics.counter('user_cache_hits_total', 'User cache hits').set_total(cache['hits'])
+    metrics.counter('user_cache_misses_total', 'User cache misses').set_total(cache['misses'])
+    tables = fragment_cache.dashboard_tables.stats()
+    metrics.counter('fragment_cache_hits_total', 'Dashboard table cache hits').set_total(tables['hits'])
+    metrics.counter('fragment_cache_misses_total', 'Dashboard table cache misses').set_total(tables['misses'])
+    metrics.counter('fragment_cache_evictions_total', 'Dashboard tables evicted to stay under FRAGMENT_CACHE_BYTES').set_total(tables['evictions'])
+    metrics.counter('fragment_cache_coalesced_total', 'Dashboard table misses that waited on another request\'s render').set_total(tables['coalesced'])
+    pool = pool_stats()
+    if pool:
+        metrics.counter('db_pool_checkouts_total', 'Connections checked out of the pool').set_total(pool['checkouts'])
+        metrics.counter('db_pool_waits_total', 'Checkouts that had to wait for a connection').set_total(pool['waits'])
+        metrics.counter('db_pool_wait_seconds_total', 'Time spent waiting for a pooled connection').set_total(pool['wait_seconds'])
+
+def user_cache_hit_ratio(total):
+    lookups = total('user_cache_hits_total') + total('user_cache_misses_total')
+    return total('user_cache_hits_total') / lookups if lookups else 0.0
+
+def students_out(total):
+    # Read from the trigger-maintained counters, so every worker agrees
+    return get_repository().counts('security')['checkin']
+
+metrics.add_collector(collect_process_metrics)
+metrics.gauge_callback('user_cache_hit_ratio', 'User cache hit ratio across workers', user_cache_hit_ratio)
+metrics.gauge_callback('students_out', "Approved gatepasses with security_guard_status 'Out'", students_out)
+
+@app.route('/metrics')
+def metrics_endpoint():
+    # Role and request volumes aren't public: off unless a scrape token is configured
+    token = os.environ.get('METRICS_TOKEN')
+    if not token:
+        abort(404)
+    if not hmac.compare_digest(request.headers.get('Authorization', '').encode(), f'Bearer {token}'.encode()):
+        abort(403)
+    metrics.sync()
+    return metrics.render(), 200, {'Content-Type': 'text/plain; version=0.0.4; charset=utf-8'}
+
+# Routes that hash passwords; their latency is recorded split into hash time
+# and everything else so a saturated hashing pool shows up on its own
+AUTH_ENDPOINTS = ('login', 'register', 'approve_registration')
+
+@app.before_request
+def start_auth_timer():
+    if request.endpoint in AUTH_ENDPOINTS:
+        hashing.service.take_thread_hash_time()
+        g.auth_started = time.perf_counter()
+
+@app.after_request
+def record_auth_timing(response):
+    started = g.pop('auth_started', None)
+    if started is not None:
+        total = time.perf_counter() - started
+        hash_seconds = hashing.service.take_thread_hash_time()
+        metrics.histogram('auth_request_hash_seconds', 'Password hashing time per auth request',
+                          endpoint=request.endpoint).observe(hash_seconds)
+        metrics.histogram('auth_request_other_seconds', 'Non-hashing time per auth request',
+                          endpoint=request.endpoint).observe(max(total - hash_seconds, 0.0))
+    return response
+
+def dashboard_etag(versions):
+    """
+    Weak ETag for the current user's view of a dashboard page
+
+    Built from the user, the URL (filter and page) and the data_versions of
+    the scopes the page shows, so it can be checked before the page's own
+    queries run.
+
+    Args:
+        versions: Repository.versions() for the scopes the page shows
+
+    Returns:
+        str: The ETag, or None if the page must be rendered (flashed messages pending)
+    """
+    if session.get('_flashes'):
+        return None
+    return data_versions.make_etag(current_user.role, current_user.id, current_user.name,
+                                   request.full_path, versions)
+
+def not_modified(etag):
+    """True if the client already has the page for this ETag"""
+    return etag is not None and request.if_none_match.contains_weak(etag)
+
+def cacheable(response, etag):
+    # Per-user pages the browser must revalidate before every reuse
+    response.headers['Cache-Control'] = 'private, no-cache'
+    if etag is not None:
+        response.set_etag(etag, weak=True)
+    return response
 
 class User(UserMixin):
     def __init__(self, user_id, name, role):
@@ -28,31 +180,23 @@ class User(UserMixin):
 @login_manager.user_loader
 def load_user(user_id):
     role = session.get('user_role')
-    if not role:
-        return None
-    
-    conn = get_db_connection()
-    cur = conn.cursor()
-    
-    if role == 'student':
-        cur.execute('SELECT student_id, name FROM students WHERE student_id = ?', (user_id,))
-    elif role == 'parent':
-        cur.execute('SELECT parent_id, name FROM parents WHERE parent_id = ?', (user_id,))
-    elif role == 'warden':
-        cur.execute('SELECT warden_id, name FROM wardens WHERE warden_id = ?', (user_id,))
-    elif role == 'security':
-        cur.execute('SELECT guard_id, name FROM security_guards WHERE guard_id = ?', (user_id,))
-    else:
+    if role not in ('student', 'parent', 'warden', 'security'):
         return None
     
-    user_data = cur.fetchone()
-    cur.close()
-    conn.close()
+    # Served from the per-process cache on most requests; entries are dropped
+    # on approval/deactivation and otherwise expire after USER_CACHE_TTL
+    user = user_cache.get((role, user_id))
+    if user is not None:
+        return user
     
+    user_data = get_repository().get_user(role, user_id)
     if user_data:
-        return User(user_data[0], user_data[1], role)
+        user = User(user_data[0], user_data[1], role)
+        user_cache.set((role, user_id), user)
+        return user
     return None
 
+@app.route('/dashboard')
 @app.route('/')
 def index():
     if current_user.is_authenticated:
@@ -73,27 +217,21 @@ def login():
         password = request.form['password']
         role = request.form['role']
         
-        conn = get_db_connection()
-        cur = conn.cursor()
-        
-        if role == 'student':
-            cur.execute('SELECT student_id, name, password_hash FROM students WHERE student_id = ?', (user_id,))
-        elif role == 'parent':
-            cur.execute('SELECT parent_id, name, password_hash FROM parents WHERE parent_id = ?', (user_id,))
-        elif role == 'warden':
-            cur.execute('SELECT warden_id, name, password_hash FROM wardens WHERE warden_id = ?', (user_id,))
-        elif role == 'security':
-            cur.execute('SELECT guard_id, name, password_hash FROM security_guards WHERE guard_id = ?', (user_id,))
-        else:
+        if role not in ('student', 'parent', 'warden', 'security'):
             flash('Invalid role selected')
             return redirect(url_for('login'))
         
-        user_data = cur.fetchone()
-        cur.close()
-        conn.close()
+        user_data = get_repository().get_login(role, user_id)
+        
+        try:
+            valid = user_data is not None and hashing.verify_password(user_data[2], password)
+        except hashing.HashingBusy:
+            flash('Server is busy, please try again in a moment')
+            return render_template('login.html'), 503
         
-        if user_data and check_password_hash(user_data[2], password):
+        if valid:
             user = User(user_data[0], user_data[1], role)
+            user_cache.set((role, user.id), user)
             session['user_role'] = role
             login_user(user)
             return redirect(url_for('index'))
@@ -111,9 +249,6 @@ def logout():
 
 @app.route('/register', methods=['POST'])
 def register():
-    # Import registration function
-    from user_registration import register_new_user
-    
     # Get common fields
     user_type = request.form.get('user_type')
     name = request.form.get('name')
@@ -148,7 +283,7 @@ def register():
     
     # Register the user
     try:
-        result = register_new_user(user_type, name, email, phone, password, **kwargs)
+        result = get_repository().register_user(user_type, name, email, phone, password, **kwargs)
         
         if result['success']:
             flash(f"Registration successful! Your User ID is: {result['proposed_user_id']}", 'success')
@@ -169,65 +304,25 @@ def student_dashboard(filter_type='all'):
         flash('Access denied')
         return redirect(url_for('index'))
     
-    conn = get_db_connection()
-    cur = conn.cursor()
-    
-    # Build query based on filter type
-    base_query = '''
-        SELECT request_id, date_time_out, duration_hours, destination, purpose, 
-               parent_approval_status, created_at, expiry_timestamp, warden_status, security_guard_status
-        FROM gatepass_requests
-        WHERE student_id = ?
-    '''
-    
-    if filter_type == 'pending':
-        base_query += " AND parent_approval_status = 'Pending'"
-    elif filter_type == 'history':
-        base_query += " AND parent_approval_status IN ('Approved', 'Rejected', 'Expired')"
-    # 'all' shows everything (no additional filter)
-    
-    base_query += " ORDER BY created_at DESC"
-    
-    cur.execute(base_query, (current_user.id,))
-    raw_requests = cur.fetchall()
-    
-    # Format the requests to handle datetime properly
-    requests = []
-    for req in raw_requests:
-        formatted_req = list(req)
-        # Format the date_time_out (index 1) if it exists
-        if req[1]:
-            try:
-                if isinstance(req[1], str):
-                    dt = datetime.fromisoformat(req[1].replace('Z', '+00:00'))
-                else:
-                    dt = req[1]
-                formatted_req[1] = dt.strftime('%d %b, %I:%M %p')
-            except:
-                formatted_req[1] = str(req[1])
-        requests.append(tuple(formatted_req))
-    
-    # Get counts for each filter
-    cur.execute("SELECT COUNT(*) FROM gatepass_requests WHERE student_id = ?", (current_user.id,))
-    all_count = cur.fetchone()[0]
+    repo = get_repository()
     
-    cur.execute("SELECT COUNT(*) FROM gatepass_requests WHERE student_id = ? AND parent_approval_status = 'Pending'", (current_user.id,))
-    pending_count = cur.fetchone()[0]
+    etag = dashboard_etag(repo.versions([('student', current_user.id)]))
+    if not_modified(etag):
+        return cacheable(Response(status=304), etag)
     
-    cur.execute("SELECT COUNT(*) FROM gatepass_requests WHERE student_id = ? AND parent_approval_status IN ('Approved', 'Rejected', 'Expired')", (current_user.id,))
-    history_count = cur.fetchone()[0]
+    # Fetch one page, newest first ('all' if filter_type is unknown)
+    after, before, page_size = get_page_args(request.args)
+    page = repo.list_gatepasses('student', current_user.id, filter_type, after, before, page_size)
+    requests = page.rows
     
-    cur.close()
-    conn.close()
+    # Get counts for each filter
+    counts = repo.counts('student', current_user.id)
     
-    return render_template('student_dashboard.html', 
+    return cacheable(make_response(render_template('student_dashboard.html', 
                          requests=requests, 
                          current_filter=filter_type,
-                         counts={
-                             'all': all_count,
-                             'pending': pending_count,
-                             'history': history_count
-                         })
+                         page=page,
+                         counts=counts)), etag)
 
 @app.route('/student/apply', methods=['GET', 'POST'])
 @login_required
@@ -237,60 +332,40 @@ def apply_gatepass():
         return redirect(url_for('index'))
     
     if request.method == 'POST':
-        date_time_out = request.form['date_time_out']
+        try:
+            date_time_out = timestamps.parse_local(request.form['date_time_out'])
+        except ValueError:
+            flash('Error: Please enter a valid date and time.')
+            return redirect(url_for('apply_gatepass'))
         duration_hours = int(request.form['duration_hours'])
         destination = request.form['destination']
         purpose = request.form['purpose']
         parent_email = request.form['parent_email']
         
-        conn = get_db_connection()
-        cur = conn.cursor()
+        repo = get_repository()
         
-        # Validate that the parent email exists in the parents table
-        cur.execute('SELECT parent_id, name FROM parents WHERE email = ?', (parent_email,))
-        parent = cur.fetchone()
+        # Validate that the parent email belongs to an active parent account
+        parent = repo.active_parent_by_email(parent_email)
         
         if not parent:
             flash('Error: Parent email not found in the system. Please contact administration to register the parent.')
-            cur.close()
-            conn.close()
             return render_template('apply_gatepass.html')
         
-        created_at = datetime.now()
+        created_at = timestamps.now()
         expiry_timestamp = created_at + timedelta(hours=1)
         
-        cur.execute('''
-            INSERT INTO gatepass_requests 
-            (student_id, parent_email, date_time_out, duration_hours, destination, purpose, created_at, expiry_timestamp)
-            VALUES (?, ?, ?, ?, ?, ?, ?, ?)
-        ''', (current_user.id, parent_email, date_time_out, duration_hours, destination, purpose, created_at, expiry_timestamp))
-        
-        conn.commit()
-        cur.close()
-        conn.close()
+        # Unanswered requests are expired after expiry_timestamp by the backend
+        repo.create_gatepass(current_user.id, parent_email, date_time_out, duration_hours, destination, purpose,
+                             created_at, expiry_timestamp)
         
         flash(f'Gatepass request submitted successfully! Notification sent to {parent[1]} ({parent_email})')
         return redirect(url_for('student_dashboard'))
     
-    # Get the parent email for the logged-in student
-    conn = get_db_connection()
-    cur = conn.cursor()
-    
-    # Get parent info for current student
-    cur.execute('''
-        SELECT p.email, p.name 
-        FROM parents p 
-        JOIN student_parent_links spl ON p.parent_id = spl.parent_id 
-        WHERE spl.student_id = ?
-    ''', (current_user.id,))
-    
-    student_parent = cur.fetchone()
+    # Get parent info for the logged-in student
+    student_parent = get_repository().student_parent(current_user.id)
     parent_email = student_parent[0] if student_parent else ''
     parent_name = student_parent[1] if student_parent else ''
     
-    cur.close()
-    conn.close()
-    
     return render_template('apply_gatepass.html', 
                          parent_email=parent_email, 
                          parent_name=parent_name)
@@ -303,86 +378,32 @@ def parent_dashboard(filter_type='all'):
         flash('Access denied')
         return redirect(url_for('index'))
     
-    conn = get_db_connection()
-    cur = conn.cursor()
+    repo = get_repository()
     
-    cur.execute('SELECT email FROM parents WHERE parent_id = ?', (current_user.id,))
-    parent_result = cur.fetchone()
-    if not parent_result:
+    parent_email = repo.parent_email(current_user.id)
+    if not parent_email:
         flash('Parent email not found')
-        cur.close()
-        conn.close()
         return redirect(url_for('login'))
     
-    parent_email = parent_result[0]
-    now = datetime.now()
-    
-    cur.execute('''
-        UPDATE gatepass_requests
-        SET parent_approval_status = 'Expired'
-        WHERE parent_email = ? 
-        AND parent_approval_status = 'Pending'
-        AND datetime(created_at, '+1 hour') < ?
-    ''', (parent_email, now))
-    
-    # Build query based on filter type
-    base_query = '''
-        SELECT r.request_id, s.name, s.student_id, r.date_time_out, r.duration_hours, 
-               r.destination, r.purpose, r.parent_approval_status, r.created_at, r.expiry_timestamp
-        FROM gatepass_requests r
-        JOIN students s ON r.student_id = s.student_id
-        WHERE r.parent_email = ?
-    '''
-    
-    if filter_type == 'pending':
-        base_query += " AND r.parent_approval_status = 'Pending'"
-    elif filter_type == 'history':
-        base_query += " AND r.parent_approval_status IN ('Approved', 'Rejected', 'Expired')"
-    # 'all' shows everything (no additional filter)
-    
-    base_query += " ORDER BY r.created_at DESC"
-    
-    cur.execute(base_query, (parent_email,))
-    raw_requests = cur.fetchall()
-    
-    # Format the requests to handle datetime properly
-    requests = []
-    for req in raw_requests:
-        formatted_req = list(req)
-        # Format the date_time_out (index 3) if it exists
-        if req[3]:
-            try:
-                if isinstance(req[3], str):
-                    dt = datetime.fromisoformat(req[3].replace('Z', '+00:00'))
-                else:
-                    dt = req[3]
-                formatted_req[3] = dt.strftime('%d %b, %I:%M %p')
-            except:
-                formatted_req[3] = str(req[3])
-        requests.append(tuple(formatted_req))
-    
-    # Get counts for each filter
-    cur.execute("SELECT COUNT(*) FROM gatepass_requests WHERE parent_email = ?", (parent_email,))
-    all_count = cur.fetchone()[0]
+    etag = dashboard_etag(repo.versions([('parent', parent_email)]))
+    if not_modified(etag):
+        return cacheable(Response(status=304), etag)
     
-    cur.execute("SELECT COUNT(*) FROM gatepass_requests WHERE parent_email = ? AND parent_approval_status = 'Pending'", (parent_email,))
-    pending_count = cur.fetchone()[0]
+    # Unanswered requests are expired by the backend (expiry.py for SQLite)
     
-    cur.execute("SELECT COUNT(*) FROM gatepass_requests WHERE parent_email = ? AND parent_approval_status IN ('Approved', 'Rejected', 'Expired')", (parent_email,))
-    history_count = cur.fetchone()[0]
+    # Fetch one page, newest first ('all' if filter_type is unknown)
+    after, before, page_size = get_page_args(request.args)
+    page = repo.list_gatepasses('parent', parent_email, filter_type, after, before, page_size)
+    requests = page.rows
     
-    conn.commit()
-    cur.close()
-    conn.close()
+    # Get counts for each filter
+    counts = repo.counts('parent', parent_email)
     
-    return render_template('parent_dashboard.html', 
+    return cacheable(make_response(render_template('parent_dashboard.html', 
                          requests=requests, 
                          current_filter=filter_type,
-                         counts={
-                             'all': all_count,
-                             'pending': pending_count,
-                             'history': history_count
-                         })
+                         page=page,
+                         counts=counts)), etag)
 
 @app.route('/parent/approve/<int:request_id>')
 @app.route('/parent/approve/<int:request_id>/<filter_type>')
@@ -392,24 +413,10 @@ def approve_request(request_id, filter_type='all'):
         flash('Access denied')
         return redirect(url_for('index'))
     
-    conn = get_db_connection()
-    cur = conn.cursor()
-    
-    cur.execute('SELECT email FROM parents WHERE parent_id = ?', (current_user.id,))
-    parent_result = cur.fetchone()
-    parent_email = parent_result[0] if parent_result else None
+    repo = get_repository()
+    result = repo.transition('approve', request_id, owner=repo.parent_email(current_user.id))
     
-    cur.execute('''
-        UPDATE gatepass_requests
-        SET parent_approval_status = 'Approved', parent_approval_timestamp = ?
-        WHERE request_id = ? AND parent_email = ? AND parent_approval_status = 'Pending'
-    ''', (datetime.now(), request_id, parent_email))
-    
-    conn.commit()
-    cur.close()
-    conn.close()
-    
-    flash('Request approved successfully!')
+    flash('Request approved successfully!' if result['success'] else result['error'])
     return redirect(url_for('parent_dashboard', filter_type=filter_type))
 
 @app.route('/parent/reject/<int:request_id>')
@@ -420,24 +427,10 @@ def reject_request(request_id, filter_type='all'):
         flash('Access denied')
         return redirect(url_for('index'))
     
-    conn = get_db_connection()
-    cur = conn.cursor()
-    
-    cur.execute('SELECT email FROM parents WHERE parent_id = ?', (current_user.id,))
-    parent_result = cur.fetchone()
-    parent_email = parent_result[0] if parent_result else None
+    repo = get_repository()
+    result = repo.transition('reject', request_id, owner=repo.parent_email(current_user.id))
     
-    cur.execute('''
-        UPDATE gatepass_requests
-        SET parent_approval_status = 'Rejected', parent_approval_timestamp = ?
-        WHERE request_id = ? AND parent_email = ? AND parent_approval_status = 'Pending'
-    ''', (datetime.now(), request_id, parent_email))
-    
-    conn.commit()
-    cur.close()
-    conn.close()
-    
-    flash('Request rejected successfully!')
+    flash('Request rejected successfully!' if result['success'] else result['error'])
     return redirect(url_for('parent_dashboard', filter_type=filter_type))
 
 @app.route('/warden/dashboard')
@@ -448,71 +441,42 @@ def warden_dashboard(filter_type='all'):
         flash('Access denied')
         return redirect(url_for('index'))
     
-    conn = get_db_connection()
-    cur = conn.cursor()
-    
-    # Build query based on filter type
-    base_query = '''
-        SELECT r.request_id, s.name, s.student_id, r.date_time_out, r.duration_hours, 
-               r.destination, r.purpose, r.parent_approval_status, r.warden_status, r.security_guard_status
-        FROM gatepass_requests r
-        JOIN students s ON r.student_id = s.student_id
-        WHERE r.parent_approval_status = 'Approved'
-    '''
-    
-    if filter_type == 'pending':
-        base_query += " AND r.warden_status = 'Open'"
-    elif filter_type == 'history':
-        base_query += " AND r.warden_status = 'Closed'"
-    # 'all' shows everything (no additional filter for approved requests)
-    
-    base_query += " ORDER BY r.date_time_out DESC"
-    
-    cur.execute(base_query, ())
-    raw_requests = cur.fetchall()
-    
-    # Format the requests to handle datetime properly
-    requests = []
-    for req in raw_requests:
-        formatted_req = list(req)
-        # Format the date_time_out (index 3) if it exists
-        if req[3]:
-            try:
-                if isinstance(req[3], str):
-                    dt = datetime.fromisoformat(req[3].replace('Z', '+00:00'))
-                else:
-                    dt = req[3]
-                formatted_req[3] = dt.strftime('%d %b, %I:%M %p')
-            except:
-                formatted_req[3] = str(req[3])
-        requests.append(tuple(formatted_req))
-    
-    # Get counts for each filter
-    cur.execute("SELECT COUNT(*) FROM gatepass_requests WHERE parent_approval_status = 'Approved'", ())
-    all_count = cur.fetchone()[0]
+    versions = get_repository().versions([('approved', ''), ('registrations', '')])
+    etag = dashboard_etag(versions)
+    if not_modified(etag):
+        return cacheable(Response(status=304), etag)
+    
+    # Every warden sees the same table, so it's rendered once per data version,
+    # and wardens asking for it at the same moment wait on a single render
+    after, before, page_size = get_page_args(request.args)
+    view = fragment_cache.dashboard_tables.get_or_render(
+        ('warden_dashboard', filter_type, after, before, page_size), versions,
+        lambda: render_warden_view(filter_type, after, before, page_size),
+        label='warden_dashboard')
+    
+    return cacheable(make_response(render_template('warden_dashboard.html', 
+                         table=view['table'],
+                         current_filter=filter_type,
+                         counts=view['counts'],
+                         pending_count=view['pending_count'],
+                         stream_url=dashboard_stream_url('warden', filter_type))), etag)
+
+def render_warden_view(filter_type, after, before, page_size):
+    """Query and render the warden dashboard table, badge counts and registrations count"""
+    repo = get_repository()
     
-    cur.execute("SELECT COUNT(*) FROM gatepass_requests WHERE parent_approval_status = 'Approved' AND warden_status = 'Open'", ())
-    pending_count = cur.fetchone()[0]
+    # Fetch one page of approved requests, latest departures first
+    page = repo.list_gatepasses('warden', None, filter_type, after, before, page_size)
     
-    cur.execute("SELECT COUNT(*) FROM gatepass_requests WHERE parent_approval_status = 'Approved' AND warden_status = 'Closed'", ())
-    history_count = cur.fetchone()[0]
+    # Get counts for each filter
+    counts = repo.counts('warden')
     
     # Get pending registrations count
-    cur.execute("SELECT COUNT(*) FROM pending_registrations WHERE status = 'pending'", ())
-    pending_reg_count = cur.fetchone()[0]
-    
-    cur.close()
-    conn.close()
+    pending_reg_count = repo.pending_registration_count()
     
-    return render_template('warden_dashboard.html', 
-                         requests=requests, 
-                         current_filter=filter_type,
-                         counts={
-                             'all': all_count,
-                             'pending': pending_count,
-                             'history': history_count
-                         },
-                         pending_count=pending_reg_count)
+    warden_table = get_template_attribute('_gatepass_rows.html', 'warden_table')
+    return {'table': warden_table(page.rows, page, filter_type), 'counts': counts,
+            'pending_count': pending_reg_count}
 
 @app.route('/warden/close/<int:request_id>')
 @app.route('/warden/close/<int:request_id>/<filter_type>')
@@ -522,20 +486,8 @@ def close_request(request_id, filter_type='all'):
         flash('Access denied')
         return redirect(url_for('index'))
     
-    conn = get_db_connection()
-    cur = conn.cursor()
-    
-    cur.execute('''
-        UPDATE gatepass_requests
-        SET warden_status = 'Closed'
-        WHERE request_id = ?
-    ''', (request_id,))
-    
-    conn.commit()
-    cur.close()
-    conn.close()
-    
-    flash('Request closed successfully!')
+    result = get_repository().transition('close', request_id)
+    flash('Request closed successfully!' if result['success'] else result['error'])
     return redirect(url_for('warden_dashboard', filter_type=filter_type))
 
 @app.route('/warden/pending-registrations')
@@ -545,8 +497,7 @@ def pending_registrations():
         flash('Access denied')
         return redirect(url_for('index'))
     
-    from user_registration import get_pending_registrations
-    registrations = get_pending_registrations()
+    registrations = get_repository().pending_registrations()
     
     return render_template('pending_registrations.html', registrations=registrations)
 
@@ -557,8 +508,7 @@ def approve_registration(registration_id):
         flash('Access denied')
         return redirect(url_for('index'))
     
-    from user_registration import approve_registration as approve_reg
-    result = approve_reg(registration_id, current_user.id)
+    result = get_repository().approve_registration(registration_id, current_user.id)
     
     if result['success']:
         flash(result['message'], 'success')
@@ -574,9 +524,8 @@ def reject_registration(registration_id):
         flash('Access denied')
         return redirect(url_for('index'))
     
-    from user_registration import reject_registration as reject_reg
     reason = request.form.get('reason', 'No reason provided')
-    result = reject_reg(registration_id, current_user.id, reason)
+    result = get_repository().reject_registration(registration_id, current_user.id, reason)
     
     if result['success']:
         flash(result['message'], 'success')
@@ -585,6 +534,44 @@ def reject_registration(registration_id):
     
     return redirect(url_for('pending_registrations'))
 
+@app.route('/warden/registrations/batch', methods=['POST'])
+@login_required
+def batch_registrations():
+    if current_user.role != 'warden':
+        flash('Access denied')
+        return redirect(url_for('index'))
+    
+    repo = get_repository()
+    registration_ids = request.form.getlist('registration_ids', type=int)
+    action = request.form.get('action')
+    
+    if not registration_ids:
+        flash('Select at least one registration', 'danger')
+        return redirect(url_for('pending_registrations'))
+    
+    if action == 'approve':
+        result = repo.approve_registrations(registration_ids, current_user.id)
+        done, verb = result.get('approved', 0), 'approved'
+    elif action == 'reject':
+        reason = request.form.get('reason') or 'No reason provided'
+        result = repo.reject_registrations(registration_ids, current_user.id, reason)
+        done, verb = result.get('rejected', 0), 'rejected'
+    else:
+        flash('Invalid action', 'danger')
+        return redirect(url_for('pending_registrations'))
+    
+    if not result['success']:
+        flash(result['error'], 'danger')
+        return redirect(url_for('pending_registrations'))
+    
+    if done:
+        flash(f"{done} registration{'s' if done != 1 else ''} {verb}", 'success')
+    for item in result['results']:
+        if not item['success']:
+            flash(f"#{item['registration_id']}: {item['error']}", 'danger')
+    
+    return redirect(url_for('pending_registrations'))
+
 @app.route('/security/dashboard')
 @app.route('/security/dashboard/<filter_type>')
 @login_required
@@ -593,72 +580,39 @@ def security_dashboard(filter_type='all'):
         flash('Access denied')
         return redirect(url_for('index'))
     
-    conn = get_db_connection()
-    cur = conn.cursor()
-    
-    # Build query based on filter type
-    base_query = '''
-        SELECT r.request_id, s.name, s.student_id, r.date_time_out, r.duration_hours, 
-               r.destination, r.purpose, r.parent_approval_status, r.warden_status, r.security_guard_status
-        FROM gatepass_requests r
-        JOIN students s ON r.student_id = s.student_id
-        WHERE r.parent_approval_status = 'Approved'
-    '''
-    
-    if filter_type == 'checkout':
-        base_query += " AND r.security_guard_status = 'Pending'"
-    elif filter_type == 'checkin':
-        base_query += " AND r.security_guard_status = 'Out'"
-    elif filter_type == 'completed':
-        base_query += " AND r.security_guard_status = 'In'"
-    # 'all' shows everything (no additional filter)
-    
-    base_query += " ORDER BY r.date_time_out DESC"
-    
-    cur.execute(base_query, ())
-    raw_requests = cur.fetchall()
-    
-    # Format the requests to handle datetime properly
-    requests = []
-    for req in raw_requests:
-        formatted_req = list(req)
-        # Format the date_time_out (index 3) if it exists
-        if req[3]:
-            try:
-                if isinstance(req[3], str):
-                    dt = datetime.fromisoformat(req[3].replace('Z', '+00:00'))
-                else:
-                    dt = req[3]
-                formatted_req[3] = dt.strftime('%d %b, %I:%M %p')
-            except:
-                formatted_req[3] = str(req[3])
-        requests.append(tuple(formatted_req))
-    
-    # Get counts for each filter
-    cur.execute("SELECT COUNT(*) FROM gatepass_requests r WHERE r.parent_approval_status = 'Approved'", ())
-    all_count = cur.fetchone()[0]
-    
-    cur.execute("SELECT COUNT(*) FROM gatepass_requests r WHERE r.parent_approval_status = 'Approved' AND r.security_guard_status = 'Pending'", ())
-    checkout_count = cur.fetchone()[0]
-    
-    cur.execute("SELECT COUNT(*) FROM gatepass_requests r WHERE r.parent_approval_status = 'Approved' AND r.security_guard_status = 'Out'", ())
-    checkin_count = cur.fetchone()[0]
+    versions = get_repository().versions([('approved', '')])
+    etag = dashboard_etag(versions)
+    if not_modified(etag):
+        return cacheable(Response(status=304), etag)
+    
+    # Every guard sees the same table, so it's rendered once per data version,
+    # and guards asking for it at the same moment wait on a single render
+    after, before, page_size = get_page_args(request.args)
+    view = fragment_cache.dashboard_tables.get_or_render(
+        ('security_dashboard', filter_type, after, before, page_size), versions,
+        lambda: render_security_view(filter_type, after, before, page_size),
+        label='security_dashboard')
+    
+    return cacheable(make_response(render_template('security_dashboard.html', 
+                         table=view['table'],
+                         current_filter=filter_type,
+                         counts=view['counts'],
+                         stream_url=dashboard_stream_url('security', filter_type))), etag)
+
+def render_security_view(filter_type, after, before, page_size):
+    """Query and render the security dashboard table and badge counts"""
+    repo = get_repository()
     
-    cur.execute("SELECT COUNT(*) FROM gatepass_requests r WHERE r.parent_approval_status = 'Approved' AND r.security_guard_status = 'In'", ())
-    completed_count = cur.fetchone()[0]
+    # Fetch one page of approved requests, latest departures first
+    page = repo.list_gatepasses('security', None, filter_type, after, before, page_size)
     
-    cur.close()
-    conn.close()
+    # Get counts for each filter
+    counts = repo.counts('security')
     
-    return render_template('security_dashboard.html', 
-                         requests=requests, 
-                         current_filter=filter_type,
-                         counts={
-                             'all': all_count,
-                             'checkout': checkout_count,
-                             'checkin': checkin_count,
-                             'completed': completed_count
-                         })
+    security_table = get_template_attribute('_gatepass_rows.html', 'security_table')
+    # Unknown filters list everything (repository.view_filter), so count everything too
+    total = counts.get(filter_type, counts['all'])
+    return {'table': security_table(page.rows, page, filter_type, total=total), 'counts': counts}
 
 @app.route('/security/search', methods=['POST'])
 @login_required
@@ -669,48 +623,23 @@ def security_search():
     
     student_id = request.form['student_id']
     
-    conn = get_db_connection()
-    cur = conn.cursor()
+    repo = get_repository()
     
-    cur.execute('SELECT name FROM students WHERE student_id = ?', (student_id,))
-    student = cur.fetchone()
+    student_name = repo.student_name(student_id)
     
-    if not student:
+    if not student_name:
         flash('Student not found')
-        cur.close()
-        conn.close()
         return redirect(url_for('security_dashboard'))
     
-    cur.execute('''
-        SELECT request_id, date_time_out, duration_hours, destination, purpose, 
-               parent_approval_status, warden_status, security_guard_status
-        FROM gatepass_requests
-        WHERE student_id = ? AND parent_approval_status = 'Approved'
-        ORDER BY date_time_out DESC
-    ''', (student_id,))
-    
-    raw_requests = cur.fetchall()
-    
-    # Format the requests to handle datetime properly
-    requests = []
-    for req in raw_requests:
-        formatted_req = list(req)
-        # Format the date_time_out (index 1) if it exists
-        if req[1]:
-            try:
-                if isinstance(req[1], str):
-                    dt = datetime.fromisoformat(req[1].replace('Z', '+00:00'))
-                else:
-                    dt = req[1]
-                formatted_req[1] = dt.strftime('%d %b, %I:%M %p')
-            except:
-                formatted_req[1] = str(req[1])
-        requests.append(tuple(formatted_req))
-    
-    cur.close()
-    conn.close()
-    
-    return render_template('security_dashboard.html', student_id=student_id, student_name=student[0], requests=requests)
+    requests = repo.search_approved(student_id)
+    
+    # Badge counts for the filter buttons above the results
+    counts = repo.counts('security')
+    
+    security_table = get_template_attribute('_gatepass_rows.html', 'security_table')
+    return render_template('security_dashboard.html', student_id=student_id, student_name=student_name,
+                         table=security_table(requests, None, 'all', student_id, student_name),
+                         current_filter='all', counts=counts)
 
 @app.route('/security/checkout/<int:request_id>')
 @app.route('/security/checkout/<int:request_id>/<filter_type>')
@@ -720,20 +649,8 @@ def checkout_student(request_id, filter_type='all'):
         flash('Access denied')
         return redirect(url_for('index'))
     
-    conn = get_db_connection()
-    cur = conn.cursor()
-    
-    cur.execute('''
-        UPDATE gatepass_requests
-        SET security_guard_status = 'Out'
-        WHERE request_id = ?
-    ''', (request_id,))
-    
-    conn.commit()
-    cur.close()
-    conn.close()
-    
-    flash('Student checked out successfully!')
+    result = get_repository().transition('checkout', request_id)
+    flash('Student checked out successfully!' if result['success'] else result['error'])
     return redirect(url_for('security_dashboard', filter_type=filter_type))
 
 @app.route('/security/checkin/<int:request_id>')
@@ -744,21 +661,92 @@ def checkin_student(request_id, filter_type='all'):
         flash('Access denied')
         return redirect(url_for('index'))
     
-    conn = get_db_connection()
-    cur = conn.cursor()
-    
-    cur.execute('''
-        UPDATE gatepass_requests
-        SET security_guard_status = 'In'
-        WHERE request_id = ?
-    ''', (request_id,))
-    
-    conn.commit()
-    cur.close()
-    conn.close()
-    
-    flash('Student checked in successfully!')
+    result = get_repository().transition('checkin', request_id)
+    flash('Student checked in successfully!' if result['success'] else result['error'])
     return redirect(url_for('security_dashboard', filter_type=filter_type))
 
+def dashboard_stream_url(role, filter_type):
+    """Event stream for a dashboard view, starting from the feed's current position"""
+    if not get_repository().live_updates or filter_type not in change_feed.VIEWS[role]:
+        return None
+    return url_for(f'{role}_events', filter_type=filter_type, since=change_feed.feed.position())
+
+def dashboard_events(role, filter_type):
+    if current_user.role != role:
+        abort(403)
+    if not get_repository().live_updates or filter_type not in change_feed.VIEWS[role]:
+        abort(404)
+    
+    # Browsers send Last-Event-ID when reconnecting; the first connection
+    # carries the position the page was rendered at
+    last_event_id = request.headers.get('Last-Event-ID', type=int)
+    if last_event_id is None:
+        last_event_id = request.args.get('since', type=int)
+    subscriber, replay_ok = change_feed.feed.subscribe(role, filter_type, last_event_id)
+    
+    row_macro = get_template_attribute('_gatepass_rows.html', f'{role}_row')
+    def render_row(event):
+        return str(row_macro(event['row'], filter_type))
+    
+    return Response(stream_with_context(change_feed.stream(subscriber, replay_ok, render_row)),
+                    mimetype='text/event-stream',
+                    headers={'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'})
+
+@app.route('/warden/events')
+@app.route('/warden/events/<filter_type>')
+@login_required
+def warden_events(filter_type='all'):
+    return dashboard_events('warden', filter_type)
+
+@app.route('/security/events')
+@app.route('/security/events/<filter_type>')
+@login_required
+def security_events(filter_type='all'):
+    return dashboard_events('security', filter_type)
+
+# Gate scanner actions (names in gatepass_transitions.TRANSITIONS)
+SCAN_ACTIONS = ('checkout', 'checkin')
+
+@app.template_global()
+def pass_token(request_id):
+    return pass_tokens.make_pass_token(request_id)
+
+@app.route('/security/scan/<action>', methods=['POST'])
+def scan_pass(action):
+    # JSON in, JSON out: scanners need a status code, not a login redirect
+    if not current_user.is_authenticated or current_user.role != 'security':
+        return jsonify(success=False, error='Access denied'), 403
+    if action not in SCAN_ACTIONS:
+        return jsonify(success=False, error=f'Unknown scan action: {action}'), 404
+    
+    payload = request.get_json(silent=True)
+    if payload is None:
+        payload = request.form
+    token = payload.get('token') if isinstance(payload, dict) else None
+    if not isinstance(token, str):
+        metrics.counter('gate_scans_total', 'Gate scans by action and outcome',
+                        action=action, result='invalid').inc()
+        return jsonify(success=False, error='Expected a JSON object with a string "token"'), 400
+    
+    request_id = pass_tokens.verify_pass_token(token)
+    if request_id is None:
+        metrics.counter('gate_scans_total', 'Gate scans by action and outcome',
+                        action=action, result='invalid').inc()
+        return jsonify(success=False, error='Invalid pass'), 400
+    
+    # A single conditional UPDATE, so two scans of the same pass can't both succeed
+    result = get_repository().transition(action, request_id)
+    outcome = 'ok' if result['success'] else result['result']
+    metrics.counter('gate_scans_total', 'Gate scans by action and outcome',
+                    action=action, result=outcome).inc()
+    status_code = {'ok': 200, 'not_found': 404, 'conflict': 409}[outcome]
+    return jsonify(result), status_code
+
+# Health check for the serverless deployments (api/index.py, api/app.py)
+@app.route('/health')
+@app.route('/api/health')
+def health():
+    return jsonify(status='ok', storage=get_repository().name)
+
 if __name__ == '__main__':
     app.run(host='0.0.0.0', port=5000, debug=True)
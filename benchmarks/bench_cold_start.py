@@ -0,0 +1,128 @@
+"""
+Cold-Start Benchmark for Hostel Gatepass Management System
+Times import-to-first-response for each entry point in fresh interpreters
+
+Usage:
+    python benchmarks/bench_cold_start.py
+    python benchmarks/bench_cold_start.py --runs 10 --entries api.index,api.app
+
+Every run starts a new Python process (as a serverless cold start or a new
+gunicorn worker would), imports the entry point, then serves GET /login and
+a demo login through Flask's test client. Each entry point is measured with
+an empty template bytecode cache and with one precompiled by
+template_cache.py, so the saving from shipping compiled templates is visible.
+"""
+
+import argparse
+import json
+import os
+import shutil
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+# module -> (login role, user id) for the demo account it signs in with
+ENTRIES = {
+    'app': ('warden', 'WAR001'),
+    'api.index': ('warden', 'WAR001'),
+    'api.app': ('warden', 'WAR001'),
+}
+PASSWORD = 'college123'
+
+# Runs inside the fresh interpreter; prints one JSON line of timings
+CHILD = '''
+import json, sys, time
+started = time.perf_counter()
+sys.path.insert(0, {root!r})
+import importlib
+entry = importlib.import_module({module!r})
+imported = time.perf_counter()
+client = entry.app.test_client()
+first = client.get('/login')
+responded = time.perf_counter()
+login = client.post('/login', data={{'user_id': {user_id!r}, 'password': {password!r}, 'role': {role!r}}})
+logged_in = time.perf_counter()
+print(json.dumps({{
+    'import_ms': (imported - started) * 1000,
+    'first_response_ms': (responded - imported) * 1000,
+    'login_ms': (logged_in - responded) * 1000,
+    'status': [first.status_code, login.status_code],
+}}))
+'''
+
+
+def run_once(module, env):
+    role, user_id = ENTRIES[module]
+    code = CHILD.format(root=ROOT, module=module, user_id=user_id, password=PASSWORD, role=role)
+    started = time.perf_counter()
+    result = subprocess.run([sys.executable, '-c', code], cwd=ROOT, env=env,
+                            capture_output=True, text=True)
+    wall_ms = (time.perf_counter() - started) * 1000
+    if result.returncode != 0:
+        raise RuntimeError(f"{module} failed:\n{result.stderr}")
+    timings = json.loads(result.stdout.strip().splitlines()[-1])
+    timings['process_ms'] = wall_ms
+    return timings
+
+
+def precompile_templates(cache_dir):
+    env = dict(os.environ, JINJA_CACHE_DIR=cache_dir)
+    subprocess.run([sys.executable, os.path.join(ROOT, 'template_cache.py')], cwd=ROOT, env=env,
+                   check=True, capture_output=True)
+
+
+def summarize(samples, field):
+    values = sorted(sample[field] for sample in samples)
+    return statistics.median(values), values[-1]
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Measure cold-start time of each entry point')
+    parser.add_argument('--runs', type=int, default=5, help='Fresh processes per entry point and cache mode')
+    parser.add_argument('--entries', default=','.join(ENTRIES), help='Comma-separated: ' + ', '.join(ENTRIES))
+    args = parser.parse_args()
+
+    workdir = tempfile.mkdtemp(prefix='gatepass-cold-start-')
+    base_env = dict(os.environ,
+                    DATABASE_PATH=os.path.join(workdir, 'gatepass.db'),
+                    HASH_WORKERS='0',
+                    EXPIRY_SCHEDULER='off',
+                    LIVE_DASHBOARDS='off')
+    # The full app needs its database to exist; building it isn't part of a cold start
+    subprocess.run([sys.executable, os.path.join(ROOT, 'db_init.py')], cwd=ROOT, env=base_env,
+                   check=True, capture_output=True)
+
+    print(f"{'entry':<12} {'templates':<12} {'import ms':>10} {'1st resp ms':>12} "
+          f"{'login ms':>10} {'process ms':>11}   (median / max of {args.runs})")
+    try:
+        for module in args.entries.split(','):
+            for mode in ('empty', 'precompiled'):
+                cache_dir = os.path.join(workdir, f'jinja-{module}-{mode}')
+                samples = []
+                for _ in range(args.runs):
+                    # Every run starts from the same cache state
+                    shutil.rmtree(cache_dir, ignore_errors=True)
+                    if mode == 'precompiled':
+                        precompile_templates(cache_dir)
+                    else:
+                        os.makedirs(cache_dir)
+                    samples.append(run_once(module, dict(base_env, JINJA_CACHE_DIR=cache_dir)))
+                statuses = {tuple(sample['status']) for sample in samples}
+                cells = []
+                for field in ('import_ms', 'first_response_ms', 'login_ms', 'process_ms'):
+                    median, worst = summarize(samples, field)
+                    cells.append(f'{median:.0f}/{worst:.0f}')
+                print(f"{module:<12} {mode:<12} {cells[0]:>10} {cells[1]:>12} {cells[2]:>10} {cells[3]:>11}"
+                      f"   status {sorted(statuses)}")
+    finally:
+        shutil.rmtree(workdir, ignore_errors=True)
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
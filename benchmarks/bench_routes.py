@@ -0,0 +1,366 @@
+"""
+Route Benchmarks for Hostel Gatepass Management System
+Drives every route through Flask's test client against generated databases
+
+Usage:
+    python benchmarks/bench_routes.py                      # compare with the baseline
+    python benchmarks/bench_routes.py --save-baseline      # record a new baseline
+    python benchmarks/bench_routes.py --sizes small,medium,large --iterations 100
+    python benchmarks/bench_routes.py --backend memory     # same routes on the in-memory store
+
+Fixtures are built once with datagen.py and cached in --fixtures-dir; each
+run works on a copy, so routes that write (apply, approve, checkout, ...)
+never change the cached databases. Latencies are only comparable on the
+machine that recorded the baseline (so baseline.json is not committed);
+query counts are comparable anywhere. With --backend memory the fixture is
+loaded into repository.MemoryRepository and results are recorded under
+'<size>/memory', so both backends share one baseline file.
+Exits with status 1 if any route regresses beyond the tolerance.
+"""
+
+import argparse
+import json
+import os
+import shutil
+import sqlite3
+import sys
+import tempfile
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+# Keep background work out of the measurements
+os.environ.setdefault('EXPIRY_SCHEDULER', 'off')
+os.environ.setdefault('LIVE_DASHBOARDS', 'off')
+
+# name -> (students, requests)
+SIZES = {
+    'small': (200, 10000),
+    'medium': (2000, 200000),
+    'large': (20000, 2000000),
+}
+FIXTURE_NOW = 1790000000   # fixed "current time" so fixtures are identical everywhere
+PASSWORD = 'college123'
+
+DEFAULT_ITERATIONS = 50
+LOGIN_ITERATIONS = 5       # each login pays for a full password KDF
+
+
+class QueryCounter:
+    """sqlite3 trace callback counting top-level statements"""
+
+    def __init__(self):
+        self.count = 0
+
+    def __call__(self, statement):
+        # Statements run by triggers are reported as '-- TRIGGER ...'
+        if not statement.startswith('--'):
+            self.count += 1
+
+
+def fixture_path(fixtures_dir, size):
+    students, requests = SIZES[size]
+    return os.path.join(fixtures_dir, f"bench_{size}_{students}_{requests}.db")
+
+
+def ensure_fixture(fixtures_dir, size):
+    import datagen
+    import db
+
+    path = fixture_path(fixtures_dir, size)
+    if not os.path.exists(path):
+        os.makedirs(fixtures_dir, exist_ok=True)
+        students, requests = SIZES[size]
+        print(f"Building {size} fixture ({students} students, {requests} requests)...")
+        datagen.generate(path + '.tmp', students=students, requests=requests, now=FIXTURE_NOW, verbose=False)
+        db.get_pool().close_all()
+        # Fold the WAL into the main file so a plain file copy is complete
+        conn = sqlite3.connect(path + '.tmp')
+        conn.execute('PRAGMA wal_checkpoint(TRUNCATE)')
+        conn.execute('PRAGMA journal_mode = DELETE')
+        conn.close()
+        os.replace(path + '.tmp', path)
+    return path
+
+
+def percentile(sorted_values, pct):
+    # Nearest-rank percentile
+    index = max(0, min(len(sorted_values) - 1, int(round(pct / 100 * len(sorted_values))) - 1))
+    return sorted_values[index]
+
+
+class Context:
+    """Logged-in clients and the IDs the scenarios act on, for one database"""
+
+    def __init__(self, flask_app):
+        import db
+
+        self.app = flask_app
+        conn = db.get_db_connection()
+        cur = conn.cursor()
+        # The busiest student (and their parent) gives the heaviest dashboards
+        cur.execute('''
+            SELECT student_id FROM gatepass_requests
+            GROUP BY student_id ORDER BY COUNT(*) DESC LIMIT 1
+        ''')
+        row = cur.fetchone()
+        self.student_id = row[0] if row else 'STU001'
+        cur.execute('''
+            SELECT p.parent_id, p.email FROM student_parent_links l
+            JOIN parents p ON p.parent_id = l.parent_id
+            WHERE l.student_id = ?
+        ''', (self.student_id,))
+        self.parent_id, self.parent_email = cur.fetchone()
+        cur.close()
+        conn.close()
+
+        self.clients = {
+            'student': self.login('student', self.student_id),
+            'parent': self.login('parent', self.parent_id),
+            'warden': self.login('warden', 'WAR001'),
+            'security': self.login('security', 'SEC001'),
+        }
+
+    def login(self, role, user_id):
+        client = self.app.test_client()
+        response = client.post('/login', data={'user_id': user_id, 'password': PASSWORD, 'role': role})
+        if response.status_code != 302 or not response.location.endswith('/'):
+            raise RuntimeError(f"Could not log in as {role} {user_id}")
+        return client
+
+    def insert_request(self, parent_status='Pending', security_status='Pending'):
+        """
+        Untimed setup: a request in the state a mutating route expects
+
+        Created and moved along through the repository, so it lands in
+        whichever backend the routes are reading.
+        """
+        from datetime import timedelta
+
+        import timestamps
+        from repository import get_repository
+
+        repo = get_repository()
+        now = timestamps.now()
+        request_id = repo.create_gatepass(self.student_id, self.parent_email, now + timedelta(hours=1), 4,
+                                          'City Market', 'Benchmark', now, now + timedelta(hours=1))
+        if parent_status == 'Approved':
+            repo.transition('approve', request_id, owner=self.parent_email)
+        if security_status == 'Out':
+            repo.transition('checkout', request_id)
+        return request_id
+
+
+def insert_pending_registrations(count):
+    """Untimed setup, written to the database before any backend loads it"""
+    import db
+    from werkzeug.security import generate_password_hash
+
+    password_hash = generate_password_hash(PASSWORD)
+    conn = db.get_db_connection()
+    cur = conn.cursor()
+    cur.executemany('''
+        INSERT INTO pending_registrations
+        (user_type, proposed_user_id, name, email, phone, password_hash, hostel_block)
+        VALUES ('student', ?, ?, ?, '9000000000', ?, 'Block A')
+    ''', [(f"BENCH{i:04d}", f"Bench Student {i}", f"bench{i}@student.edu", password_hash)
+          for i in range(count)])
+    conn.commit()
+    conn.close()
+
+
+def scenarios(ctx):
+    """
+    (name, iterations, make_request) for every route
+
+    make_request() does any untimed setup and returns (client, method, url, form data).
+    """
+    import pass_tokens
+
+    student, parent = ctx.clients['student'], ctx.clients['parent']
+    warden, security = ctx.clients['warden'], ctx.clients['security']
+    apply_form = {'date_time_out': '2030-01-15T10:00', 'duration_hours': '4', 'destination': 'City Market',
+                  'purpose': 'Benchmark', 'parent_email': ctx.parent_email}
+
+    def get(client, url):
+        return lambda: (client, 'GET', url, None)
+
+    items = [
+        ('login', LOGIN_ITERATIONS,
+         lambda: (ctx.app.test_client(), 'POST', '/login',
+                  {'user_id': ctx.student_id, 'password': PASSWORD, 'role': 'student'})),
+        ('apply_gatepass', None, lambda: (student, 'POST', '/student/apply', apply_form)),
+    ]
+    for filter_type in ('all', 'pending', 'history'):
+        items.append((f'student_dashboard/{filter_type}', None, get(student, f'/student/dashboard/{filter_type}')))
+    for filter_type in ('all', 'pending', 'history'):
+        items.append((f'parent_dashboard/{filter_type}', None, get(parent, f'/parent/dashboard/{filter_type}')))
+    for filter_type in ('all', 'pending', 'history'):
+        items.append((f'warden_dashboard/{filter_type}', None, get(warden, f'/warden/dashboard/{filter_type}')))
+    for filter_type in ('all', 'checkout', 'checkin', 'completed'):
+        items.append((f'security_dashboard/{filter_type}', None, get(security, f'/security/dashboard/{filter_type}')))
+    items += [
+        ('approve_request', None,
+         lambda: (parent, 'GET', f'/parent/approve/{ctx.insert_request()}', None)),
+        ('reject_request', None,
+         lambda: (parent, 'GET', f'/parent/reject/{ctx.insert_request()}', None)),
+        ('close_request', None,
+         lambda: (warden, 'GET', f"/warden/close/{ctx.insert_request('Approved')}", None)),
+        ('checkout_student', None,
+         lambda: (security, 'GET', f"/security/checkout/{ctx.insert_request('Approved')}", None)),
+        ('checkin_student', None,
+         lambda: (security, 'GET', f"/security/checkin/{ctx.insert_request('Approved', 'Out')}", None)),
+        ('scan_checkout', None,
+         lambda: (security, 'POST', '/security/scan/checkout',
+                  {'token': pass_tokens.make_pass_token(ctx.insert_request('Approved'))})),
+        ('scan_checkin', None,
+         lambda: (security, 'POST', '/security/scan/checkin',
+                  {'token': pass_tokens.make_pass_token(ctx.insert_request('Approved', 'Out'))})),
+        ('security_search', None,
+         lambda: (security, 'POST', '/security/search', {'student_id': ctx.student_id})),
+        ('pending_registrations', None, get(warden, '/warden/pending-registrations')),
+    ]
+    return items
+
+
+def run_size(size, fixtures_dir, iterations, counter, backend='sqlite'):
+    """Benchmark every route against one fixture on one backend; returns {route: stats}"""
+    source = ensure_fixture(fixtures_dir, size)
+    workdir = tempfile.mkdtemp(prefix='gatepass-bench-')
+    db_path = os.path.join(workdir, 'gatepass.db')
+    shutil.copyfile(source, db_path)
+    os.environ['DATABASE_PATH'] = db_path
+
+    import app as app_module
+    import migrations
+    import repository
+    from user_cache import user_cache
+
+    user_cache.clear()
+    migrations.migrate()
+    insert_pending_registrations(25)
+    if backend == 'memory':
+        store = repository.MemoryRepository()
+        store.load_sqlite(db_path)
+        repository.set_repository(store)
+    ctx = Context(app_module.app)
+
+    results = {}
+    try:
+        for name, route_iterations, make_request in scenarios(ctx):
+            timings, queries = [], []
+            for _ in range(route_iterations or iterations):
+                client, method, url, data = make_request()
+                counter.count = 0
+                started = time.perf_counter()
+                response = client.open(url, method=method, data=data)
+                elapsed = time.perf_counter() - started
+                if response.status_code >= 400:
+                    raise RuntimeError(f"{name}: {method} {url} returned {response.status_code}")
+                timings.append(elapsed * 1000)
+                queries.append(counter.count)
+            timings.sort()
+            results[name] = {
+                'p50_ms': round(percentile(timings, 50), 3),
+                'p95_ms': round(percentile(timings, 95), 3),
+                'p99_ms': round(percentile(timings, 99), 3),
+                'queries': max(queries),
+                'iterations': len(timings),
+            }
+    finally:
+        shutil.rmtree(workdir, ignore_errors=True)
+    return results
+
+
+def compare(baseline, current, tolerance, slack_ms):
+    """
+    Regressions of current against baseline
+
+    A route regresses if its p95 exceeds the baseline p95 by more than
+    `tolerance` (a fraction) plus `slack_ms`, or if it runs more queries.
+    """
+    regressions = []
+    for size, routes in current.items():
+        for name, stats in routes.items():
+            base = baseline.get(size, {}).get(name)
+            if base is None:
+                continue
+            limit = base['p95_ms'] * (1 + tolerance) + slack_ms
+            if stats['p95_ms'] > limit:
+                regressions.append(f"{size}/{name}: p95 {stats['p95_ms']:.2f}ms > {limit:.2f}ms "
+                                   f"(baseline {base['p95_ms']:.2f}ms)")
+            if stats['queries'] > base['queries']:
+                regressions.append(f"{size}/{name}: {stats['queries']} queries > baseline {base['queries']}")
+    return regressions
+
+
+def print_table(size, results, baseline):
+    print(f"\n== {size} ==")
+    print(f"{'route':32} {'p50 ms':>9} {'p95 ms':>9} {'p99 ms':>9} {'queries':>8} {'base p95':>9}")
+    for name, stats in results.items():
+        base = baseline.get(size, {}).get(name)
+        base_p95 = f"{base['p95_ms']:.2f}" if base else '-'
+        print(f"{name:32} {stats['p50_ms']:9.2f} {stats['p95_ms']:9.2f} {stats['p99_ms']:9.2f} "
+              f"{stats['queries']:8d} {base_p95:>9}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark every route of app.py')
+    parser.add_argument('--sizes', default='small,medium', help='Comma-separated: small, medium, large')
+    parser.add_argument('--backend', default='sqlite', choices=('sqlite', 'memory'), help='Storage backend the routes use')
+    parser.add_argument('--iterations', type=int, default=DEFAULT_ITERATIONS)
+    parser.add_argument('--baseline', default=os.path.join(ROOT, 'benchmarks', 'baseline.json'))
+    parser.add_argument('--save-baseline', action='store_true')
+    parser.add_argument('--tolerance', type=float, default=0.25, help='Allowed p95 growth, as a fraction')
+    parser.add_argument('--slack-ms', type=float, default=5.0, help='Absolute p95 allowance for fast routes')
+    parser.add_argument('--fixtures-dir', default=os.path.join(ROOT, 'benchmarks', 'fixtures'))
+    args = parser.parse_args()
+
+    sizes = [size.strip() for size in args.sizes.split(',') if size.strip()]
+    unknown = [size for size in sizes if size not in SIZES]
+    if unknown:
+        parser.error(f"Unknown size(s): {', '.join(unknown)}")
+
+    # app.py picks its backend when imported (in run_size)
+    os.environ['STORAGE_BACKEND'] = args.backend
+
+    import db
+    counter = QueryCounter()
+    db.add_connect_hook(lambda conn: conn.set_trace_callback(counter))
+
+    baseline = {}
+    if os.path.exists(args.baseline):
+        with open(args.baseline) as f:
+            baseline = json.load(f)
+
+    current = {}
+    for size in sizes:
+        label = size if args.backend == 'sqlite' else f'{size}/{args.backend}'
+        current[label] = run_size(size, args.fixtures_dir, args.iterations, counter, args.backend)
+        print_table(label, current[label], baseline)
+
+    if args.save_baseline:
+        baseline.update(current)
+        with open(args.baseline, 'w') as f:
+            json.dump(baseline, f, indent=2, sort_keys=True)
+            f.write('\n')
+        print(f"\nSaved baseline to {args.baseline}")
+        return 0
+
+    if not baseline:
+        print(f"\nNo baseline at {args.baseline}; run with --save-baseline first")
+        return 0
+
+    regressions = compare(baseline, current, args.tolerance, args.slack_ms)
+    if regressions:
+        print(f"\n{len(regressions)} regression(s):")
+        for regression in regressions:
+            print(f"  {regression}")
+        return 1
+    print("\nNo regressions")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
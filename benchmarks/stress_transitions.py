@@ -0,0 +1,183 @@
+"""
+Transition Stress Test for Hostel Gatepass Management System
+Races many threads through gatepass_transitions and checks nothing was lost or illegal
+
+Usage:
+    python benchmarks/stress_transitions.py
+    python benchmarks/stress_transitions.py --threads 32 --requests 100 --attempts 50000
+
+Every thread repeatedly applies a random transition to a random gatepass
+(from a small set, so most attempts collide). Afterwards each gatepass is
+checked: no transition succeeded twice, at most one parent decision won,
+nothing happened to a pass that wasn't approved, check-in only followed a
+check-out, and the stored row and badge counters match the successes.
+Exits with status 1 on any violation.
+"""
+
+import argparse
+import os
+import random
+import sys
+import tempfile
+import threading
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+os.environ.setdefault('EXPIRY_SCHEDULER', 'off')
+
+PARENT_DECISIONS = ('approve', 'reject', 'expire')
+
+
+def setup_database(requests):
+    """Fresh database with `requests` gatepasses, half awaiting the parent and half approved"""
+    import db_init
+    import db
+
+    db_init.init_database()
+    conn = db.get_db_connection()
+    cur = conn.cursor()
+    cur.execute('''
+        SELECT l.student_id, p.email
+        FROM student_parent_links l JOIN parents p ON p.parent_id = l.parent_id
+    ''')
+    pairs = cur.fetchall()
+
+    initial = {}
+    for i in range(requests):
+        student_id, parent_email = pairs[i % len(pairs)]
+        parent_status = 'Pending' if i % 2 == 0 else 'Approved'
+        cur.execute('''
+            INSERT INTO gatepass_requests (student_id, parent_email, date_time_out, duration_hours,
+                                           destination, purpose, parent_approval_status)
+            VALUES (?, ?, ?, 2, 'Stress', 'Stress', ?)
+        ''', (student_id, parent_email, time.time() + 3600, parent_status))
+        initial[cur.lastrowid] = (parent_email, parent_status)
+    conn.commit()
+    conn.close()
+    return initial
+
+
+def worker(initial, attempts, seed, barrier, outcomes, errors):
+    import gatepass_transitions
+
+    rng = random.Random(seed)
+    request_ids = list(initial)
+    names = list(gatepass_transitions.TRANSITIONS)
+    barrier.wait()
+    for _ in range(attempts):
+        request_id = rng.choice(request_ids)
+        name = rng.choice(names)
+        try:
+            result = gatepass_transitions.transition(name, request_id, owner=initial[request_id][0])
+        except Exception as e:
+            errors.append(f'{name} #{request_id}: {e!r}')
+            continue
+        outcomes.append((request_id, name, result['success'] or result['result']))
+
+
+def verify(initial, outcomes):
+    """List of violations found in the outcomes and the final database state"""
+    import db
+    import gatepass_counts
+
+    successes = {request_id: [] for request_id in initial}
+    for request_id, name, outcome in outcomes:
+        if outcome is True:
+            successes[request_id].append(name)
+        elif outcome == 'not_found':
+            successes[request_id].append('not_found')
+
+    conn = db.get_db_connection()
+    cur = conn.cursor()
+    cur.execute('SELECT request_id, parent_approval_status, warden_status, security_guard_status FROM gatepass_requests')
+    stored = {row[0]: row[1:] for row in cur.fetchall()}
+
+    violations = []
+    for request_id, (_, initial_parent) in initial.items():
+        won = successes[request_id]
+        prefix = f'#{request_id}'
+        if 'not_found' in won:
+            violations.append(f'{prefix}: reported not found')
+        for name in set(won):
+            if won.count(name) > 1:
+                violations.append(f'{prefix}: {name} succeeded {won.count(name)} times')
+
+        decisions = [name for name in won if name in PARENT_DECISIONS]
+        if len(decisions) > 1 or (decisions and initial_parent != 'Pending'):
+            violations.append(f'{prefix}: parent decisions {decisions} from {initial_parent}')
+        parent = {'approve': 'Approved', 'reject': 'Rejected', 'expire': 'Expired'}[decisions[0]] \
+            if decisions else initial_parent
+        if parent != 'Approved' and {'close', 'checkout', 'checkin'} & set(won):
+            violations.append(f'{prefix}: {sorted(won)} on a {parent} gatepass')
+        if 'checkin' in won and 'checkout' not in won:
+            violations.append(f'{prefix}: checked in without being checked out')
+
+        warden = 'Closed' if 'close' in won else 'Open'
+        security = 'In' if 'checkin' in won else 'Out' if 'checkout' in won else 'Pending'
+        if stored[request_id] != (parent, warden, security):
+            violations.append(f'{prefix}: stored {stored[request_id]}, successes imply {(parent, warden, security)}')
+
+    for mismatch in gatepass_counts.check_status_counts(cur):
+        violations.append(f'badge counter mismatch: {mismatch}')
+    conn.close()
+    return violations
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Race threads through gatepass transitions')
+    parser.add_argument('--threads', type=int, default=16)
+    parser.add_argument('--requests', type=int, default=200, help='Gatepasses to fight over')
+    parser.add_argument('--attempts', type=int, default=20000, help='Total transition attempts')
+    parser.add_argument('--seed', type=int, default=1)
+    args = parser.parse_args()
+
+    workdir = tempfile.mkdtemp(prefix='gatepass-stress-')
+    os.environ['DATABASE_PATH'] = os.path.join(workdir, 'gatepass.db')
+    os.environ['DB_POOL_SIZE'] = str(args.threads)
+    initial = setup_database(args.requests)
+
+    import metrics
+
+    outcomes, errors = [], []
+    barrier = threading.Barrier(args.threads)
+    per_thread = args.attempts // args.threads
+    threads = [threading.Thread(target=worker,
+                                args=(initial, per_thread, args.seed * 1000 + i, barrier, outcomes, errors))
+               for i in range(args.threads)]
+    started = time.perf_counter()
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    elapsed = time.perf_counter() - started
+
+    ok = sum(1 for outcome in outcomes if outcome[2] is True)
+    conflicts = sum(1 for outcome in outcomes if outcome[2] == 'conflict')
+    counted = {}
+    for (family, _, _, labels), value in metrics.collect().items():
+        if family == 'gatepass_transitions_total':
+            result = dict(labels)['result']
+            counted[result] = counted.get(result, 0) + int(value)
+
+    print(f"{len(outcomes)} attempts by {args.threads} threads on {args.requests} gatepasses "
+          f"in {elapsed:.2f}s ({len(outcomes) / elapsed:.0f}/s)")
+    print(f"  succeeded: {ok}   conflicts: {conflicts}   errors: {len(errors)}")
+
+    violations = verify(initial, outcomes)
+    if counted.get('ok', 0) != ok or counted.get('conflict', 0) != conflicts:
+        violations.append(f'metrics counted {counted}, outcomes were ok={ok} conflict={conflicts}')
+    violations.extend(errors)
+
+    if violations:
+        print(f"\n{len(violations)} violations:")
+        for violation in violations[:50]:
+            print(f"  {violation}")
+        return 1
+    print("No lost or illegal transitions")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
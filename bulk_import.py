@@ -0,0 +1,456 @@
+"""
+Bulk Onboarding for Hostel Gatepass Management System
+Streams students, parents and their links from CSV or JSONL into the database
+
+Usage:
+    python bulk_import.py students.csv [--chunk-size 500] [--workers 4] [--restart]
+                                       [--hash-method pbkdf2:sha256:100000]
+
+Each row has a user_type ('student' or 'parent') plus the columns of that
+user table (name, email, phone, hostel_block, ...). Give either `password`
+(hashed here, in parallel) or a ready-made werkzeug `password_hash`.
+Students may name their parent with `parent_email` and parents their
+student with `student_email`; the other side can be in the same file or
+already registered.
+
+Every chunk commits together with its checkpoint, so after a failure the
+same command resumes with the chunk that failed.
+
+Plaintext passwords dominate the run time. Werkzeug's default scrypt costs
+about 0.1 s per password per core, so 10,000 of them take roughly
+1000 / cores seconds: the one-minute target for 10k users is only met by
+files that carry `password_hash`, or with a cheaper `--hash-method` (e.g.
+pbkdf2:sha256:100000, about 0.03 s) on six or more cores. Login verifies
+either kind, since the method is stored in the hash.
+"""
+
+import argparse
+import csv
+import hashlib
+import json
+import multiprocessing
+import os
+import sqlite3
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+from functools import partial
+
+from werkzeug.security import generate_password_hash
+
+import db
+import timestamps
+import user_ids
+
+
+CHUNK_SIZE = int(os.environ.get('IMPORT_CHUNK_SIZE', 500))
+# None keeps werkzeug's default (scrypt)
+HASH_METHOD = os.environ.get('IMPORT_HASH_METHOD') or None
+
+IMPORT_USER_TYPES = ('student', 'parent')
+REQUIRED_FIELDS = {
+    'student': ('name', 'email'),
+    'parent': ('name', 'email', 'phone'),
+}
+USER_COLUMNS = {
+    'student': ('student_id', 'name', 'password_hash', 'email', 'phone',
+                'hostel_block', 'room_number', 'course', 'year_of_study'),
+    'parent': ('parent_id', 'name', 'password_hash', 'email', 'phone',
+               'relationship', 'address'),
+}
+
+# JSONL can carry any JSON type; these have string operations run on them
+STRING_FIELDS = ('user_type', 'name', 'email', 'phone', 'password', 'password_hash',
+                 'parent_email', 'student_email')
+
+
+class RowError(ValueError):
+    """A row that cannot be imported; the rest of its chunk still is"""
+
+
+def install(cur):
+    """Create the checkpoint and link staging tables used by imports (idempotent)"""
+    cur.execute('''
+        CREATE TABLE IF NOT EXISTS import_checkpoints (
+            import_id VARCHAR(64) PRIMARY KEY,
+            source TEXT,
+            rows_done INTEGER NOT NULL DEFAULT 0,
+            imported INTEGER NOT NULL DEFAULT 0,
+            skipped INTEGER NOT NULL DEFAULT 0,
+            started_at TIMESTAMP,
+            updated_at TIMESTAMP,
+            completed_at TIMESTAMP
+        )
+    ''')
+    # Links wait here until both sides exist, which may be several chunks later
+    cur.execute('''
+        CREATE TABLE IF NOT EXISTS import_links (
+            import_id VARCHAR(64) NOT NULL,
+            student_email VARCHAR(100) NOT NULL,
+            parent_email VARCHAR(100) NOT NULL,
+            PRIMARY KEY (import_id, student_email, parent_email)
+        )
+    ''')
+
+
+def file_digest(path):
+    """SHA-256 of the file, used as the default import_id"""
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for block in iter(lambda: f.read(1 << 20), b''):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def read_rows(path, fmt=None):
+    """
+    Stream records from a CSV or JSONL file
+
+    Yields:
+        tuple: (line number, row dict or None, parse error or None)
+    """
+    fmt = fmt or ('jsonl' if path.endswith(('.jsonl', '.ndjson')) else 'csv')
+    with open(path, newline='', encoding='utf-8') as f:
+        if fmt == 'csv':
+            reader = csv.DictReader(f)
+            for row in reader:
+                yield reader.line_num, row, None
+        else:
+            for line_no, line in enumerate(f, 1):
+                if not line.strip():
+                    continue
+                try:
+                    row = json.loads(line)
+                except ValueError as e:
+                    yield line_no, None, f'Malformed JSON: {e}'
+                    continue
+                if not isinstance(row, dict):
+                    yield line_no, None, 'Expected a JSON object'
+                    continue
+                yield line_no, row, None
+
+
+def validate_row(row):
+    """
+    Normalise one input row
+
+    Returns:
+        dict: Cleaned fields, with user_type and either password or password_hash
+
+    Raises:
+        RowError: If the row cannot be imported
+    """
+    clean = {}
+    for key, value in row.items():
+        if key is None:
+            raise RowError('More values than header columns')
+        if isinstance(value, str):
+            value = value.strip() or None
+        clean[key.strip()] = value
+
+    for field in STRING_FIELDS:
+        if clean.get(field) is not None and not isinstance(clean[field], str):
+            raise RowError(f'{field} must be a string')
+
+    user_type = (clean.get('user_type') or '').lower()
+    if user_type not in IMPORT_USER_TYPES:
+        raise RowError(f"user_type must be one of {', '.join(IMPORT_USER_TYPES)}")
+    clean['user_type'] = user_type
+
+    for field in USER_COLUMNS[user_type]:
+        value = clean.get(field)
+        if value is not None and (isinstance(value, bool) or not isinstance(value, (str, int, float))):
+            raise RowError(f'{field} must be a string or number')
+
+    for field in REQUIRED_FIELDS[user_type]:
+        if not clean.get(field):
+            raise RowError(f'Missing {field}')
+    if '@' not in clean['email']:
+        raise RowError(f"Invalid email: {clean['email']}")
+
+    if clean.get('password_hash'):
+        if '$' not in clean['password_hash']:
+            raise RowError('password_hash is not a werkzeug password hash')
+    elif not clean.get('password'):
+        raise RowError('Missing password or password_hash')
+
+    if user_type == 'student' and clean.get('year_of_study') is not None:
+        try:
+            clean['year_of_study'] = int(clean['year_of_study'])
+        except (TypeError, ValueError):
+            raise RowError(f"Invalid year_of_study: {clean['year_of_study']}")
+
+    return clean
+
+
+def _chunks(iterable, size):
+    chunk = []
+    for item in iterable:
+        chunk.append(item)
+        if len(chunk) == size:
+            yield chunk
+            chunk = []
+    if chunk:
+        yield chunk
+
+
+def _hash_passwords(executor, passwords, method=None, workers=1):
+    hash_password = partial(generate_password_hash, method=method) if method else generate_password_hash
+    if executor is None:
+        return [hash_password(password) for password in passwords]
+    # One batch per worker per round trip: a 500-row chunk on 4 workers is
+    # 16 tasks rather than 63, so less time goes on pickling and IPC
+    chunksize = max(1, len(passwords) // (workers * 4))
+    return list(executor.map(hash_password, passwords, chunksize=chunksize))
+
+
+def _registered_emails(cur, emails):
+    """Subset of emails that already have an identity"""
+    found = set()
+    emails = list(emails)
+    for start in range(0, len(emails), 500):
+        batch = emails[start:start + 500]
+        placeholders = ', '.join('?' for _ in batch)
+        cur.execute(f'SELECT email FROM identities WHERE email IN ({placeholders})', batch)
+        found.update(email for (email,) in cur.fetchall())
+    return found
+
+
+def _import_chunk(cur, import_id, chunk, executor, errors, hash_method=None, workers=1):
+    """
+    Validate, hash and insert one chunk; the caller commits
+
+    Returns:
+        dict: rows imported per user type and rows skipped
+    """
+    valid = []
+    for line_no, row, parse_error in chunk:
+        try:
+            if parse_error:
+                raise RowError(parse_error)
+            valid.append((line_no, validate_row(row)))
+        except RowError as e:
+            errors.append((line_no, str(e)))
+
+    # Duplicate emails: within the chunk, then against everyone already registered
+    seen, unique = set(), []
+    for line_no, row in valid:
+        if row['email'] in seen:
+            errors.append((line_no, f"Duplicate email in file: {row['email']}"))
+        else:
+            seen.add(row['email'])
+            unique.append((line_no, row))
+    taken = _registered_emails(cur, seen)
+    rows = []
+    for line_no, row in unique:
+        if row['email'] in taken:
+            errors.append((line_no, f"Email already registered: {row['email']}"))
+        else:
+            rows.append(row)
+
+    to_hash = [row for row in rows if not row.get('password_hash')]
+    passwords = [row['password'] for row in to_hash]
+    for row, password_hash in zip(to_hash, _hash_passwords(executor, passwords, hash_method, workers)):
+        row['password_hash'] = password_hash
+
+    imported = {}
+    for user_type in IMPORT_USER_TYPES:
+        typed = [row for row in rows if row['user_type'] == user_type]
+        imported[user_type] = len(typed)
+        if not typed:
+            continue
+
+        columns = USER_COLUMNS[user_type]
+        id_column = columns[0]
+        for row, user_id in zip(typed, user_ids.reserve_user_ids(cur, user_type, len(typed))):
+            row[id_column] = user_id
+
+        placeholders = ', '.join('?' for _ in columns)
+        table = user_ids.USER_ID_SOURCES[user_type][1]
+        cur.executemany(
+            f"INSERT INTO {table} ({', '.join(columns)}) VALUES ({placeholders})",
+            [tuple(row.get(column) for column in columns) for row in typed],
+        )
+        cur.executemany(
+            "INSERT INTO identities (email, user_type, user_id, status) VALUES (?, ?, ?, 'active')",
+            [(row['email'], user_type, row[id_column]) for row in typed],
+        )
+
+    links = []
+    for row in rows:
+        if row['user_type'] == 'student' and row.get('parent_email'):
+            links.append((import_id, row['email'], row['parent_email']))
+        elif row['user_type'] == 'parent' and row.get('student_email'):
+            links.append((import_id, row['student_email'], row['email']))
+    cur.executemany('INSERT OR IGNORE INTO import_links VALUES (?, ?, ?)', links)
+
+    imported['skipped'] = len(chunk) - len(rows)
+    return imported
+
+
+def _resolve_links(cur, import_id):
+    """
+    Create student_parent_links for every staged link whose two users now exist
+
+    Returns:
+        tuple: (links created, list of (student_email, parent_email) left unresolved)
+    """
+    cur.execute('''
+        INSERT OR IGNORE INTO student_parent_links (student_id, parent_id)
+        SELECT s.user_id, p.user_id
+        FROM import_links l
+        JOIN identities s ON s.email = l.student_email AND s.user_type = 'student'
+        JOIN identities p ON p.email = l.parent_email AND p.user_type = 'parent'
+        WHERE l.import_id = ?
+    ''', (import_id,))
+    created = cur.rowcount
+    cur.execute('''
+        SELECT l.student_email, l.parent_email
+        FROM import_links l
+        LEFT JOIN identities s ON s.email = l.student_email AND s.user_type = 'student'
+        LEFT JOIN identities p ON p.email = l.parent_email AND p.user_type = 'parent'
+        WHERE l.import_id = ? AND (s.user_id IS NULL OR p.user_id IS NULL)
+    ''', (import_id,))
+    unresolved = cur.fetchall()
+    cur.execute('DELETE FROM import_links WHERE import_id = ?', (import_id,))
+    return created, unresolved
+
+
+def import_users(path, fmt=None, chunk_size=CHUNK_SIZE, workers=None, import_id=None,
+                 imported_by=None, restart=False, verbose=True, hash_method=HASH_METHOD):
+    """
+    Import students and parents from a CSV/JSONL file, resuming a previous run
+
+    Args:
+        path: File to import
+        fmt: 'csv' or 'jsonl' (default: from the file extension)
+        chunk_size: Rows per transaction
+        workers: Hashing processes (default: CPU count; 0 or 1 hashes inline)
+        import_id: Checkpoint key (default: SHA-256 of the file)
+        imported_by: User ID recorded in the activity log
+        restart: Ignore any existing checkpoint and start from the first row
+        verbose: Print progress per chunk
+        hash_method: werkzeug method for plaintext passwords (default: scrypt)
+
+    Returns:
+        dict: Success status, counts, per-row errors and unresolved links
+    """
+    import_id = import_id or file_digest(path)
+    workers = (os.cpu_count() or 1) if workers is None else workers
+    result = {
+        'success': False, 'import_id': import_id,
+        'imported': {user_type: 0 for user_type in IMPORT_USER_TYPES},
+        'skipped': 0, 'links': 0, 'errors': [], 'unresolved_links': [],
+    }
+    if hash_method:
+        try:
+            generate_password_hash('', method=hash_method)
+        except ValueError as e:
+            result['error'] = f'Invalid hash method {hash_method!r}: {e}'
+            return result
+
+    conn = db.get_db_connection()
+    cur = conn.cursor()
+    executor = None
+    started = time.perf_counter()
+
+    try:
+        if restart:
+            cur.execute('DELETE FROM import_checkpoints WHERE import_id = ?', (import_id,))
+            cur.execute('DELETE FROM import_links WHERE import_id = ?', (import_id,))
+            conn.commit()
+
+        cur.execute('SELECT rows_done, completed_at FROM import_checkpoints WHERE import_id = ?', (import_id,))
+        checkpoint = cur.fetchone()
+        if checkpoint and checkpoint[1] is not None:
+            result['error'] = 'This file has already been imported (use --restart to import it again)'
+            return result
+        rows_done = checkpoint[0] if checkpoint else 0
+        result['resumed_from'] = rows_done
+        if rows_done and verbose:
+            print(f"Resuming import {import_id[:12]} after row {rows_done}")
+
+        if workers > 1:
+            # spawn, as in hashing.py: never fork a process that may have threads
+            executor = ProcessPoolExecutor(max_workers=workers, mp_context=multiprocessing.get_context('spawn'))
+
+        records = read_rows(path, fmt)
+        for _ in range(rows_done):
+            next(records, None)
+
+        for chunk in _chunks(records, chunk_size):
+            now = timestamps.now()
+            try:
+                counts = _import_chunk(cur, import_id, chunk, executor, result['errors'], hash_method, workers)
+                imported = sum(counts[user_type] for user_type in IMPORT_USER_TYPES)
+                cur.execute('''
+                    INSERT INTO import_checkpoints
+                    (import_id, source, rows_done, imported, skipped, started_at, updated_at)
+                    VALUES (?, ?, ?, ?, ?, ?, ?)
+                    ON CONFLICT (import_id) DO UPDATE SET
+                        rows_done = rows_done + excluded.rows_done,
+                        imported = imported + excluded.imported,
+                        skipped = skipped + excluded.skipped,
+                        updated_at = excluded.updated_at
+                ''', (import_id, os.path.abspath(path), len(chunk), imported, counts['skipped'], now, now))
+                conn.commit()
+            except sqlite3.Error as e:
+                conn.rollback()
+                result['error'] = f'Database error after row {rows_done}: {e}. Rerun to resume.'
+                return result
+
+            rows_done += len(chunk)
+            for user_type in IMPORT_USER_TYPES:
+                result['imported'][user_type] += counts[user_type]
+            result['skipped'] += counts['skipped']
+            if verbose:
+                print(f"  {rows_done} rows processed ({time.perf_counter() - started:.1f}s)")
+
+        result['links'], result['unresolved_links'] = _resolve_links(cur, import_id)
+        cur.execute('UPDATE import_checkpoints SET completed_at = ? WHERE import_id = ?',
+                    (timestamps.now(), import_id))
+        cur.execute('''
+            INSERT INTO activity_logs (user_id, user_type, action, description)
+            VALUES (?, 'system', 'bulk_import', ?)
+        ''', (imported_by, f"Imported {result['imported']['student']} students and "
+                           f"{result['imported']['parent']} parents from {os.path.basename(path)}"))
+        conn.commit()
+
+        result['success'] = True
+        result['seconds'] = round(time.perf_counter() - started, 2)
+        return result
+    finally:
+        if executor is not None:
+            executor.shutdown()
+        cur.close()
+        conn.close()
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Import students and parents from CSV or JSONL')
+    parser.add_argument('path')
+    parser.add_argument('--format', choices=('csv', 'jsonl'))
+    parser.add_argument('--chunk-size', type=int, default=CHUNK_SIZE)
+    parser.add_argument('--workers', type=int)
+    parser.add_argument('--import-id')
+    parser.add_argument('--imported-by')
+    parser.add_argument('--restart', action='store_true')
+    parser.add_argument('--hash-method', default=HASH_METHOD,
+                        help='werkzeug hash method for plaintext passwords, e.g. pbkdf2:sha256:100000')
+    args = parser.parse_args()
+
+    result = import_users(args.path, fmt=args.format, chunk_size=args.chunk_size, workers=args.workers,
+                          import_id=args.import_id, imported_by=args.imported_by, restart=args.restart,
+                          hash_method=args.hash_method)
+    if not result['success']:
+        print(f"Import failed: {result['error']}")
+    else:
+        print(f"Imported {result['imported']['student']} students and {result['imported']['parent']} parents, "
+              f"{result['links']} links, {result['skipped']} rows skipped in {result['seconds']}s")
+    for line_no, error in result['errors'][:50]:
+        print(f"  line {line_no}: {error}")
+    if len(result['errors']) > 50:
+        print(f"  ... and {len(result['errors']) - 50} more")
+    for student_email, parent_email in result['unresolved_links']:
+        print(f"  unresolved link: {student_email} -> {parent_email}")
+    sys.exit(0 if result['success'] else 1)
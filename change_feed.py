@@ -0,0 +1,347 @@
+"""
+Gatepass Change Feed for Hostel Gatepass Management System
+Trigger-recorded gatepass events, polled once per process and fanned out to SSE subscribers
+"""
+
+import json
+import os
+import queue
+import threading
+import time
+from collections import OrderedDict, deque
+
+import db
+import gatepass_counts
+from models import GatepassRow
+
+
+ENABLED = os.environ.get('LIVE_DASHBOARDS', 'on').lower() not in ('0', 'off', 'false', 'no')
+
+POLL_INTERVAL = float(os.environ.get('FEED_POLL_INTERVAL', 0.5))
+BATCH_SIZE = 500
+# Events kept in memory for Last-Event-ID replay; older gaps get a 'reset'
+REPLAY_EVENTS = int(os.environ.get('FEED_REPLAY_EVENTS', 1000))
+# Events kept in the table; older ones are pruned by the poller
+RETAIN_EVENTS = int(os.environ.get('FEED_RETAIN_EVENTS', 10000))
+PRUNE_INTERVAL = 600
+SUBSCRIBER_QUEUE_SIZE = int(os.environ.get('FEED_QUEUE_SIZE', 256))
+KEEPALIVE_SECONDS = 15
+# Streams end after this long and the browser reconnects with Last-Event-ID,
+# so a stream never pins a worker thread indefinitely
+STREAM_SECONDS = float(os.environ.get('FEED_STREAM_SECONDS', 300))
+
+STATUS_COLUMNS = ('parent_approval_status', 'warden_status', 'security_guard_status')
+
+# role -> filter -> status values a row must have to appear on that dashboard view
+# (both dashboards only ever list parent-approved requests)
+VIEWS = {
+    'warden': {
+        'all': {},
+        'pending': {'warden_status': 'Open'},
+        'history': {'warden_status': 'Closed'},
+    },
+    'security': {
+        'all': {},
+        'checkout': {'security_guard_status': 'Pending'},
+        'checkin': {'security_guard_status': 'Out'},
+        'completed': {'security_guard_status': 'In'},
+    },
+}
+
+_COUNTS = {
+    'warden': gatepass_counts.warden_counts,
+    'security': gatepass_counts.security_counts,
+}
+
+
+def install(cur):
+    """Create gatepass_events and the triggers that append to it (idempotent)"""
+    cur.execute('''
+        CREATE TABLE IF NOT EXISTS gatepass_events (
+            event_id INTEGER PRIMARY KEY AUTOINCREMENT,
+            request_id INTEGER NOT NULL,
+            kind VARCHAR(10) NOT NULL,
+            parent_approval_status VARCHAR(20),
+            warden_status VARCHAR(20),
+            security_guard_status VARCHAR(20),
+            created_at INTEGER NOT NULL DEFAULT (CAST(strftime('%s', 'now') AS INTEGER))
+        )
+    ''')
+    cur.execute('DROP TRIGGER IF EXISTS gatepass_events_insert')
+    cur.execute('DROP TRIGGER IF EXISTS gatepass_events_update')
+    cur.execute('''
+        CREATE TRIGGER gatepass_events_insert AFTER INSERT ON gatepass_requests
+        BEGIN
+            INSERT INTO gatepass_events (request_id, kind, parent_approval_status, warden_status, security_guard_status)
+            VALUES (NEW.request_id, 'created', NEW.parent_approval_status, NEW.warden_status, NEW.security_guard_status);
+        END
+    ''')
+    cur.execute('''
+        CREATE TRIGGER gatepass_events_update
+        AFTER UPDATE OF parent_approval_status, warden_status, security_guard_status ON gatepass_requests
+        WHEN OLD.parent_approval_status IS NOT NEW.parent_approval_status
+          OR OLD.warden_status IS NOT NEW.warden_status
+          OR OLD.security_guard_status IS NOT NEW.security_guard_status
+        BEGIN
+            INSERT INTO gatepass_events (request_id, kind, parent_approval_status, warden_status, security_guard_status)
+            VALUES (NEW.request_id, 'updated', NEW.parent_approval_status, NEW.warden_status, NEW.security_guard_status);
+        END
+    ''')
+
+
+def in_view(event, role, filter_type):
+    """True if the event's row belongs on the given dashboard view"""
+    if event['parent_approval_status'] != 'Approved':
+        return False
+    return all(event[column] == value for column, value in VIEWS[role][filter_type].items())
+
+
+class Subscriber:
+    """One SSE client: a bounded queue of events for a single role and filter"""
+
+    def __init__(self, role, filter_type):
+        self.role = role
+        self.filter_type = filter_type
+        self.queue = queue.Queue(SUBSCRIBER_QUEUE_SIZE)
+        # Set when the client fell too far behind; it must reload the page
+        self.overflowed = False
+
+    def offer(self, event):
+        try:
+            self.queue.put_nowait(event)
+        except queue.Full:
+            self.overflowed = True
+
+    def get(self, timeout):
+        """Next event, or None after `timeout` seconds"""
+        try:
+            return self.queue.get(timeout=timeout)
+        except queue.Empty:
+            return None
+
+
+class ChangeFeed:
+    """
+    Per-process reader of gatepass_events
+
+    A single poller thread checks PRAGMA data_version (which only changes
+    when some connection commits) and, when it has, reads every new event
+    with one joined query plus one badge-count lookup per batch. Events are
+    then handed to each subscriber whose role cares, so the database cost
+    is the same for one open dashboard or a hundred.
+    """
+
+    def __init__(self, poll_interval=POLL_INTERVAL):
+        self.poll_interval = poll_interval
+        self.pid = None
+        self.last_event_id = 0
+        self._recent = deque(maxlen=REPLAY_EVENTS)
+        self._subscribers = set()
+        self._lock = threading.Lock()
+        self._thread = None
+        self._started = threading.Event()
+        self._fragments = OrderedDict()
+        self._fragments_lock = threading.Lock()
+
+        # Statistics
+        self.polls = 0
+        self.events = 0
+        self.dropped_subscribers = 0
+
+    def ensure_started(self):
+        """Start this process's poller on first use (again in a forked child)"""
+        with self._lock:
+            if self._thread is not None and self.pid == os.getpid():
+                return
+            self.pid = os.getpid()
+            self._started.clear()
+            self._subscribers = set()
+            self._recent.clear()
+            self._thread = threading.Thread(target=self._run, name='gatepass-change-feed', daemon=True)
+            self._thread.start()
+        self._started.wait(timeout=5)
+
+    def subscribe(self, role, filter_type, last_event_id=None):
+        """
+        Register a subscriber, replaying events after last_event_id if still buffered
+
+        Returns:
+            tuple: (Subscriber, replay ok) - replay is False when the client
+                   missed events that are no longer buffered and must reload
+        """
+        self.ensure_started()
+        subscriber = Subscriber(role, filter_type)
+        with self._lock:
+            replay_ok = True
+            if last_event_id is not None and last_event_id < self.last_event_id:
+                if not self._recent or self._recent[0]['event_id'] > last_event_id + 1:
+                    replay_ok = False
+                else:
+                    for event in self._recent:
+                        if event['event_id'] > last_event_id and self._relevant(event):
+                            subscriber.offer(event)
+            self._subscribers.add(subscriber)
+        return subscriber, replay_ok
+
+    def position(self):
+        """Latest event this process has seen; dashboards pass it on so no event is missed"""
+        self.ensure_started()
+        return self.last_event_id
+
+    def unsubscribe(self, subscriber):
+        with self._lock:
+            self._subscribers.discard(subscriber)
+
+    @staticmethod
+    def _relevant(event):
+        # Approval is final, so events for requests that aren't approved can
+        # never add or change a row on the warden or security dashboards
+        return event['parent_approval_status'] == 'Approved'
+
+    def fragment(self, key, render):
+        """
+        render() memoized by key across subscribers
+
+        Lets the first subscriber of a view render an event's row and every
+        other subscriber of that view reuse the result.
+        """
+        with self._fragments_lock:
+            if key in self._fragments:
+                return self._fragments[key]
+        html = render()
+        with self._fragments_lock:
+            self._fragments[key] = html
+            while len(self._fragments) > REPLAY_EVENTS * 4:
+                self._fragments.popitem(last=False)
+        return html
+
+    def _fetch(self, cur, after_id):
+        cur.execute('''
+            SELECT e.event_id, e.request_id, e.kind,
+                   e.parent_approval_status, e.warden_status, e.security_guard_status,
+                   r.student_id, s.name, r.date_time_out, r.duration_hours, r.destination, r.purpose
+            FROM gatepass_events e
+            LEFT JOIN gatepass_requests r ON r.request_id = e.request_id
+            LEFT JOIN students s ON s.student_id = r.student_id
+            WHERE e.event_id > ?
+            ORDER BY e.event_id
+            LIMIT ?
+        ''', (after_id, BATCH_SIZE))
+        return cur.fetchall()
+
+    def _publish(self, cur, rows):
+        counts = {role: fn(cur) for role, fn in _COUNTS.items()}
+        events = []
+        for row in rows:
+            event = dict(zip(('event_id', 'request_id', 'kind') + STATUS_COLUMNS, row[:6]))
+            # The statuses come from the event itself, so a burst of changes to
+            # one request is replayed in order; the rest is the row as it is now
+            event['row'] = GatepassRow(
+                request_id=row[1], student_id=row[6], student_name=row[7], date_time_out=row[8],
+                duration_hours=row[9], destination=row[10], purpose=row[11],
+                **dict(zip(STATUS_COLUMNS, row[3:6])))
+            event['counts'] = counts
+            events.append(event)
+
+        with self._lock:
+            self._recent.extend(events)
+            self.last_event_id = events[-1]['event_id']
+            self.events += len(events)
+            subscribers = list(self._subscribers)
+        relevant = [event for event in events if self._relevant(event)]
+        for subscriber in subscribers:
+            for event in relevant:
+                subscriber.offer(event)
+            if subscriber.overflowed:
+                self.dropped_subscribers += 1
+                self.unsubscribe(subscriber)
+
+    def _prune(self, cur, conn):
+        cur.execute('DELETE FROM gatepass_events WHERE event_id <= ?', (self.last_event_id - RETAIN_EVENTS,))
+        conn.commit()
+
+    def _run(self):
+        conn = db.get_db_connection()
+        cur = conn.cursor()
+        cur.execute('SELECT COALESCE(MAX(event_id), 0) FROM gatepass_events')
+        with self._lock:
+            self.last_event_id = cur.fetchone()[0]
+        self._started.set()
+
+        data_version = None
+        next_prune = time.monotonic() + PRUNE_INTERVAL
+        while True:
+            try:
+                cur.execute('PRAGMA data_version')
+                version = cur.fetchone()[0]
+                if version != data_version:
+                    data_version = version
+                    self.polls += 1
+                    rows = self._fetch(cur, self.last_event_id)
+                    while rows:
+                        self._publish(cur, rows)
+                        rows = self._fetch(cur, self.last_event_id) if len(rows) == BATCH_SIZE else []
+                if time.monotonic() >= next_prune:
+                    next_prune = time.monotonic() + PRUNE_INTERVAL
+                    self._prune(cur, conn)
+            except Exception as e:
+                print(f"Change feed poll failed: {e}")
+                conn.rollback()
+            time.sleep(self.poll_interval)
+
+
+def format_sse(event_name, data, event_id=None):
+    """One Server-Sent Events message"""
+    lines = []
+    if event_id is not None:
+        lines.append(f'id: {event_id}')
+    lines.append(f'event: {event_name}')
+    lines.append(f'data: {json.dumps(data, separators=(",", ":"))}')
+    return '\n'.join(lines) + '\n\n'
+
+
+def stream(subscriber, replay_ok, render_row, stream_seconds=STREAM_SECONDS):
+    """
+    Generator of SSE messages for one subscriber
+
+    Args:
+        subscriber: From feed.subscribe()
+        replay_ok: False to tell the client to reload straight away
+        render_row: render_row(event) -> HTML for the event's row in this view
+
+    Yields:
+        str: SSE messages ('gatepass' patches, 'reset', or keepalive comments)
+    """
+    try:
+        if not replay_ok:
+            yield format_sse('reset', {})
+            return
+        # Tell EventSource to wait a moment before reconnecting after a reset
+        yield 'retry: 2000\n\n'
+        deadline = time.monotonic() + stream_seconds
+        role, filter_type = subscriber.role, subscriber.filter_type
+        while True:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                return
+            event = subscriber.get(timeout=min(KEEPALIVE_SECONDS, remaining))
+            if subscriber.overflowed:
+                yield format_sse('reset', {})
+                return
+            if event is None:
+                yield ': keepalive\n\n'
+                continue
+            visible = in_view(event, role, filter_type)
+            yield format_sse('gatepass', {
+                'request_id': event['request_id'],
+                'kind': event['kind'],
+                'in_view': visible,
+                'html': feed.fragment((event['event_id'], role, filter_type),
+                                      lambda: render_row(event)) if visible else None,
+                'counts': event['counts'][role],
+            }, event_id=event['event_id'])
+    finally:
+        feed.unsubscribe(subscriber)
+
+
+feed = ChangeFeed()
@@ -0,0 +1,123 @@
+"""
+Data Versions for Hostel Gatepass Management System
+Trigger-bumped change counters that let dashboards answer conditional GETs with 304
+"""
+
+import hashlib
+import os
+
+
+# Scopes in data_versions, each bumped whenever something its dashboards show changes:
+#   ('database',      '')            random epoch chosen at install, so counters
+#                                    restarted by db_init.py never repeat an old ETag
+#   ('student',       student_id)    student_dashboard
+#   ('parent',        parent_email)  parent_dashboard
+#   ('approved',      '')            warden/security dashboards (rows approved before or after the change)
+#   ('registrations', '')            pending_registrations (the warden's badge)
+EPOCH_SCOPE = ('database', '')
+
+_BUMP = '''
+            INSERT INTO data_versions (scope, scope_key, version)
+            {source}
+            ON CONFLICT (scope, scope_key) DO UPDATE SET version = version + 1;'''
+
+
+def _gatepass_bumps(rows):
+    """Trigger body statements bumping every scope the given rows (NEW/OLD) belong to"""
+    statements = []
+    for scope, column in (('student', 'student_id'), ('parent', 'parent_email')):
+        # UNION collapses OLD and NEW when they share a scope, so it's bumped once
+        keys = ' UNION '.join(f"SELECT COALESCE({row}.{column}, '') AS scope_key" for row in rows)
+        statements.append(f"SELECT '{scope}', scope_key, 1 FROM ({keys}) WHERE true")
+    approved = ' OR '.join(f"{row}.parent_approval_status = 'Approved'" for row in rows)
+    statements.append(f"SELECT 'approved', '', 1 WHERE {approved}")
+    return ''.join(_BUMP.format(source=source) for source in statements)
+
+
+def install(cur):
+    """Create data_versions and the triggers that bump it (idempotent)"""
+    cur.execute('''
+        CREATE TABLE IF NOT EXISTS data_versions (
+            scope VARCHAR(20) NOT NULL,
+            scope_key VARCHAR(100) NOT NULL,
+            version INTEGER NOT NULL DEFAULT 0,
+            PRIMARY KEY (scope, scope_key)
+        ) WITHOUT ROWID
+    ''')
+    cur.execute('''
+        INSERT OR IGNORE INTO data_versions (scope, scope_key, version)
+        VALUES (?, ?, abs(random()))
+    ''', EPOCH_SCOPE)
+
+    for table, event in (('gatepass_requests', 'insert'), ('gatepass_requests', 'update'),
+                         ('gatepass_requests', 'delete'), ('pending_registrations', 'insert'),
+                         ('pending_registrations', 'update'), ('pending_registrations', 'delete')):
+        cur.execute(f'DROP TRIGGER IF EXISTS data_versions_{table}_{event}')
+
+    # Any column may be on screen, so every UPDATE counts, not just status changes
+    cur.execute(f'''
+        CREATE TRIGGER data_versions_gatepass_requests_insert AFTER INSERT ON gatepass_requests
+        BEGIN{_gatepass_bumps(('NEW',))}
+        END
+    ''')
+    cur.execute(f'''
+        CREATE TRIGGER data_versions_gatepass_requests_update AFTER UPDATE ON gatepass_requests
+        BEGIN{_gatepass_bumps(('OLD', 'NEW'))}
+        END
+    ''')
+    cur.execute(f'''
+        CREATE TRIGGER data_versions_gatepass_requests_delete AFTER DELETE ON gatepass_requests
+        BEGIN{_gatepass_bumps(('OLD',))}
+        END
+    ''')
+    registrations = _BUMP.format(source="VALUES ('registrations', '', 1)")
+    for event in ('INSERT', 'UPDATE', 'DELETE'):
+        cur.execute(f'''
+            CREATE TRIGGER data_versions_pending_registrations_{event.lower()}
+            AFTER {event} ON pending_registrations
+            BEGIN{registrations}
+            END
+        ''')
+
+
+def current(cur, scopes):
+    """
+    Current versions of the given scopes, in one indexed lookup
+
+    Args:
+        cur: Database cursor
+        scopes: Iterable of (scope, scope_key) pairs
+
+    Returns:
+        tuple: The database epoch followed by each scope's version (0 if never bumped)
+    """
+    scopes = [EPOCH_SCOPE] + [(scope, str(key)) for scope, key in scopes]
+    clauses = ' OR '.join('(scope = ? AND scope_key = ?)' for _ in scopes)
+    cur.execute(f'SELECT scope, scope_key, version FROM data_versions WHERE {clauses}',
+                [value for pair in scopes for value in pair])
+    found = {(scope, scope_key): version for scope, scope_key, version in cur.fetchall()}
+    return tuple(found.get(pair, 0) for pair in scopes)
+
+
+def _code_version():
+    """Identifies the deployed templates and code, so a redeploy invalidates old ETags"""
+    configured = os.environ.get('APP_VERSION')
+    if configured:
+        return configured
+    root = os.path.dirname(os.path.abspath(__file__))
+    stamps = []
+    for directory, _, files in os.walk(os.path.join(root, 'templates')):
+        for name in sorted(files):
+            path = os.path.join(directory, name)
+            stamps.append(f'{os.path.relpath(path, root)}:{os.stat(path).st_mtime_ns}')
+    stamps.append(f"app.py:{os.stat(os.path.join(root, 'app.py')).st_mtime_ns}")
+    return hashlib.sha1('\n'.join(sorted(stamps)).encode('utf-8')).hexdigest()[:12]
+
+
+CODE_VERSION = _code_version()
+
+
+def make_etag(*parts):
+    """Opaque ETag value (unquoted) for a page determined entirely by `parts` and the code version"""
+    key = '\x1f'.join(str(part) for part in (CODE_VERSION,) + parts)
+    return hashlib.sha1(key.encode('utf-8')).hexdigest()[:20]
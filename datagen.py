@@ -0,0 +1,334 @@
+"""
+Synthetic Data Generator for Hostel Gatepass Management System
+Builds load-scale databases (tens of thousands of users, millions of requests)
+
+Usage:
+    python datagen.py --db gatepass_large.db --students 20000 --requests 2000000 --years 3
+
+The demo accounts from db_init.py are always included, and every generated
+account uses the same password (college123). Output is reproducible for a
+given --seed and --now.
+"""
+
+import argparse
+import os
+import random
+import sys
+import time
+
+from werkzeug.security import generate_password_hash
+
+import db
+import db_init
+import migrations
+import timestamps
+
+
+BATCH_SIZE = 50000
+
+FIRST_NAMES = (
+    'Aarav', 'Aditi', 'Akash', 'Ananya', 'Arjun', 'Deepika', 'Divya', 'Gaurav', 'Harsh', 'Ishita',
+    'Karan', 'Kavya', 'Manish', 'Meera', 'Neha', 'Nikhil', 'Pooja', 'Pranav', 'Priya', 'Rahul',
+    'Riya', 'Rohan', 'Sakshi', 'Sanjay', 'Shreya', 'Siddharth', 'Sneha', 'Tanvi', 'Varun', 'Vikram',
+)
+LAST_NAMES = (
+    'Agarwal', 'Bose', 'Chopra', 'Das', 'Desai', 'Gupta', 'Iyer', 'Jain', 'Joshi', 'Kapoor',
+    'Kumar', 'Mehta', 'Menon', 'Mishra', 'Nair', 'Patel', 'Rao', 'Reddy', 'Saxena', 'Shah',
+    'Sharma', 'Singh', 'Sinha', 'Verma', 'Yadav',
+)
+PARENT_FIRST_NAMES = {
+    'Father': ('Anil', 'Ashok', 'Dinesh', 'Mahesh', 'Mukesh', 'Rajesh', 'Ramesh', 'Sunil', 'Suresh', 'Vijay'),
+    'Mother': ('Anita', 'Geeta', 'Kavita', 'Lata', 'Meena', 'Nisha', 'Rekha', 'Seema', 'Sunita', 'Usha'),
+}
+CITIES = (
+    'Mumbai, Maharashtra', 'Delhi, NCR', 'Bengaluru, Karnataka', 'Chennai, Tamil Nadu', 'Kolkata, West Bengal',
+    'Hyderabad, Telangana', 'Pune, Maharashtra', 'Ahmedabad, Gujarat', 'Jaipur, Rajasthan', 'Lucknow, UP',
+)
+COURSES = (
+    'Computer Science', 'Information Technology', 'Electronics', 'Electrical Engineering',
+    'Mechanical', 'Civil Engineering', 'Chemical Engineering', 'Biotechnology',
+)
+HOSTEL_BLOCKS = ('Block A', 'Block B', 'Block C', 'Block D', 'Block E', 'Block F')
+ROOMS_PER_FLOOR = 40
+FLOORS = 5
+
+# (destination, purpose, duration_hours choices, relative frequency)
+OUTINGS = (
+    ('City Market', 'Shopping for essentials', (2, 3, 4), 30),
+    ('Home', 'Weekend visit home', (24, 48, 72), 18),
+    ('Home', 'Festival holidays', (72, 96, 120), 4),
+    ('City Hospital', 'Medical appointment', (2, 3, 4, 6), 8),
+    ('Railway Station', 'Picking up family', (2, 3), 5),
+    ('Mall', 'Movie and dinner with friends', (4, 5, 6), 15),
+    ("Relative's house", 'Family function', (12, 24, 48), 7),
+    ('Bank', 'Bank work', (2, 3), 5),
+    ('Coaching Centre', 'Exam coaching class', (3, 4), 6),
+    ('Sports Complex', 'Inter-college tournament', (6, 8, 12), 2),
+)
+
+# Relative request volume by hour of day and by weekday (Monday = 0)
+HOUR_WEIGHTS = (0.05, 0.02, 0.01, 0.01, 0.02, 0.1, 0.4, 0.8, 1.4, 1.6, 1.5, 1.3,
+                1.2, 1.2, 1.3, 1.5, 1.7, 1.8, 1.6, 1.2, 0.8, 0.5, 0.2, 0.1)
+WEEKDAY_WEIGHTS = (0.8, 0.8, 0.8, 0.9, 1.5, 1.6, 1.0)
+
+EXPIRY_SECONDS = 3600
+
+
+def _activity_table():
+    """Per hour-of-week activity, scaled so its mean is 1"""
+    table = [WEEKDAY_WEIGHTS[h // 24] * HOUR_WEIGHTS[h % 24] for h in range(168)]
+    mean = sum(table) / len(table)
+    return [weight / mean for weight in table]
+
+
+def _phone(rng):
+    return str(rng.choice('6789')) + ''.join(rng.choice('0123456789') for _ in range(9))
+
+
+def _user_rows(rng, count, first_id, password_hash):
+    """Generated student and parent rows, student i paired with parent i"""
+    students, parents = [], []
+    for number in range(first_id, first_id + count):
+        last = rng.choice(LAST_NAMES)
+        student_name = f"{rng.choice(FIRST_NAMES)} {last}"
+        block = rng.randrange(len(HOSTEL_BLOCKS))
+        room = f"{HOSTEL_BLOCKS[block][-1]}-{rng.randint(1, FLOORS)}{rng.randint(1, ROOMS_PER_FLOOR):02d}"
+        students.append((
+            f"STU{number:03d}", student_name, password_hash,
+            f"{student_name.lower().replace(' ', '.')}.{number}@student.edu", _phone(rng),
+            HOSTEL_BLOCKS[block], room, rng.choice(COURSES), rng.randint(1, 4),
+        ))
+
+        relationship = 'Father' if rng.random() < 0.6 else 'Mother'
+        parent_name = f"{rng.choice(PARENT_FIRST_NAMES[relationship])} {last}"
+        parents.append((
+            f"PAR{number:03d}", parent_name, password_hash,
+            f"{parent_name.lower().replace(' ', '.')}.{number}@gmail.com", _phone(rng),
+            relationship, rng.choice(CITIES),
+        ))
+    return students, parents
+
+
+def _arrival_times(rng, count, start, end):
+    """
+    Yield `count` ascending epochs in [start, end) following the activity curve
+
+    Exactly `count` arrivals of a Poisson process are i.i.d. with density
+    proportional to activity, so this draws their order statistics one at a
+    time in "activity time" (the running minimum of the uniforms left) and
+    maps each back to wall-clock time hour by hour. Memory use is constant.
+    """
+    activity = _activity_table()
+    offset = int(timestamps.from_epoch(end).utcoffset().total_seconds())
+
+    def weight(hour_start):
+        # Weekday/hour in local time; the epoch began on a Thursday
+        return activity[((hour_start + offset) // 3600 + 72) % 168]
+
+    start -= start % 3600
+    end -= end % 3600
+    total = sum(weight(hour_start) for hour_start in range(start, end, 3600))
+
+    position = 0.0
+    hour_start, hour_weight, consumed = start, weight(start), 0.0
+    for remaining in range(count, 0, -1):
+        position += (1.0 - position) * (1.0 - rng.random() ** (1.0 / remaining))
+        target = position * total
+        while target > consumed + hour_weight and hour_start + 3600 < end:
+            consumed += hour_weight
+            hour_start += 3600
+            hour_weight = weight(hour_start)
+        yield hour_start + min(int((target - consumed) / hour_weight * 3600), 3599)
+
+
+def _request_rows(rng, count, students, parent_emails, start, end, now):
+    """
+    Yield gatepass_requests rows in created_at order
+
+    Arrivals follow the hour-of-week activity curve; some students go out far
+    more often than others. Statuses follow what the app would have
+    done by `now`: recent requests are still pending, older ones were
+    approved, rejected or expired, and approved outings were checked out and
+    back in by security and closed by a warden.
+    """
+    # Capped so the busiest students make ~10x the average number of requests
+    weights = [min(rng.paretovariate(1.5), 10.0) for _ in students]
+    cum_weights, total = [], 0.0
+    for weight in weights:
+        total += weight
+        cum_weights.append(total)
+
+    outing_weights = [outing[3] for outing in OUTINGS]
+    arrivals = _arrival_times(rng, count, start, end)
+    remaining = count
+    while remaining:
+        batch = min(BATCH_SIZE, remaining)
+        remaining -= batch
+        picked = rng.choices(range(len(students)), cum_weights=cum_weights, k=batch)
+        outings = rng.choices(OUTINGS, weights=outing_weights, k=batch)
+
+        for student_index, (destination, purpose, durations, _) in zip(picked, outings):
+            created_at = next(arrivals)
+
+            duration_hours = rng.choice(durations)
+            date_time_out = created_at + rng.randint(1, 48) * 1800
+            expiry_timestamp = created_at + EXPIRY_SECONDS
+            returned_at = date_time_out + duration_hours * 3600
+
+            approval_timestamp = None
+            warden_status, security_status = 'Open', 'Pending'
+            if now < expiry_timestamp and rng.random() < 0.6:
+                parent_status = 'Pending'
+            else:
+                roll = rng.random()
+                if roll < 0.72:
+                    parent_status = 'Approved'
+                elif roll < 0.84:
+                    parent_status = 'Rejected'
+                else:
+                    parent_status = 'Expired'
+                if parent_status != 'Expired':
+                    approval_timestamp = min(created_at + rng.randint(60, EXPIRY_SECONDS - 60), now)
+
+            if parent_status == 'Approved' and date_time_out <= now:
+                roll = rng.random()
+                if returned_at > now:
+                    security_status = 'Out' if roll < 0.9 else 'Pending'
+                elif roll < 0.95:
+                    security_status = 'In'
+                    warden_status = 'Closed' if rng.random() < 0.9 else 'Open'
+                elif roll < 0.98:
+                    security_status = 'Out'    # overdue
+                elif rng.random() < 0.5:
+                    warden_status = 'Closed'   # outing cancelled
+
+            yield (
+                students[student_index], parent_emails[student_index], date_time_out, duration_hours,
+                destination, purpose, parent_status, approval_timestamp, created_at, expiry_timestamp,
+                warden_status, security_status,
+            )
+
+
+def generate(db_path, students=20000, requests=2000000, years=3, seed=42, now=None, verbose=True):
+    """
+    Build a fresh database at db_path filled with synthetic users and requests
+
+    The base schema comes from db_init.create_tables(); rows are bulk-inserted
+    before migrations.migrate() builds indexes, triggers and derived tables,
+    which is much faster than maintaining them row by row.
+
+    Args:
+        db_path: Database file to (re)build; existing tables are dropped
+        students: Generated students; each gets one parent
+        requests: Gatepass requests to generate
+        years: Span of request history, ending at `now`
+        seed: Random seed
+        now: Epoch treated as the current time (default: time.time())
+        verbose: Print progress
+
+    Returns:
+        dict: Row counts, schema version and elapsed seconds
+    """
+    rng = random.Random(seed)
+    now = int(now or time.time())
+    start = now - int(years * 365.25 * 86400)
+    started = time.perf_counter()
+
+    def progress(message):
+        if verbose:
+            print(f"[{time.perf_counter() - started:6.1f}s] {message}")
+
+    os.environ['DATABASE_PATH'] = db_path
+    conn = db.get_db_connection()
+    cur = conn.cursor()
+    try:
+        # A throwaway fixture does not need to survive a power cut while loading
+        cur.execute('PRAGMA synchronous = OFF')
+        db_init.create_tables(cur)
+        db_init.seed_demo_data(cur)
+
+        password_hash = generate_password_hash('college123')
+        # Demo accounts occupy the first few IDs
+        cur.execute('SELECT COUNT(*) FROM students')
+        first_id = cur.fetchone()[0] + 1
+
+        student_rows, parent_rows = _user_rows(rng, students, first_id, password_hash)
+        cur.executemany('''
+            INSERT INTO students (student_id, name, password_hash, email, phone,
+                                  hostel_block, room_number, course, year_of_study)
+            VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)
+        ''', student_rows)
+        cur.executemany('''
+            INSERT INTO parents (parent_id, name, password_hash, email, phone, relationship, address)
+            VALUES (?, ?, ?, ?, ?, ?, ?)
+        ''', parent_rows)
+        cur.executemany('INSERT INTO student_parent_links (student_id, parent_id) VALUES (?, ?)',
+                        [(s[0], p[0]) for s, p in zip(student_rows, parent_rows)])
+
+        cur.executemany('''
+            INSERT INTO wardens (warden_id, name, password_hash, email, phone, hostel_block, designation)
+            VALUES (?, ?, ?, ?, ?, ?, ?)
+        ''', [(f"WAR{100 + i:03d}", f"Warden {block}", password_hash, f"warden.{i}@college.edu",
+               _phone(rng), block, 'Block Warden') for i, block in enumerate(HOSTEL_BLOCKS)])
+        conn.commit()
+        progress(f"{students} students and parents")
+
+        student_ids = [row[0] for row in student_rows]
+        parent_emails = [row[3] for row in parent_rows]
+        rows = _request_rows(rng, requests, student_ids, parent_emails, start, now, now)
+        inserted = 0
+        while inserted < requests:
+            batch = [row for _, row in zip(range(BATCH_SIZE), rows)]
+            if not batch:
+                break
+            cur.executemany('''
+                INSERT INTO gatepass_requests
+                (student_id, parent_email, date_time_out, duration_hours, destination, purpose,
+                 parent_approval_status, parent_approval_timestamp, created_at, expiry_timestamp,
+                 warden_status, security_guard_status)
+                VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+            ''', batch)
+            conn.commit()
+            inserted += len(batch)
+            if inserted % (BATCH_SIZE * 10) == 0 or inserted == requests:
+                progress(f"{inserted} gatepass requests")
+
+        cur.execute('PRAGMA synchronous = NORMAL')
+        cur.close()
+        version = migrations.migrate(conn)
+        progress(f"migrated to schema version {version}")
+    finally:
+        conn.close()
+
+    return {
+        'students': students,
+        'parents': students,
+        'requests': inserted,
+        'schema_version': version,
+        'seconds': round(time.perf_counter() - started, 1),
+    }
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Generate a load-scale gatepass database')
+    parser.add_argument('--db', default='gatepass_large.db')
+    parser.add_argument('--students', type=int, default=20000)
+    parser.add_argument('--requests', type=int, default=2000000)
+    parser.add_argument('--years', type=float, default=3)
+    parser.add_argument('--seed', type=int, default=42)
+    parser.add_argument('--now', type=int, help='Epoch to treat as the current time')
+    parser.add_argument('--force', action='store_true', help='Overwrite an existing database')
+    args = parser.parse_args()
+
+    if os.path.exists(args.db):
+        if not args.force:
+            print(f"{args.db} already exists (use --force to overwrite it)")
+            sys.exit(1)
+        for suffix in ('', '-wal', '-shm'):
+            if os.path.exists(args.db + suffix):
+                os.remove(args.db + suffix)
+
+    result = generate(args.db, students=args.students, requests=args.requests,
+                      years=args.years, seed=args.seed, now=args.now)
+    print(f"Generated {result['students']} students, {result['parents']} parents and "
+          f"{result['requests']} requests in {result['seconds']}s")
@@ -0,0 +1,251 @@
+"""
+Shared SQLite connection pool for Hostel Gatepass Management System
+Hands out pre-tuned connections so routes don't pay for sqlite3.connect on every call
+"""
+
+import os
+import queue
+import sqlite3
+import threading
+import time
+import weakref
+
+# Registers the datetime adapter and TIMESTAMP converter used by every connection
+import timestamps  # noqa: F401
+import sql_instrumentation
+
+
+# Pragmas applied once when a pooled connection is opened
+DEFAULT_PRAGMAS = (
+    ('journal_mode', 'WAL'),
+    ('synchronous', 'NORMAL'),
+    ('busy_timeout', int(os.environ.get('DB_BUSY_TIMEOUT_MS', 5000))),
+    ('mmap_size', int(os.environ.get('DB_MMAP_SIZE', 256 * 1024 * 1024))),
+    # Negative cache_size is in KiB rather than pages
+    ('cache_size', -int(os.environ.get('DB_CACHE_KB', 16 * 1024))),
+    ('temp_store', 'MEMORY'),
+)
+
+
+# Callables run on every newly opened pooled connection (see add_connect_hook)
+_connect_hooks = []
+
+
+def add_connect_hook(hook):
+    """
+    Run hook(conn) on each connection the pools open from now on
+
+    Used by benchmarks and instrumentation to install trace callbacks
+    without wrapping get_db_connection().
+    """
+    _connect_hooks.append(hook)
+
+
+def get_db_path():
+    # Use SQLite for easier development setup
+    return os.environ.get('DATABASE_PATH', 'gatepass.db')
+
+
+class PooledConnection(sqlite3.Connection):
+    """
+    sqlite3 connection whose close() hands it back to the pool it came from
+    instead of closing the underlying database handle
+    """
+
+    pool = None
+
+    def cursor(self, factory=None):
+        return super().cursor(factory or sql_instrumentation.cursor_factory())
+
+    # sqlite3's execute shortcuts don't go through cursor(), so route them
+    # there to keep every statement on an instrumented cursor
+    def execute(self, sql, parameters=()):
+        return self.cursor().execute(sql, parameters)
+
+    def executemany(self, sql, seq_of_parameters):
+        return self.cursor().executemany(sql, seq_of_parameters)
+
+    def close(self):
+        if self.pool is None:
+            super().close()
+        else:
+            self.pool.release(self)
+
+    def really_close(self):
+        super().close()
+
+
+class ConnectionPool:
+    """
+    Thread-safe pool of SQLite connections for a single process
+
+    Connections are created lazily up to max_size. Callers that find the pool
+    exhausted block until a connection is released, and the time spent waiting
+    is recorded so it can be reported alongside checkout counts.
+    """
+
+    def __init__(self, db_path, max_size=8, timeout=10.0, pragmas=DEFAULT_PRAGMAS):
+        self.db_path = db_path
+        self.max_size = max_size
+        self.timeout = timeout
+        self.pragmas = pragmas
+        self.pid = os.getpid()
+
+        self._idle = queue.LifoQueue()
+        self._lock = threading.Lock()
+        self._created = 0
+
+        # Statistics
+        self.checkouts = 0
+        self.waits = 0
+        self.wait_seconds = 0.0
+        self.max_wait_seconds = 0.0
+
+    def _connect(self):
+        conn = sqlite3.connect(self.db_path, factory=PooledConnection,
+                               detect_types=sqlite3.PARSE_DECLTYPES,
+                               check_same_thread=False)
+        for name, value in self.pragmas:
+            conn.execute(f'PRAGMA {name} = {value}')
+        for hook in _connect_hooks:
+            hook(conn)
+        conn.pool = self
+        # If a checked-out connection is dropped without close(), free its slot
+        conn.finalizer = weakref.finalize(conn, self._forget)
+        return conn
+
+    def _forget(self):
+        with self._lock:
+            self._created -= 1
+
+    def _discard(self, conn):
+        conn.pool = None
+        conn.finalizer.detach()
+        conn.really_close()
+        self._forget()
+
+    def acquire(self, row_factory=None):
+        """
+        Check a connection out of the pool
+
+        Args:
+            row_factory: Row factory to install for this checkout (None for tuples)
+
+        Returns:
+            PooledConnection: Call close() on it to return it to the pool
+        """
+        try:
+            conn = self._idle.get_nowait()
+        except queue.Empty:
+            conn = None
+            with self._lock:
+                if self._created < self.max_size:
+                    self._created += 1
+                    create = True
+                else:
+                    create = False
+
+            if create:
+                try:
+                    conn = self._connect()
+                except Exception:
+                    self._forget()
+                    raise
+            else:
+                started = time.perf_counter()
+                try:
+                    conn = self._idle.get(timeout=self.timeout)
+                except queue.Empty:
+                    raise sqlite3.OperationalError(
+                        f'Timed out after {self.timeout}s waiting for a database connection')
+                waited = time.perf_counter() - started
+                with self._lock:
+                    self.waits += 1
+                    self.wait_seconds += waited
+                    self.max_wait_seconds = max(self.max_wait_seconds, waited)
+
+        with self._lock:
+            self.checkouts += 1
+        conn.row_factory = row_factory
+        return conn
+
+    def release(self, conn):
+        """Return a connection to the pool, discarding any uncommitted work"""
+        try:
+            if conn.in_transaction:
+                conn.rollback()
+        except sqlite3.Error:
+            # A broken connection is not worth keeping around
+            self._discard(conn)
+            return
+        conn.row_factory = None
+        self._idle.put(conn)
+
+    def close_all(self):
+        while True:
+            try:
+                conn = self._idle.get_nowait()
+            except queue.Empty:
+                break
+            self._discard(conn)
+
+    def stats(self):
+        with self._lock:
+            return {
+                'db_path': self.db_path,
+                'max_size': self.max_size,
+                'open_connections': self._created,
+                'idle_connections': self._idle.qsize(),
+                'checkouts': self.checkouts,
+                'waits': self.waits,
+                'wait_seconds': self.wait_seconds,
+                'max_wait_seconds': self.max_wait_seconds,
+            }
+
+
+_pool = None
+_pool_lock = threading.Lock()
+
+
+def get_pool():
+    """
+    Return this process's connection pool, creating it on first use
+
+    The pool is rebuilt after a fork (each gunicorn worker gets its own) and
+    whenever DATABASE_PATH changes.
+    """
+    global _pool
+    db_path = get_db_path()
+    pool = _pool
+    if pool is not None and pool.pid == os.getpid() and pool.db_path == db_path:
+        return pool
+
+    with _pool_lock:
+        if _pool is None or _pool.pid != os.getpid() or _pool.db_path != db_path:
+            if _pool is not None and _pool.pid == os.getpid():
+                _pool.close_all()
+            _pool = ConnectionPool(db_path,
+                                   max_size=int(os.environ.get('DB_POOL_SIZE', 8)),
+                                   timeout=float(os.environ.get('DB_POOL_TIMEOUT', 10)))
+        return _pool
+
+
+def get_db_connection(row_factory=None):
+    """
+    Check out a pooled connection; close() returns it to the pool
+
+    Args:
+        row_factory: Optional row factory (e.g. sqlite3.Row) for this checkout
+
+    Returns:
+        PooledConnection: A tuned connection to the gatepass database
+    """
+    return get_pool().acquire(row_factory)
+
+
+def pool_stats():
+    """Statistics for this process's pool (empty dict if none exists yet)"""
+    pool = _pool
+    if pool is None or pool.pid != os.getpid():
+        return {}
+    return pool.stats()
@@ -1,19 +1,16 @@
 import sqlite3
-import os
-from werkzeug.security import generate_password_hash
-from datetime import datetime
+
+import db
+import migrations
+from demo_credentials import DEMO_ACCOUNTS, DEMO_LINKS, DEMO_PASSWORD_HASH
+from user_ids import USER_ID_SOURCES
 
 def get_db_connection():
-    # Use SQLite for easier development setup
-    db_path = os.environ.get('DATABASE_PATH', 'gatepass.db')
-    conn = sqlite3.connect(db_path)
-    conn.row_factory = sqlite3.Row  # Enable column access by name
-    return conn
+    # Shared pool from db.py, with column access by name
+    return db.get_db_connection(row_factory=sqlite3.Row)
 
-def init_database():
-    conn = get_db_connection()
-    cur = conn.cursor()
-    
+def create_tables(cur):
+    """Drop and recreate the base tables at schema version 0 (migrations.py adds the rest)"""
     # Drop tables in correct order (respecting foreign key constraints)
     cur.execute('DROP TABLE IF EXISTS activity_logs')
     cur.execute('DROP TABLE IF EXISTS user_sessions')
@@ -24,6 +21,15 @@ def init_database():
     cur.execute('DROP TABLE IF EXISTS parents')
     cur.execute('DROP TABLE IF EXISTS wardens')
     cur.execute('DROP TABLE IF EXISTS security_guards')
+    cur.execute('DROP TABLE IF EXISTS id_sequences')
+    cur.execute('DROP TABLE IF EXISTS identities')
+    cur.execute('DROP TABLE IF EXISTS import_checkpoints')
+    cur.execute('DROP TABLE IF EXISTS import_links')
+    cur.execute('DROP TABLE IF EXISTS gatepass_events')
+    cur.execute('DROP TABLE IF EXISTS data_versions')
+    
+    # Fresh tables start at schema version 0; migrations are applied at the end
+    cur.execute('PRAGMA user_version = 0')
     
     # Students Table - Enhanced with additional fields
     cur.execute('''
@@ -109,43 +115,6 @@ def init_database():
         )
     ''')
     
-    password_hash = generate_password_hash('college123')
-    
-    # Insert 5 students with Indian names and additional details
-    cur.execute('''
-        INSERT INTO students (student_id, name, password_hash, email, phone, hostel_block, room_number, course, year_of_study) VALUES
-        ('STU001', 'Arjun Kumar', ?, 'arjun.kumar@student.edu', '9876543210', 'Block A', 'A-101', 'Computer Science', 2),
-        ('STU002', 'Priya Sharma', ?, 'priya.sharma@student.edu', '9876543211', 'Block B', 'B-205', 'Electronics', 3),
-        ('STU003', 'Rohit Patel', ?, 'rohit.patel@student.edu', '9876543212', 'Block A', 'A-304', 'Mechanical', 1),
-        ('STU004', 'Sneha Gupta', ?, 'sneha.gupta@student.edu', '9876543213', 'Block C', 'C-102', 'Civil Engineering', 2),
-        ('STU005', 'Vikram Singh', ?, 'vikram.singh@student.edu', '9876543214', 'Block A', 'A-210', 'Information Technology', 4)
-    ''', (password_hash, password_hash, password_hash, password_hash, password_hash))
-    
-    # Insert 5 parents with Indian names and additional details
-    cur.execute('''
-        INSERT INTO parents (parent_id, name, password_hash, email, phone, relationship, address) VALUES
-        ('PAR001', 'Rajesh Kumar', ?, 'rajesh.kumar@gmail.com', '9876543220', 'Father', 'Mumbai, Maharashtra'),
-        ('PAR002', 'Sunita Sharma', ?, 'sunita.sharma@gmail.com', '9876543221', 'Mother', 'Delhi, NCR'),
-        ('PAR003', 'Mahesh Patel', ?, 'mahesh.patel@gmail.com', '9876543222', 'Father', 'Ahmedabad, Gujarat'),
-        ('PAR004', 'Kavita Gupta', ?, 'kavita.gupta@gmail.com', '9876543223', 'Mother', 'Lucknow, UP'),
-        ('PAR005', 'Suresh Singh', ?, 'suresh.singh@gmail.com', '9876543224', 'Father', 'Jaipur, Rajasthan')
-    ''', (password_hash, password_hash, password_hash, password_hash, password_hash))
-    
-    # Insert wardens with Indian names and additional details
-    cur.execute('''
-        INSERT INTO wardens (warden_id, name, password_hash, email, phone, hostel_block, designation) VALUES
-        ('WAR001', 'Dr. Ramesh Verma', ?, 'ramesh.verma@college.edu', '9876543230', 'Block A', 'Chief Warden'),
-        ('WAR002', 'Prof. Meera Joshi', ?, 'meera.joshi@college.edu', '9876543231', 'Block B', 'Assistant Warden')
-    ''', (password_hash, password_hash))
-    
-    # Insert security guards with Indian names and additional details
-    cur.execute('''
-        INSERT INTO security_guards (guard_id, name, password_hash, email, phone, shift, gate_assigned) VALUES
-        ('SEC001', 'Ravi Shankar', ?, 'ravi.shankar@college.edu', '9876543240', 'Day', 'Main Gate'),
-        ('SEC002', 'Mohan Lal', ?, 'mohan.lal@college.edu', '9876543241', 'Night', 'Main Gate'),
-        ('SEC003', 'Deepak Kumar', ?, 'deepak.kumar@college.edu', '9876543242', 'Evening', 'Side Gate')
-    ''', (password_hash, password_hash, password_hash))
-    
     # Student-Parent Relationship Table
     cur.execute('''
         CREATE TABLE student_parent_links (
@@ -227,21 +196,35 @@ def init_database():
             metadata TEXT
         )
     ''')
+
+def seed_demo_data(cur):
+    """Insert the demo accounts (password: college123) and their student-parent links"""
+    for user_type, accounts in DEMO_ACCOUNTS.items():
+        table = USER_ID_SOURCES[user_type][1]
+        columns = list(accounts[0]) + ['password_hash']
+        cur.executemany(f'''
+            INSERT INTO {table} ({', '.join(columns)})
+            VALUES ({', '.join('?' for _ in columns)})
+        ''', [tuple(account.values()) + (DEMO_PASSWORD_HASH,) for account in accounts])
+    
+    cur.executemany('''
+        INSERT INTO student_parent_links (student_id, parent_id) VALUES (?, ?)
+    ''', DEMO_LINKS)
+
+def init_database():
+    conn = get_db_connection()
+    cur = conn.cursor()
     
-    # Insert student-parent relationships
-    cur.execute('''
-        INSERT INTO student_parent_links (student_id, parent_id) VALUES
-        ('STU001', 'PAR001'),
-        ('STU002', 'PAR002'),
-        ('STU003', 'PAR003'),
-        ('STU004', 'PAR004'),
-        ('STU005', 'PAR005')
-    ''')
+    create_tables(cur)
+    seed_demo_data(cur)
     
     conn.commit()
     cur.close()
+    
+    # Indexes and later schema changes live in migrations.py
+    version = migrations.migrate(conn)
     conn.close()
-    print("Database initialized successfully!")
+    print(f"Database initialized successfully! (schema version {version})")
 
 if __name__ == '__main__':
     init_database()
@@ -0,0 +1,72 @@
+"""
+Demo Credentials for Hostel Gatepass Management System
+Demo accounts and their precomputed password hash, shared by db_init.py and the in-memory backend
+"""
+
+import os
+
+
+DEMO_PASSWORD = 'college123'
+
+# generate_password_hash(DEMO_PASSWORD), computed once ahead of time: hashing
+# it for every demo account on import cost each serverless cold start a
+# second or more of KDF work before the first byte was served
+DEMO_PASSWORD_HASH = os.environ.get(
+    'DEMO_PASSWORD_HASH',
+    'pbkdf2:sha256:600000$acBlIQ3AzmeqAGeX$'
+    '05a2c13ca4c35550ead78cb0afa159d4a60e0f272d7a795baf45497e571f897b',
+)
+
+
+# user_type -> the demo accounts' rows (columns of that user table, minus
+# password_hash); db_init.py seeds SQLite from these and the in-memory
+# backend (repository.py) starts from them
+DEMO_ACCOUNTS = {
+    'student': [
+        {'student_id': 'STU001', 'name': 'Arjun Kumar', 'email': 'arjun.kumar@student.edu', 'phone': '9876543210',
+         'hostel_block': 'Block A', 'room_number': 'A-101', 'course': 'Computer Science', 'year_of_study': 2},
+        {'student_id': 'STU002', 'name': 'Priya Sharma', 'email': 'priya.sharma@student.edu', 'phone': '9876543211',
+         'hostel_block': 'Block B', 'room_number': 'B-205', 'course': 'Electronics', 'year_of_study': 3},
+        {'student_id': 'STU003', 'name': 'Rohit Patel', 'email': 'rohit.patel@student.edu', 'phone': '9876543212',
+         'hostel_block': 'Block A', 'room_number': 'A-304', 'course': 'Mechanical', 'year_of_study': 1},
+        {'student_id': 'STU004', 'name': 'Sneha Gupta', 'email': 'sneha.gupta@student.edu', 'phone': '9876543213',
+         'hostel_block': 'Block C', 'room_number': 'C-102', 'course': 'Civil Engineering', 'year_of_study': 2},
+        {'student_id': 'STU005', 'name': 'Vikram Singh', 'email': 'vikram.singh@student.edu', 'phone': '9876543214',
+         'hostel_block': 'Block A', 'room_number': 'A-210', 'course': 'Information Technology', 'year_of_study': 4},
+    ],
+    'parent': [
+        {'parent_id': 'PAR001', 'name': 'Rajesh Kumar', 'email': 'rajesh.kumar@gmail.com', 'phone': '9876543220',
+         'relationship': 'Father', 'address': 'Mumbai, Maharashtra'},
+        {'parent_id': 'PAR002', 'name': 'Sunita Sharma', 'email': 'sunita.sharma@gmail.com', 'phone': '9876543221',
+         'relationship': 'Mother', 'address': 'Delhi, NCR'},
+        {'parent_id': 'PAR003', 'name': 'Mahesh Patel', 'email': 'mahesh.patel@gmail.com', 'phone': '9876543222',
+         'relationship': 'Father', 'address': 'Ahmedabad, Gujarat'},
+        {'parent_id': 'PAR004', 'name': 'Kavita Gupta', 'email': 'kavita.gupta@gmail.com', 'phone': '9876543223',
+         'relationship': 'Mother', 'address': 'Lucknow, UP'},
+        {'parent_id': 'PAR005', 'name': 'Suresh Singh', 'email': 'suresh.singh@gmail.com', 'phone': '9876543224',
+         'relationship': 'Father', 'address': 'Jaipur, Rajasthan'},
+    ],
+    'warden': [
+        {'warden_id': 'WAR001', 'name': 'Dr. Ramesh Verma', 'email': 'ramesh.verma@college.edu', 'phone': '9876543230',
+         'hostel_block': 'Block A', 'designation': 'Chief Warden'},
+        {'warden_id': 'WAR002', 'name': 'Prof. Meera Joshi', 'email': 'meera.joshi@college.edu', 'phone': '9876543231',
+         'hostel_block': 'Block B', 'designation': 'Assistant Warden'},
+    ],
+    'security': [
+        {'guard_id': 'SEC001', 'name': 'Ravi Shankar', 'email': 'ravi.shankar@college.edu', 'phone': '9876543240',
+         'shift': 'Day', 'gate_assigned': 'Main Gate'},
+        {'guard_id': 'SEC002', 'name': 'Mohan Lal', 'email': 'mohan.lal@college.edu', 'phone': '9876543241',
+         'shift': 'Night', 'gate_assigned': 'Main Gate'},
+        {'guard_id': 'SEC003', 'name': 'Deepak Kumar', 'email': 'deepak.kumar@college.edu', 'phone': '9876543242',
+         'shift': 'Evening', 'gate_assigned': 'Side Gate'},
+    ],
+}
+
+# (student_id, parent_id)
+DEMO_LINKS = [
+    ('STU001', 'PAR001'),
+    ('STU002', 'PAR002'),
+    ('STU003', 'PAR003'),
+    ('STU004', 'PAR004'),
+    ('STU005', 'PAR005'),
+]
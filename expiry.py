@@ -0,0 +1,210 @@
+"""
+Gatepass Expiry Scheduler for Hostel Gatepass Management System
+Expires unanswered requests in the background so dashboards stay read-only
+"""
+
+import heapq
+import os
+import threading
+import time
+
+import db
+import gatepass_transitions
+import timestamps
+
+try:
+    import fcntl
+except ImportError:  # Windows: no flock, run as a single-process leader
+    fcntl = None
+
+
+BATCH_SIZE = int(os.environ.get('EXPIRY_BATCH_SIZE', 100))
+SYNC_INTERVAL = float(os.environ.get('EXPIRY_SYNC_INTERVAL', 15))
+
+_start_lock = threading.Lock()
+
+
+class ExpiryScheduler:
+    """
+    Min-heap of (expiry epoch, request_id) for pending gatepass requests
+
+    Only one process per database is the leader at a time; it holds an
+    exclusive flock on '<db>.expiry.lock'. The leader loads every pending
+    request at startup, picks up requests created by other workers by
+    polling request_id ranges every sync_interval seconds, and expires due
+    requests in small batched transactions. Other processes keep retrying
+    the lock so a new leader takes over if the current one exits.
+    """
+
+    def __init__(self, batch_size=BATCH_SIZE, sync_interval=SYNC_INTERVAL):
+        self.batch_size = batch_size
+        self.sync_interval = sync_interval
+        self.pid = None
+        self.is_leader = False
+
+        self._heap = []
+        self._last_seen_id = 0
+        self._cond = threading.Condition()
+        self._thread = None
+        self._lock_file = None
+        self._stopped = False
+
+        # Statistics
+        self.expired_total = 0
+        self.batches = 0
+        self.last_sweep = None
+
+    def start(self):
+        """Start the background thread for this process (safe to call repeatedly)"""
+        if self.pid == os.getpid() and self._thread is not None:
+            return
+        with _start_lock:
+            if self.pid == os.getpid() and self._thread is not None:
+                return
+            self._start_thread()
+
+    def _start_thread(self):
+        # After a fork nothing inherited from the parent is ours
+        self.pid = os.getpid()
+        self.is_leader = False
+        self._heap = []
+        self._last_seen_id = 0
+        self._lock_file = None
+        self._cond = threading.Condition()
+        self._stopped = False
+        self._thread = threading.Thread(target=self._run, name='gatepass-expiry', daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        with self._cond:
+            self._stopped = True
+            self._cond.notify()
+
+    def schedule(self, request_id, expiry_timestamp):
+        """Track a newly created pending request (no-op outside the leader)"""
+        if not self.is_leader or expiry_timestamp is None:
+            return
+        with self._cond:
+            heapq.heappush(self._heap, (timestamps.to_epoch(expiry_timestamp), request_id))
+            self._last_seen_id = max(self._last_seen_id, request_id)
+            self._cond.notify()
+
+    def _try_become_leader(self):
+        if fcntl is None:
+            return True
+        if self._lock_file is None:
+            self._lock_file = open(db.get_db_path() + '.expiry.lock', 'a')
+        try:
+            fcntl.flock(self._lock_file.fileno(), fcntl.LOCK_EX | fcntl.LOCK_NB)
+            return True
+        except OSError:
+            return False
+
+    def _load_pending(self, after_id=0):
+        """Push pending requests with request_id > after_id onto the heap"""
+        conn = db.get_db_connection()
+        cur = conn.cursor()
+        try:
+            # One read snapshot for both queries: a request another worker
+            # inserts in between must not count towards max_id unless loaded
+            cur.execute('BEGIN')
+            cur.execute('''
+                SELECT request_id, COALESCE(expiry_timestamp, created_at + 3600)
+                FROM gatepass_requests
+                WHERE request_id > ? AND parent_approval_status = 'Pending'
+            ''', (after_id,))
+            rows = cur.fetchall()
+            cur.execute('SELECT COALESCE(MAX(request_id), 0) FROM gatepass_requests')
+            max_id = cur.fetchone()[0]
+            conn.commit()
+        finally:
+            if conn.in_transaction:
+                conn.rollback()
+            cur.close()
+            conn.close()
+
+        with self._cond:
+            for request_id, expiry_timestamp in rows:
+                if expiry_timestamp is not None:
+                    heapq.heappush(self._heap, (int(expiry_timestamp), request_id))
+            self._last_seen_id = max(self._last_seen_id, max_id)
+
+    def _pop_due(self, now):
+        due = []
+        with self._cond:
+            while self._heap and self._heap[0][0] <= now:
+                due.append(heapq.heappop(self._heap)[1])
+        return due
+
+    def _expire(self, request_ids):
+        """Mark still-pending requests as Expired, one short transaction per batch"""
+        conn = db.get_db_connection()
+        cur = conn.cursor()
+        try:
+            for start in range(0, len(request_ids), self.batch_size):
+                batch = request_ids[start:start + self.batch_size]
+                expired = gatepass_transitions.apply_transition_many(cur, 'expire', batch)
+                conn.commit()
+                self.expired_total += expired
+                self.batches += 1
+        finally:
+            cur.close()
+            conn.close()
+
+    def sweep(self, now=None):
+        """Expire everything due at `now` (epoch); returns the number of requests examined"""
+        now = now or time.time()
+        due = self._pop_due(now)
+        if due:
+            self._expire(due)
+        self.last_sweep = now
+        return len(due)
+
+    def _run(self):
+        while not self._stopped:
+            if not self.is_leader:
+                if not self._try_become_leader():
+                    time.sleep(self.sync_interval)
+                    continue
+                self.is_leader = True
+
+            try:
+                self._load_pending(self._last_seen_id)
+                next_sync = time.monotonic() + self.sync_interval
+                while not self._stopped and time.monotonic() < next_sync:
+                    self.sweep()
+                    with self._cond:
+                        timeout = next_sync - time.monotonic()
+                        if self._heap:
+                            until_due = self._heap[0][0] - time.time()
+                            timeout = min(timeout, until_due)
+                        if timeout > 0:
+                            self._cond.wait(timeout)
+            except Exception as e:
+                # Keep the sweeper alive through transient errors (e.g. database locked);
+                # requests popped from the heap may not have been expired, so reload them all
+                print(f"Expiry scheduler error: {e}")
+                with self._cond:
+                    self._heap = []
+                    self._last_seen_id = 0
+                time.sleep(1)
+
+    def stats(self):
+        with self._cond:
+            pending = len(self._heap)
+        return {
+            'is_leader': self.is_leader,
+            'pending': pending,
+            'expired_total': self.expired_total,
+            'batches': self.batches,
+            'last_sweep': self.last_sweep,
+        }
+
+
+scheduler = ExpiryScheduler()
+
+
+def ensure_started():
+    """Start this process's scheduler unless EXPIRY_SCHEDULER=off"""
+    if os.environ.get('EXPIRY_SCHEDULER', 'on').lower() not in ('off', '0', 'false'):
+        scheduler.start()
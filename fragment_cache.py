@@ -0,0 +1,131 @@
+"""
+Fragment Cache for Hostel Gatepass Management System
+Byte-bounded LRU of rendered dashboard tables, each valid for one data version
+"""
+
+import os
+import sys
+import threading
+from collections import OrderedDict
+
+import single_flight
+
+
+def sizeof(value):
+    """Approximate memory held by a cached value (strings, numbers and containers of them)"""
+    size = sys.getsizeof(value)
+    if isinstance(value, dict):
+        size += sum(sizeof(k) + sizeof(v) for k, v in value.items())
+    elif isinstance(value, (list, tuple)):
+        size += sum(sizeof(item) for item in value)
+    return size
+
+
+class FragmentCache:
+    """
+    Thread-safe LRU cache bounded by the bytes its values hold
+
+    Each entry remembers the data version it was rendered from. A lookup
+    with any other version drops the entry, so a change is never served
+    stale and superseded renders don't linger until LRU reaches them.
+    Entries are per process, like user_cache.
+    """
+
+    def __init__(self, name, max_bytes=8 * 1024 * 1024):
+        self.name = name
+        self.max_bytes = max_bytes
+        self.bytes = 0
+        self._data = OrderedDict()   # key -> (version, value, size)
+        self._lock = threading.Lock()
+        # Concurrent misses for the same entry wait on one render
+        self._flights = single_flight.SingleFlight(name)
+
+        # Statistics
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.invalidations = 0
+
+    def get(self, key, version):
+        """Cached value for key rendered at `version`, or None"""
+        with self._lock:
+            entry = self._data.get(key)
+            if entry is None:
+                self.misses += 1
+                return None
+            if entry[0] != version:
+                self._remove(key)
+                self.invalidations += 1
+                self.misses += 1
+                return None
+            self._data.move_to_end(key)
+            self.hits += 1
+            return entry[1]
+
+    def set(self, key, version, value):
+        size = sizeof(key) + sizeof(value)
+        with self._lock:
+            if key in self._data:
+                self._remove(key)
+            if size > self.max_bytes:
+                return
+            self._data[key] = (version, value, size)
+            self.bytes += size
+            while self.bytes > self.max_bytes:
+                self._remove(next(iter(self._data)))
+                self.evictions += 1
+
+    def get_or_render(self, key, version, render, label=None):
+        """
+        Cached value for (key, version), calling render() to fill a miss
+
+        Requests that miss on the same entry while it is being rendered
+        share that render (single_flight) rather than each running the
+        queries themselves.
+
+        Args:
+            key: Hashable entry key
+            version: Data version the value must have been rendered from
+            render: Zero-argument callable producing the value
+            label: Metrics label for the render (e.g. the endpoint)
+        """
+        value = self.get(key, version)
+        if value is None:
+            value = self._flights.do((key, version), lambda: self._render(key, version, render), label)
+        return value
+
+    def _render(self, key, version, render):
+        # Stored before the flight ends, so late arrivals hit the cache instead
+        value = render()
+        self.set(key, version, value)
+        return value
+
+    def _remove(self, key):
+        # Caller holds the lock
+        self.bytes -= self._data.pop(key)[2]
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+            self.bytes = 0
+
+    def stats(self):
+        with self._lock:
+            lookups = self.hits + self.misses
+            stats = {
+                'size': len(self._data),
+                'bytes': self.bytes,
+                'max_bytes': self.max_bytes,
+                'hits': self.hits,
+                'misses': self.misses,
+                'hit_ratio': self.hits / lookups if lookups else 0.0,
+                'evictions': self.evictions,
+                'invalidations': self.invalidations,
+            }
+        stats.update(self._flights.stats())
+        return stats
+
+
+# (endpoint, filter_type, after, before, page_size) -> {'table': Markup, 'counts': {...}, ...}
+# for the warden and security dashboards, which every user of the role sees alike
+dashboard_tables = FragmentCache('dashboard_tables', max_bytes=int(os.environ.get('FRAGMENT_CACHE_BYTES', 8 * 1024 * 1024)))
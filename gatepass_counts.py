@@ -0,0 +1,246 @@
+"""
+Gatepass Status Counters for Hostel Gatepass Management System
+Badge counts for the dashboards, kept exact by triggers on gatepass_requests
+"""
+
+import sys
+
+import db
+
+
+# Scopes in gatepass_status_counts:
+#   ('student', student_id,   'parent:<parent_approval_status>')
+#   ('parent',  parent_email, 'parent:<parent_approval_status>')
+#   ('global',  '',           'parent:<parent_approval_status>')
+#   ('global',  '',           'warden:<warden_status>')          approved requests only
+#   ('global',  '',           'security:<security_guard_status>') approved requests only
+HISTORY_STATUSES = ('Approved', 'Rejected', 'Expired')
+
+_UPSERT = '''
+            INSERT INTO gatepass_status_counts (scope, scope_key, status_key, count)
+            {source}
+            ON CONFLICT (scope, scope_key, status_key) DO UPDATE SET count = count + excluded.count;'''
+
+
+def _bump_statements(row, delta):
+    """Trigger body statements adding `delta` to every counter `row` (NEW/OLD) belongs to"""
+    status = f"'parent:' || COALESCE({row}.parent_approval_status, '')"
+    statements = [
+        f"VALUES ('student', COALESCE({row}.student_id, ''), {status}, {delta})",
+        f"VALUES ('parent', COALESCE({row}.parent_email, ''), {status}, {delta})",
+        f"VALUES ('global', '', {status}, {delta})",
+        f"SELECT 'global', '', 'warden:' || COALESCE({row}.warden_status, ''), {delta} "
+        f"WHERE {row}.parent_approval_status = 'Approved'",
+        f"SELECT 'global', '', 'security:' || COALESCE({row}.security_guard_status, ''), {delta} "
+        f"WHERE {row}.parent_approval_status = 'Approved'",
+    ]
+    return ''.join(_UPSERT.format(source=source) for source in statements)
+
+
+def install(cur):
+    """Create the counter table and its triggers (idempotent), then rebuild the counts"""
+    cur.execute('''
+        CREATE TABLE IF NOT EXISTS gatepass_status_counts (
+            scope VARCHAR(20) NOT NULL,
+            scope_key VARCHAR(100) NOT NULL,
+            status_key VARCHAR(40) NOT NULL,
+            count INTEGER NOT NULL DEFAULT 0,
+            PRIMARY KEY (scope, scope_key, status_key)
+        ) WITHOUT ROWID
+    ''')
+
+    cur.execute('DROP TRIGGER IF EXISTS gatepass_counts_insert')
+    cur.execute('DROP TRIGGER IF EXISTS gatepass_counts_update')
+    cur.execute('DROP TRIGGER IF EXISTS gatepass_counts_delete')
+
+    cur.execute(f'''
+        CREATE TRIGGER gatepass_counts_insert AFTER INSERT ON gatepass_requests
+        BEGIN{_bump_statements('NEW', 1)}
+        END
+    ''')
+    cur.execute(f'''
+        CREATE TRIGGER gatepass_counts_update
+        AFTER UPDATE OF student_id, parent_email, parent_approval_status, warden_status, security_guard_status
+        ON gatepass_requests
+        WHEN OLD.student_id IS NOT NEW.student_id
+          OR OLD.parent_email IS NOT NEW.parent_email
+          OR OLD.parent_approval_status IS NOT NEW.parent_approval_status
+          OR OLD.warden_status IS NOT NEW.warden_status
+          OR OLD.security_guard_status IS NOT NEW.security_guard_status
+        BEGIN{_bump_statements('OLD', -1)}{_bump_statements('NEW', 1)}
+        END
+    ''')
+    cur.execute(f'''
+        CREATE TRIGGER gatepass_counts_delete AFTER DELETE ON gatepass_requests
+        BEGIN{_bump_statements('OLD', -1)}
+        END
+    ''')
+
+    rebuild_status_counts(cur)
+
+
+def _expected_counts(cur):
+    """Recompute every counter from gatepass_requests with GROUP BY queries"""
+    expected = {}
+
+    def add(scope, scope_key, status_key, count):
+        key = (scope, scope_key, status_key)
+        expected[key] = expected.get(key, 0) + count
+
+    cur.execute('''
+        SELECT COALESCE(student_id, ''), COALESCE(parent_email, ''),
+               COALESCE(parent_approval_status, ''), COUNT(*)
+        FROM gatepass_requests
+        GROUP BY student_id, parent_email, parent_approval_status
+    ''')
+    for student_id, parent_email, status, count in cur.fetchall():
+        add('student', student_id, f'parent:{status}', count)
+        add('parent', parent_email, f'parent:{status}', count)
+        add('global', '', f'parent:{status}', count)
+
+    cur.execute('''
+        SELECT COALESCE(warden_status, ''), COALESCE(security_guard_status, ''), COUNT(*)
+        FROM gatepass_requests
+        WHERE parent_approval_status = 'Approved'
+        GROUP BY warden_status, security_guard_status
+    ''')
+    for warden_status, security_status, count in cur.fetchall():
+        add('global', '', f'warden:{warden_status}', count)
+        add('global', '', f'security:{security_status}', count)
+
+    return expected
+
+
+def rebuild_status_counts(cur):
+    """Replace the contents of gatepass_status_counts with freshly computed counts"""
+    expected = _expected_counts(cur)
+    cur.execute('DELETE FROM gatepass_status_counts')
+    cur.executemany('''
+        INSERT INTO gatepass_status_counts (scope, scope_key, status_key, count)
+        VALUES (?, ?, ?, ?)
+    ''', [key + (count,) for key, count in expected.items()])
+    return len(expected)
+
+
+def check_status_counts(cur):
+    """
+    Compare the trigger-maintained counters with a from-scratch recount
+
+    Returns:
+        list: (scope, scope_key, status_key, stored, expected) for every mismatch
+    """
+    expected = _expected_counts(cur)
+    cur.execute('SELECT scope, scope_key, status_key, count FROM gatepass_status_counts')
+    stored = {(row[0], row[1], row[2]): row[3] for row in cur.fetchall()}
+
+    mismatches = []
+    for key in sorted(set(expected) | set(stored)):
+        if stored.get(key, 0) != expected.get(key, 0):
+            mismatches.append(key + (stored.get(key, 0), expected.get(key, 0)))
+    return mismatches
+
+
+def get_status_counts(cur, scope, scope_key=''):
+    """All counters for one scope as {status_key: count} (one indexed range scan)"""
+    cur.execute('''
+        SELECT status_key, count FROM gatepass_status_counts
+        WHERE scope = ? AND scope_key = ?
+    ''', (scope, scope_key))
+    return {row[0]: row[1] for row in cur.fetchall()}
+
+
+def row_counters(row):
+    """
+    The counters a gatepass belongs to, as the triggers maintain them
+
+    For stores without triggers (repository.MemoryRepository), which add
+    and subtract these keys themselves.
+
+    Args:
+        row: Mapping with student_id, parent_email and the three status columns
+
+    Returns:
+        list: (scope, scope_key, status_key) tuples
+    """
+    status_key = f"parent:{row['parent_approval_status'] or ''}"
+    keys = [
+        ('student', row['student_id'] or '', status_key),
+        ('parent', row['parent_email'] or '', status_key),
+        ('global', '', status_key),
+    ]
+    if row['parent_approval_status'] == 'Approved':
+        keys.append(('global', '', f"warden:{row['warden_status'] or ''}"))
+        keys.append(('global', '', f"security:{row['security_guard_status'] or ''}"))
+    return keys
+
+
+def requester_badges(counts):
+    """Student/parent dashboard badges from one scope's {status_key: count}"""
+    statuses = {key[len('parent:'):]: n for key, n in counts.items() if key.startswith('parent:')}
+    return {
+        'all': sum(statuses.values()),
+        'pending': statuses.get('Pending', 0),
+        'history': sum(statuses.get(status, 0) for status in HISTORY_STATUSES),
+    }
+
+
+def warden_badges(counts):
+    """Warden dashboard badges (approved requests only) from the global scope"""
+    return {
+        'all': counts.get('parent:Approved', 0),
+        'pending': counts.get('warden:Open', 0),
+        'history': counts.get('warden:Closed', 0),
+    }
+
+
+def security_badges(counts):
+    """Security dashboard badges (approved requests only) from the global scope"""
+    return {
+        'all': counts.get('parent:Approved', 0),
+        'checkout': counts.get('security:Pending', 0),
+        'checkin': counts.get('security:Out', 0),
+        'completed': counts.get('security:In', 0),
+    }
+
+
+def student_counts(cur, student_id):
+    """Badge counts for student_dashboard"""
+    return requester_badges(get_status_counts(cur, 'student', student_id))
+
+
+def parent_counts(cur, parent_email):
+    """Badge counts for parent_dashboard"""
+    return requester_badges(get_status_counts(cur, 'parent', parent_email))
+
+
+def warden_counts(cur):
+    """Badge counts for warden_dashboard (approved requests only)"""
+    return warden_badges(get_status_counts(cur, 'global'))
+
+
+def security_counts(cur):
+    """Badge counts for security_dashboard (approved requests only)"""
+    return security_badges(get_status_counts(cur, 'global'))
+
+
+if __name__ == '__main__':
+    conn = db.get_db_connection()
+    cur = conn.cursor()
+    exit_code = 0
+
+    if '--rebuild' in sys.argv:
+        rows = rebuild_status_counts(cur)
+        conn.commit()
+        print(f"Rebuilt gatepass_status_counts ({rows} counters)")
+    else:
+        mismatches = check_status_counts(cur)
+        for scope, scope_key, status_key, stored, expected in mismatches:
+            print(f"{scope}/{scope_key or '-'}/{status_key}: stored {stored}, expected {expected}")
+        print(f"{len(mismatches)} mismatched counters")
+        if mismatches:
+            print("Run 'python gatepass_counts.py --rebuild' to repair them")
+            exit_code = 1
+
+    cur.close()
+    conn.close()
+    sys.exit(exit_code)
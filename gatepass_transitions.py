@@ -0,0 +1,219 @@
+"""
+Gatepass Transitions for Hostel Gatepass Management System
+Every allowed status change, each applied as a single compare-and-swap UPDATE
+"""
+
+import db
+import metrics
+import timestamps
+
+
+class Transition:
+    """
+    One allowed change of a gatepass status column
+
+    The UPDATE only matches while `column` is in from_statuses and every
+    (column, allowed values) pair in `requires` holds, so the check and the
+    write are one atomic step: of two guards scanning the same pass at
+    once, exactly one changes the row and the other sees rowcount 0.
+    """
+
+    def __init__(self, verb, column, from_statuses, to_status, requires=(),
+                 stamp_column=None, owner_column=None, unexpired=False, reasons=None):
+        self.verb = verb
+        self.column = column
+        self.from_statuses = tuple(from_statuses)
+        self.to_status = to_status
+        self.requires = tuple(requires)
+        self.stamp_column = stamp_column      # set to the current time on success
+        self.owner_column = owner_column      # must equal the caller's `owner`
+        self.unexpired = unexpired            # expiry_timestamp must still be in the future
+        self.reasons = reasons or {}          # current status -> refusal reason, where "already" is wrong
+
+    def conditions(self):
+        """WHERE clauses (after request_id) and the parameters they need, in order"""
+        clauses = [f"{self.column} IN ({', '.join('?' for _ in self.from_statuses)})"]
+        params = list(self.from_statuses)
+        for column, allowed in self.requires:
+            clauses.append(f"{column} IN ({', '.join('?' for _ in allowed)})")
+            params.extend(allowed)
+        return clauses, params
+
+    def refusal(self, request_id, current, unexpired):
+        """
+        Why this transition can't apply to a gatepass in state `current`
+
+        Args:
+            request_id: For the message
+            current: {column: value} for the three status columns
+            unexpired: Whether the request's expiry_timestamp is still in the future
+
+        Returns:
+            str: The error message, or None if the transition is allowed
+        """
+        prefix = f'Cannot {self.verb} gatepass #{request_id}'
+        status = current[self.column]
+        if status not in self.from_statuses:
+            return f'{prefix}: ' + self.reasons.get(status, f'{_LABELS[self.column]} is already {status}')
+        for column, allowed in self.requires:
+            if current[column] not in allowed:
+                return f'{prefix}: {_LABELS[column]} is {current[column]}'
+        if self.unexpired and not unexpired:
+            return f'{prefix}: it has expired'
+        return None
+
+
+TRANSITIONS = {
+    'approve': Transition('approve', 'parent_approval_status', ('Pending',), 'Approved',
+                          stamp_column='parent_approval_timestamp', owner_column='parent_email',
+                          unexpired=True),
+    'reject': Transition('reject', 'parent_approval_status', ('Pending',), 'Rejected',
+                         stamp_column='parent_approval_timestamp', owner_column='parent_email',
+                         unexpired=True),
+    'expire': Transition('expire', 'parent_approval_status', ('Pending',), 'Expired'),
+    'close': Transition('close', 'warden_status', ('Open',), 'Closed',
+                        requires=(('parent_approval_status', ('Approved',)),)),
+    'checkout': Transition('check out', 'security_guard_status', ('Pending',), 'Out',
+                           requires=(('parent_approval_status', ('Approved',)),)),
+    'checkin': Transition('check in', 'security_guard_status', ('Out',), 'In',
+                          requires=(('parent_approval_status', ('Approved',)),),
+                          reasons={'Pending': 'student has not checked out'}),
+}
+
+STATUS_COLUMNS = ('parent_approval_status', 'warden_status', 'security_guard_status')
+
+_LABELS = {
+    'parent_approval_status': 'parent approval',
+    'warden_status': 'warden status',
+    'security_guard_status': 'security status',
+}
+
+
+def record_outcome(name, result, amount=1):
+    """Count transitions by outcome ('ok', 'not_found', 'conflict', 'skipped')"""
+    metrics.counter('gatepass_transitions_total', 'Gatepass transitions by outcome (conflict = lost a race '
+                    'or not allowed from the current state)', transition=name, result=result).inc(amount)
+
+
+def _explain(cur, transition, request_id, owner, now):
+    """Why a transition matched no row: ('not_found' | 'conflict', message, current status)"""
+    query = '''
+        SELECT parent_approval_status, warden_status, security_guard_status,
+               expiry_timestamp IS NULL OR expiry_timestamp > ?
+        FROM gatepass_requests WHERE request_id = ?
+    '''
+    params = [now, request_id]
+    if transition.owner_column:
+        query += f' AND {transition.owner_column} = ?'
+        params.append(owner)
+    cur.execute(query, params)
+    row = cur.fetchone()
+    if row is None:
+        return 'not_found', f'Gatepass #{request_id} not found', None
+
+    current = dict(zip(STATUS_COLUMNS, row[:3]))
+    error = transition.refusal(request_id, current, row[3])
+    if error is None:
+        # Changed and changed back between our UPDATE and this read
+        error = f'Cannot {transition.verb} gatepass #{request_id}: it was changed by someone else'
+    return 'conflict', error, current[transition.column]
+
+
+def apply_transition(cur, name, request_id, owner=None, now=None):
+    """
+    Apply one transition inside the caller's transaction (the caller commits)
+
+    Args:
+        cur: Cursor on a pooled connection
+        name: Key of TRANSITIONS ('approve', 'checkout', ...)
+        request_id: gatepass_requests.request_id
+        owner: Value the transition's owner_column must match (the parent's email)
+        now: Current time (defaults to timestamps.now())
+
+    Returns:
+        dict: {'success': True, 'request_id', 'student_id', 'student_name', 'status'} or
+              {'success': False, 'request_id', 'result': 'not_found'|'conflict', 'error', 'status'}
+
+    Raises:
+        ValueError: For an unknown transition name
+    """
+    if name not in TRANSITIONS:
+        raise ValueError(f"Unknown gatepass transition: {name}")
+    transition = TRANSITIONS[name]
+    now = now or timestamps.now()
+
+    assignments = [f'{transition.column} = ?']
+    params = [transition.to_status]
+    if transition.stamp_column:
+        assignments.append(f'{transition.stamp_column} = ?')
+        params.append(now)
+
+    clauses, condition_params = transition.conditions()
+    params.append(request_id)
+    params.extend(condition_params)
+    if transition.owner_column:
+        clauses.append(f'{transition.owner_column} = ?')
+        params.append(owner)
+    if transition.unexpired:
+        clauses.append('(expiry_timestamp IS NULL OR expiry_timestamp > ?)')
+        params.append(now)
+
+    cur.execute(f'''
+        UPDATE gatepass_requests
+        SET {', '.join(assignments)}
+        WHERE request_id = ? AND {' AND '.join(clauses)}
+        RETURNING student_id,
+                  (SELECT name FROM students s WHERE s.student_id = gatepass_requests.student_id)
+    ''', params)
+    updated = cur.fetchall()
+
+    if updated:
+        record_outcome(name, 'ok')
+        return {'success': True, 'request_id': request_id, 'student_id': updated[0][0],
+                'student_name': updated[0][1], 'status': transition.to_status}
+
+    result, error, status = _explain(cur, transition, request_id, owner, now)
+    record_outcome(name, result)
+    return {'success': False, 'request_id': request_id, 'result': result, 'error': error, 'status': status}
+
+
+def transition(name, request_id, owner=None, now=None):
+    """apply_transition() in its own short transaction on a pooled connection"""
+    conn = db.get_db_connection()
+    cur = conn.cursor()
+    try:
+        result = apply_transition(cur, name, request_id, owner=owner, now=now)
+        if result['success']:
+            conn.commit()
+        return result
+    finally:
+        cur.close()
+        conn.close()
+
+
+def apply_transition_many(cur, name, request_ids):
+    """
+    Apply a transition without an owner to many requests in one UPDATE
+
+    Requests no longer in a from-status are skipped (for expiry, ones the
+    parent answered first), not counted as conflicts.
+
+    Returns:
+        int: Number of requests changed
+    """
+    transition = TRANSITIONS[name]
+    if transition.owner_column or transition.stamp_column or transition.unexpired:
+        raise ValueError(f"Transition {name} can't be applied in bulk")
+    if not request_ids:
+        return 0
+    clauses, params = transition.conditions()
+    cur.execute(f'''
+        UPDATE gatepass_requests
+        SET {transition.column} = ?
+        WHERE request_id IN ({', '.join('?' for _ in request_ids)}) AND {' AND '.join(clauses)}
+    ''', [transition.to_status, *request_ids, *params])
+    changed = cur.rowcount
+    record_outcome(name, 'ok', changed)
+    if len(request_ids) > changed:
+        record_outcome(name, 'skipped', len(request_ids) - changed)
+    return changed
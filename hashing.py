@@ -0,0 +1,203 @@
+"""
+Password Hashing Service for Hostel Gatepass Management System
+Runs the password KDF in a bounded process pool so web workers stay responsive
+"""
+
+import multiprocessing
+import os
+import threading
+import time
+from concurrent.futures import ProcessPoolExecutor, TimeoutError as FutureTimeout
+from concurrent.futures.process import BrokenProcessPool
+
+from werkzeug.security import generate_password_hash, check_password_hash
+
+import metrics
+
+
+# Every gunicorn worker (WEB_CONCURRENCY of them) has its own pool, so by
+# default they split the CPUs between them rather than each taking all of them.
+# HASH_WORKERS=0 hashes inline on the request thread (no pool)
+WEB_CONCURRENCY = max(int(os.environ.get('WEB_CONCURRENCY') or 1), 1)
+HASH_WORKERS = int(os.environ.get('HASH_WORKERS', max(1, (os.cpu_count() or 1) // WEB_CONCURRENCY)))
+HASH_QUEUE_DEPTH = int(os.environ.get('HASH_QUEUE_DEPTH', max(HASH_WORKERS, 1) * 4))
+HASH_TIMEOUT = float(os.environ.get('HASH_TIMEOUT', 5))
+
+
+class HashingBusy(Exception):
+    """The hashing pool is full or did not answer within the timeout"""
+
+
+class HashingService:
+    """
+    Bounded pool of hashing processes shared by the threads of one web worker
+
+    At most queue_depth hashes may be queued or running at once; callers past
+    that limit get HashingBusy straight away instead of piling up behind the
+    pool. A caller that gives up after `timeout` seconds keeps its slot until
+    the worker process actually finishes, so abandoned work still counts
+    against the limit. Where processes can't be started at all (no /dev/shm
+    on serverless hosts, no sem_open), hashing falls back to inline.
+    """
+
+    def __init__(self, workers=HASH_WORKERS, queue_depth=HASH_QUEUE_DEPTH, timeout=HASH_TIMEOUT):
+        self.workers = workers
+        self.queue_depth = queue_depth
+        self.timeout = timeout
+
+        self.pid = None
+        self._executor = None
+        self._inline_pid = None     # process that found it can't run a pool
+        self._pool_worked = False   # whether this process's pool has ever answered
+        self._slots = threading.BoundedSemaphore(queue_depth)
+        self._lock = threading.Lock()
+        self._local = threading.local()
+
+        # Statistics
+        self.completed = 0
+        self.rejected = 0
+        self.timeouts = 0
+
+    def _get_executor(self):
+        """This process's pool, or None if hashing has to run inline"""
+        if self.workers <= 0 or self._inline_pid == os.getpid():
+            return None
+        # Each gunicorn worker gets its own pool, created on first use
+        if self.pid == os.getpid() and self._executor is not None:
+            return self._executor
+        with self._lock:
+            if self.pid != os.getpid() or self._executor is None:
+                if self.pid != os.getpid():
+                    self._pool_worked = False
+                self.pid = os.getpid()
+                self._slots = threading.BoundedSemaphore(self.queue_depth)
+                try:
+                    # spawn rather than fork: the web worker already has threads running
+                    self._executor = ProcessPoolExecutor(
+                        max_workers=self.workers,
+                        mp_context=multiprocessing.get_context('spawn'),
+                    )
+                except (OSError, NotImplementedError, ImportError) as e:
+                    self._fall_back_inline(e)
+                    return None
+            return self._executor
+
+    def _fall_back_inline(self, error):
+        # Caller holds self._lock
+        print(f"Hashing pool unavailable, hashing inline: {error}")
+        self._inline_pid = os.getpid()
+        self._executor = None
+
+    def _run_inline_instead(self, executor, error, fn, *args):
+        """Give up on the pool for this process and run fn on the calling thread"""
+        with self._lock:
+            self._fall_back_inline(error)
+        executor.shutdown(wait=False)
+        result = fn(*args)
+        self._count('completed')
+        return result
+
+    def _count(self, name):
+        with self._lock:
+            setattr(self, name, getattr(self, name) + 1)
+
+    def _reset_executor(self, executor):
+        with self._lock:
+            if self._executor is executor:
+                self._executor = None
+        executor.shutdown(wait=False)
+
+    def _run(self, op, fn, *args):
+        started = time.perf_counter()
+        try:
+            executor = self._get_executor()
+            if executor is None:
+                result = fn(*args)
+                self._count('completed')
+                return result
+            return self._submit(executor, fn, *args)
+        finally:
+            elapsed = time.perf_counter() - started
+            self._local.hash_seconds = getattr(self._local, 'hash_seconds', 0.0) + elapsed
+            metrics.histogram('password_hash_seconds', 'Time callers spent waiting on password hashing',
+                              op=op).observe(elapsed)
+
+    def _submit(self, executor, fn, *args):
+        slots = self._slots
+        if not slots.acquire(blocking=False):
+            self._count('rejected')
+            raise HashingBusy('Too many password hashes queued')
+
+        try:
+            future = executor.submit(fn, *args)
+        except (BrokenProcessPool, RuntimeError):
+            slots.release()
+            self._reset_executor(executor)
+            raise HashingBusy('Hashing pool unavailable')
+        except (OSError, NotImplementedError) as e:
+            # The first submit starts the worker processes, which can fail too
+            slots.release()
+            return self._run_inline_instead(executor, e, fn, *args)
+        future.add_done_callback(lambda _: slots.release())
+
+        try:
+            result = future.result(timeout=self.timeout)
+        except FutureTimeout:
+            self._count('timeouts')
+            raise HashingBusy('Password hashing timed out')
+        except BrokenProcessPool as e:
+            if not self._pool_worked:
+                # Workers that die before ever answering can't start here at
+                # all (e.g. a __main__ they can't re-import under spawn)
+                return self._run_inline_instead(executor, e, fn, *args)
+            # A worker process died; start a fresh pool on the next call
+            self._reset_executor(executor)
+            raise HashingBusy('Hashing pool unavailable')
+        self._pool_worked = True
+        self._count('completed')
+        return result
+
+    def hash_password(self, password):
+        """
+        Hash a password for storage
+
+        Raises:
+            HashingBusy: If the pool is saturated or the hash timed out
+        """
+        return self._run('hash', generate_password_hash, password)
+
+    def verify_password(self, password_hash, password):
+        """
+        Check a password against a stored hash
+
+        Raises:
+            HashingBusy: If the pool is saturated or the check timed out
+        """
+        return self._run('verify', check_password_hash, password_hash, password)
+
+    def take_thread_hash_time(self):
+        """Seconds this thread has spent hashing since the last call (then resets)"""
+        elapsed = getattr(self._local, 'hash_seconds', 0.0)
+        self._local.hash_seconds = 0.0
+        return elapsed
+
+    def stats(self):
+        return {
+            'workers': self.workers,
+            'queue_depth': self.queue_depth,
+            'timeout': self.timeout,
+            'completed': self.completed,
+            'rejected': self.rejected,
+            'timeouts': self.timeouts,
+        }
+
+
+service = HashingService()
+
+
+def hash_password(password):
+    return service.hash_password(password)
+
+
+def verify_password(password_hash, password):
+    return service.verify_password(password_hash, password)
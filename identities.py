@@ -0,0 +1,181 @@
+"""
+Identity Index for Hostel Gatepass Management System
+One row per email across all user types, so every email lookup is a single indexed probe
+"""
+
+import sys
+
+import db
+from user_ids import USER_ID_SOURCES
+
+
+# status: 'pending' (registration awaiting review), 'active', or 'inactive'
+IDENTITY_STATUSES = ('pending', 'active', 'inactive')
+
+
+class IdentityConflict(Exception):
+    """An email belongs to more than one account, so it can't name a single identity"""
+
+    def __init__(self, conflicts):
+        self.conflicts = conflicts
+        listed = '; '.join(f"{email}: {', '.join(f'{user_type} {user_id}' for user_type, user_id in owners)}"
+                           for email, owners in conflicts[:10])
+        more = f' (and {len(conflicts) - 10} more)' if len(conflicts) > 10 else ''
+        super().__init__(f"{len(conflicts)} emails are used by more than one account: {listed}{more}")
+
+
+def install(cur):
+    """Create the identities table and backfill it from existing users and registrations"""
+    cur.execute('''
+        CREATE TABLE IF NOT EXISTS identities (
+            identity_id INTEGER PRIMARY KEY AUTOINCREMENT,
+            email VARCHAR(100) NOT NULL UNIQUE,
+            user_type VARCHAR(20) NOT NULL CHECK(user_type IN ('student', 'parent', 'warden', 'security')),
+            user_id VARCHAR(50) NOT NULL,
+            status VARCHAR(20) NOT NULL CHECK(status IN ('pending', 'active', 'inactive')),
+            UNIQUE(user_type, user_id)
+        )
+    ''')
+    backfill(cur)
+
+
+def _accounts_query():
+    """SELECT of (email, user_type, user_id) over every user table"""
+    return ' UNION ALL '.join(
+        f"SELECT email, '{user_type}' AS user_type, {id_column} AS user_id FROM {table} WHERE email IS NOT NULL"
+        for user_type, (_, table, id_column) in USER_ID_SOURCES.items()
+    )
+
+
+def find_conflicts(cur):
+    """
+    Emails that more than one account claims
+
+    Covers emails shared across user tables and accounts whose email is
+    already held by a different account in identities.
+
+    Returns:
+        list: (email, [(user_type, user_id), ...]) sorted by email
+    """
+    accounts = _accounts_query()
+    cur.execute(f'''
+        WITH accounts AS ({accounts}),
+        claims AS (
+            SELECT email, user_type, user_id FROM accounts
+            UNION
+            SELECT i.email, i.user_type, i.user_id
+            FROM identities i JOIN accounts a ON a.email = i.email
+            WHERE i.status != 'pending'
+        )
+        SELECT email, user_type, user_id FROM claims
+        WHERE email IN (SELECT email FROM claims GROUP BY email HAVING COUNT(*) > 1)
+        ORDER BY email, user_type, user_id
+    ''')
+    conflicts = {}
+    for email, user_type, user_id in cur.fetchall():
+        conflicts.setdefault(email, []).append((user_type, user_id))
+    return list(conflicts.items())
+
+
+def backfill(cur):
+    """
+    Add identities for every user and pending registration that lacks one
+
+    Existing rows are left alone. Accounts are added before pending
+    registrations, so if an email appears in both, the account wins.
+
+    Returns:
+        int: Number of identities added
+
+    Raises:
+        IdentityConflict: If accounts of different types (or an account and
+            an existing identity) share an email; nothing is added until the
+            duplicates are resolved
+    """
+    conflicts = find_conflicts(cur)
+    if conflicts:
+        raise IdentityConflict(conflicts)
+
+    added = 0
+    for user_type, (_, table, id_column) in USER_ID_SOURCES.items():
+        cur.execute(f'''
+            INSERT OR IGNORE INTO identities (email, user_type, user_id, status)
+            SELECT email, ?, {id_column}, CASE WHEN is_active THEN 'active' ELSE 'inactive' END
+            FROM {table}
+            WHERE email IS NOT NULL
+        ''', (user_type,))
+        added += cur.rowcount
+    cur.execute('''
+        INSERT OR IGNORE INTO identities (email, user_type, user_id, status)
+        SELECT email, user_type, proposed_user_id, 'pending'
+        FROM pending_registrations
+        WHERE status = 'pending'
+    ''')
+    added += cur.rowcount
+    return added
+
+
+def find_identity(cur, email):
+    """
+    Look up an email across all user types
+
+    Returns:
+        tuple: (user_type, user_id, status) or None if the email is unknown
+    """
+    cur.execute('SELECT user_type, user_id, status FROM identities WHERE email = ?', (email,))
+    return cur.fetchone()
+
+
+def add_pending(cur, email, user_type, user_id):
+    """
+    Claim an email for a new registration inside the caller's transaction
+
+    Raises:
+        sqlite3.IntegrityError: If the email (or user ID) is already taken
+    """
+    cur.execute('''
+        INSERT INTO identities (email, user_type, user_id, status)
+        VALUES (?, ?, ?, 'pending')
+    ''', (email, user_type, user_id))
+
+
+def activate(cur, email, user_type, user_id):
+    """Mark an approved registration's identity active (creating it if missing)"""
+    cur.execute('''
+        INSERT INTO identities (email, user_type, user_id, status)
+        VALUES (?, ?, ?, 'active')
+        ON CONFLICT (email) DO UPDATE SET
+            user_type = excluded.user_type, user_id = excluded.user_id, status = 'active'
+    ''', (email, user_type, user_id))
+
+
+def release_pending(cur, email):
+    """Free the email held by a rejected registration"""
+    cur.execute("DELETE FROM identities WHERE email = ? AND status = 'pending'", (email,))
+
+
+def set_status(cur, user_type, user_id, status):
+    if status not in IDENTITY_STATUSES:
+        raise ValueError(f"Invalid identity status: {status}")
+    cur.execute('''
+        UPDATE identities SET status = ?
+        WHERE user_type = ? AND user_id = ?
+    ''', (status, user_type, user_id))
+
+
+if __name__ == '__main__':
+    conn = db.get_db_connection()
+    cur = conn.cursor()
+    if '--backfill' in sys.argv:
+        try:
+            added = backfill(cur)
+        except IdentityConflict as e:
+            print(f"Backfill refused: {e}")
+            conn.close()
+            sys.exit(1)
+        conn.commit()
+        print(f"Added {added} identities")
+    cur.execute('SELECT status, COUNT(*) FROM identities GROUP BY status ORDER BY status')
+    for status, count in cur.fetchall():
+        print(f"{status}: {count}")
+    conn.close()
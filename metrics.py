@@ -0,0 +1,341 @@
+"""
+Metrics for Hostel Gatepass Management System
+Counters and latency histograms shared across gunicorn workers, rendered in Prometheus text format
+"""
+
+import bisect
+import glob
+import json
+import mmap
+import os
+import struct
+import threading
+import time
+
+
+# Seconds; suited to KDF calls and page renders alike
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+# Per-worker metric files live here; without it metrics cover this process only
+METRICS_DIR_ENV = 'METRICS_DIR'
+
+_INITIAL_FILE_SIZE = 64 * 1024
+
+
+class _DictStore:
+    """Metric values for a single process"""
+
+    def __init__(self):
+        self._values = {}
+
+    def set(self, key, value):
+        self._values[key] = value
+
+    def inc(self, key, amount):
+        self._values[key] = self._values.get(key, 0.0) + amount
+
+    def items(self):
+        return list(self._values.items())
+
+
+class _MmapStore:
+    """
+    Metric values for one process, kept in METRICS_DIR/metrics_<pid>.db
+
+    Layout: an 8-byte count of bytes used, then entries of (4-byte key
+    length, UTF-8 key padded so the value is 8-byte aligned, 8-byte double).
+    Only the owning process writes. A new entry is written before the used
+    count is bumped, so a reader in another worker never sees half an entry.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        # Truncated in case a previous process with the same pid left one behind
+        with open(path, 'w+b') as f:
+            f.truncate(_INITIAL_FILE_SIZE)
+            self._mm = mmap.mmap(f.fileno(), _INITIAL_FILE_SIZE)
+        self._used = 8
+        struct.pack_into('q', self._mm, 0, self._used)
+        self._positions = {}
+        self._values = {}
+
+    def _append(self, key):
+        encoded = key.encode('utf-8')
+        padded = len(encoded) + (-(4 + len(encoded)) % 8)
+        size = 4 + padded + 8
+        if self._used + size > len(self._mm):
+            self._mm.resize(max(len(self._mm) * 2, self._used + size))
+        struct.pack_into(f'i{padded}sd', self._mm, self._used, len(encoded), encoded, 0.0)
+        position = self._used + 4 + padded
+        self._used += size
+        struct.pack_into('q', self._mm, 0, self._used)
+        self._positions[key] = position
+        return position
+
+    def set(self, key, value):
+        position = self._positions.get(key)
+        if position is None:
+            position = self._append(key)
+        self._values[key] = value
+        struct.pack_into('d', self._mm, position, value)
+
+    def inc(self, key, amount):
+        self.set(key, self._values.get(key, 0.0) + amount)
+
+    def items(self):
+        return list(self._values.items())
+
+
+def _read_file(path):
+    """(key, value) pairs from another worker's metric file"""
+    with open(path, 'rb') as f:
+        data = f.read()
+    if len(data) < 8:
+        return []
+    used = struct.unpack_from('q', data, 0)[0]
+    entries, position = [], 8
+    while position < used:
+        length = struct.unpack_from('i', data, position)[0]
+        key = data[position + 4:position + 4 + length].decode('utf-8')
+        position += 4 + length + (-(4 + length) % 8)
+        entries.append((key, struct.unpack_from('d', data, position)[0]))
+        position += 8
+    return entries
+
+
+_store = None
+_store_pid = None
+# Guards the store within a process; workers never contend with each other
+_store_lock = threading.Lock()
+
+
+def _get_store():
+    """This process's store (call with _store_lock held); a forked child starts its own"""
+    global _store, _store_pid
+    if _store is None or _store_pid != os.getpid():
+        directory = os.environ.get(METRICS_DIR_ENV)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+            _store = _MmapStore(os.path.join(directory, f'metrics_{os.getpid()}.db'))
+        else:
+            _store = _DictStore()
+        _store_pid = os.getpid()
+    return _store
+
+
+def _key(family, kind, sample, labels):
+    return json.dumps([family, kind, sample, sorted(labels.items())], separators=(',', ':'))
+
+
+def _format_bound(bound):
+    return '+Inf' if bound == float('inf') else repr(float(bound))
+
+
+_help = {}
+
+
+class Counter:
+    """Monotonic counter"""
+
+    def __init__(self, name, help='', labels=None):
+        self.name = name
+        self.labels = dict(labels or {})
+        self._key = _key(name, 'counter', name, self.labels)
+        _help.setdefault(name, help)
+
+    def inc(self, amount=1.0):
+        with _store_lock:
+            _get_store().inc(self._key, amount)
+
+    def set_total(self, value):
+        """Record a total this process already keeps (e.g. cache hits); workers' totals are summed"""
+        with _store_lock:
+            _get_store().set(self._key, value)
+
+
+class Histogram:
+    """Bucketed histogram of observed values (rendered with cumulative Prometheus buckets)"""
+
+    def __init__(self, name, help='', labels=None, buckets=DEFAULT_BUCKETS):
+        self.name = name
+        self.labels = dict(labels or {})
+        self.buckets = tuple(sorted(buckets))
+        # Buckets are stored per interval; render() accumulates them
+        self._bucket_keys = [_key(name, 'histogram', name + '_bucket', dict(self.labels, le=_format_bound(bound)))
+                             for bound in self.buckets]
+        self._sum_key = _key(name, 'histogram', name + '_sum', self.labels)
+        self._count_key = _key(name, 'histogram', name + '_count', self.labels)
+        _help.setdefault(name, help)
+
+    def observe(self, value):
+        index = bisect.bisect_left(self.buckets, value)
+        with _store_lock:
+            store = _get_store()
+            if index < len(self._bucket_keys):
+                store.inc(self._bucket_keys[index], 1)
+            store.inc(self._sum_key, value)
+            store.inc(self._count_key, 1)
+
+
+_registry = {}
+_registry_lock = threading.Lock()
+
+
+def _get_or_create(cls, name, help, labels, **options):
+    key = (cls, name, tuple(sorted(labels.items())))
+    metric = _registry.get(key)
+    if metric is None:
+        with _registry_lock:
+            metric = _registry.get(key)
+            if metric is None:
+                metric = _registry[key] = cls(name, help, labels, **options)
+    return metric
+
+
+def histogram(name, help='', buckets=DEFAULT_BUCKETS, **labels):
+    """Get or create the histogram for name + labels (buckets apply on first creation)"""
+    return _get_or_create(Histogram, name, help, labels, buckets=buckets)
+
+
+def counter(name, help='', **labels):
+    """Get or create the counter for name + labels"""
+    return _get_or_create(Counter, name, help, labels)
+
+
+_collectors = []
+_gauges = {}
+_last_sync = 0.0
+
+
+def add_collector(fn):
+    """
+    Register fn() to copy process-local statistics into counters
+
+    Collectors run from sync(), so subsystems that already count things
+    (the user cache, the connection pool) don't pay for metrics on every call.
+    """
+    _collectors.append(fn)
+
+
+def sync(max_age=0.0):
+    """Run the collectors, unless they ran less than max_age seconds ago"""
+    global _last_sync
+    now = time.monotonic()
+    if now - _last_sync < max_age:
+        return
+    _last_sync = now
+    for fn in _collectors:
+        fn()
+
+
+def gauge_callback(name, help, fn):
+    """
+    Register a gauge computed when metrics are rendered
+
+    fn(total) returns the value, where total(sample) sums a counter or
+    histogram sample across all labels and workers.
+    """
+    _gauges[name] = (help, fn)
+
+
+def collect():
+    """
+    Sum every worker's values
+
+    Returns:
+        dict: (family, kind, sample, labels tuple) -> value
+    """
+    directory = os.environ.get(METRICS_DIR_ENV)
+    with _store_lock:
+        store = _get_store()
+        if directory:
+            entries = []
+            for path in glob.glob(os.path.join(directory, 'metrics_*.db')):
+                try:
+                    entries.extend(_read_file(path))
+                except (OSError, struct.error, UnicodeDecodeError):
+                    continue
+        else:
+            entries = store.items()
+
+    totals = {}
+    for key, value in entries:
+        family, kind, sample, labels = json.loads(key)
+        key = (family, kind, sample, tuple(tuple(pair) for pair in labels))
+        totals[key] = totals.get(key, 0.0) + value
+    return totals
+
+
+def _format_labels(labels):
+    if not labels:
+        return ''
+    escaped = (
+        f'{name}="' + str(value).replace('\\', r'\\').replace('"', r'\"').replace('\n', r'\n') + '"'
+        for name, value in labels
+    )
+    return '{' + ','.join(escaped) + '}'
+
+
+def _format_value(value):
+    return str(int(value)) if float(value).is_integer() else repr(float(value))
+
+
+def render():
+    """All metrics, across workers, in Prometheus text exposition format"""
+    totals = collect()
+
+    families = {}
+    for (family, kind, sample, labels), value in totals.items():
+        families.setdefault((family, kind), []).append((sample, labels, value))
+
+    lines = []
+    for (family, kind), samples in sorted(families.items()):
+        if _help.get(family):
+            lines.append(f'# HELP {family} {_help[family]}')
+        lines.append(f'# TYPE {family} {kind}')
+        if kind == 'histogram':
+            samples = _cumulative_buckets(family, samples)
+        else:
+            samples = sorted(samples, key=lambda s: s[1])
+        for sample, labels, value in samples:
+            lines.append(f'{sample}{_format_labels(labels)} {_format_value(value)}')
+
+    def total(sample):
+        return sum(value for key, value in totals.items() if key[2] == sample)
+
+    for name, (help, fn) in sorted(_gauges.items()):
+        try:
+            value = fn(total)
+        except Exception as e:
+            print(f"Metric {name} failed: {e}")
+            continue
+        lines.append(f'# HELP {name} {help}')
+        lines.append(f'# TYPE {name} gauge')
+        lines.append(f'{name} {_format_value(value)}')
+
+    return '\n'.join(lines) + '\n'
+
+
+def _cumulative_buckets(family, samples):
+    """Turn per-interval bucket counts into cumulative ones, grouped per label set with +Inf, sum and count"""
+    series = {}
+    for sample, labels, value in samples:
+        if sample == family + '_bucket':
+            base = tuple(pair for pair in labels if pair[0] != 'le')
+            series.setdefault(base, {}).setdefault('buckets', {})[float(dict(labels)['le'])] = value
+        else:
+            series.setdefault(labels, {})[sample] = value
+
+    # Only intervals that saw an observation are stored; emit every bound
+    bounds = sorted({bound for values in series.values() for bound in values.get('buckets', {})})
+    result = []
+    for labels, values in sorted(series.items()):
+        running = 0.0
+        for bound in bounds:
+            running += values.get('buckets', {}).get(bound, 0.0)
+            result.append((family + '_bucket', labels + (('le', _format_bound(bound)),), running))
+        count = values.get(family + '_count', running)
+        result.append((family + '_bucket', labels + (('le', '+Inf'),), count))
+        result.append((family + '_sum', labels, values.get(family + '_sum', 0.0)))
+        result.append((family + '_count', labels, count))
+    return result
@@ -0,0 +1,216 @@
+"""
+Schema Migrations for Hostel Gatepass Management System
+Forward-only upgrades applied in place, tracked with PRAGMA user_version
+"""
+
+import sys
+
+import bulk_import
+import change_feed
+import data_versions
+import db
+import gatepass_counts
+import identities
+import timestamps
+import user_ids
+
+
+# (version, description, function) in ascending version order
+MIGRATIONS = []
+
+
+def migration(version, description):
+    """Register a migration function that upgrades the schema to `version`"""
+    def register(fn):
+        if MIGRATIONS and MIGRATIONS[-1][0] >= version:
+            raise ValueError(f"Migration {version} registered out of order")
+        MIGRATIONS.append((version, description, fn))
+        return fn
+    return register
+
+
+@migration(1, 'Composite indexes for the gatepass_requests dashboard queries')
+def _add_gatepass_indexes(cur):
+    # student_dashboard: WHERE student_id = ? ORDER BY created_at DESC
+    cur.execute('''
+        CREATE INDEX IF NOT EXISTS idx_gatepass_student_created
+        ON gatepass_requests (student_id, created_at)
+    ''')
+    # parent_dashboard: WHERE parent_email = ? [AND parent_approval_status ...] ORDER BY created_at DESC
+    cur.execute('''
+        CREATE INDEX IF NOT EXISTS idx_gatepass_parent_status_created
+        ON gatepass_requests (parent_email, parent_approval_status, created_at)
+    ''')
+    # warden_dashboard: WHERE parent_approval_status = 'Approved' AND warden_status = ? ORDER BY date_time_out DESC
+    cur.execute('''
+        CREATE INDEX IF NOT EXISTS idx_gatepass_warden_queue
+        ON gatepass_requests (parent_approval_status, warden_status, date_time_out)
+    ''')
+    # security_dashboard: WHERE parent_approval_status = 'Approved' AND security_guard_status = ? ORDER BY date_time_out DESC
+    cur.execute('''
+        CREATE INDEX IF NOT EXISTS idx_gatepass_security_queue
+        ON gatepass_requests (parent_approval_status, security_guard_status, date_time_out)
+    ''')
+
+
+@migration(2, 'Trigger-maintained gatepass_status_counts for dashboard badges')
+def _add_status_counts(cur):
+    gatepass_counts.install(cur)
+
+
+@migration(3, 'Indexes for keyset pagination of unfiltered dashboard views')
+def _add_pagination_indexes(cur):
+    # warden/security 'all': WHERE parent_approval_status = 'Approved' ORDER BY date_time_out DESC, request_id DESC
+    cur.execute('''
+        CREATE INDEX IF NOT EXISTS idx_gatepass_status_out
+        ON gatepass_requests (parent_approval_status, date_time_out)
+    ''')
+    # parent 'all'/'history': WHERE parent_email = ? ORDER BY created_at DESC, request_id DESC
+    cur.execute('''
+        CREATE INDEX IF NOT EXISTS idx_gatepass_parent_created
+        ON gatepass_requests (parent_email, created_at)
+    ''')
+
+
+@migration(4, 'Store gatepass_requests timestamps as integer Unix epochs')
+def _convert_gatepass_timestamps(cur):
+    # Values were written as browser datetime-local strings or str(datetime.now()),
+    # both local wall-clock time; the TIMESTAMP converter hands them to us as
+    # naive datetimes, which to_epoch() interprets in timestamps.LOCAL_TZ
+    unparseable = {}
+    for column in ('date_time_out', 'created_at', 'expiry_timestamp', 'parent_approval_timestamp'):
+        cur.execute(f'''
+            SELECT request_id, {column} FROM gatepass_requests
+            WHERE typeof({column}) = 'text'
+        ''')
+        updates = []
+        for request_id, value in cur.fetchall():
+            try:
+                updates.append((timestamps.to_epoch(value), request_id))
+            except (ValueError, TypeError):
+                unparseable[column] = unparseable.get(column, 0) + 1
+        cur.executemany(f'UPDATE gatepass_requests SET {column} = ? WHERE request_id = ?', updates)
+    if unparseable:
+        by_column = ', '.join(f'{column}: {count}' for column, count in unparseable.items())
+        print(f"Left {sum(unparseable.values())} unparseable timestamp values as text ({by_column})")
+
+
+@migration(5, 'id_sequences counters for race-free user ID allocation')
+def _add_id_sequences(cur):
+    user_ids.install(cur)
+
+
+@migration(6, 'identities table indexing every email across user types')
+def _add_identities(cur):
+    identities.install(cur)
+
+
+@migration(7, 'Checkpoint and link staging tables for bulk imports')
+def _add_import_tables(cur):
+    bulk_import.install(cur)
+
+
+@migration(8, 'gatepass_events change feed filled by triggers')
+def _add_gatepass_events(cur):
+    change_feed.install(cur)
+
+
+@migration(9, 'Trigger-bumped data_versions for dashboard ETags')
+def _add_data_versions(cur):
+    data_versions.install(cur)
+
+
+def get_schema_version(cur):
+    cur.execute('PRAGMA user_version')
+    return cur.fetchone()[0]
+
+
+def has_base_schema(cur):
+    """True once db_init.py has created the core tables"""
+    cur.execute("SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'gatepass_requests'")
+    return cur.fetchone() is not None
+
+
+def migrate(conn=None, target=None, verbose=False):
+    """
+    Apply every pending migration up to `target` (default: latest)
+
+    Each migration runs in its own BEGIN IMMEDIATE transaction together with
+    the user_version bump, so concurrent workers starting at the same time
+    apply it exactly once and a failed migration leaves the previous version.
+
+    Args:
+        conn: Connection to upgrade (a pooled one is checked out if omitted)
+        target: Highest version to apply
+        verbose: Print each migration as it is applied
+
+    Returns:
+        int: Schema version after upgrading (0 if the base schema is missing)
+    """
+    own_conn = conn is None
+    if own_conn:
+        conn = db.get_db_connection()
+
+    isolation_level = conn.isolation_level
+    if conn.in_transaction:
+        conn.commit()
+    conn.isolation_level = None
+    cur = conn.cursor()
+
+    try:
+        if not has_base_schema(cur):
+            return 0
+
+        version = get_schema_version(cur)
+        for mig_version, description, fn in MIGRATIONS:
+            if mig_version <= version or (target is not None and mig_version > target):
+                continue
+
+            cur.execute('BEGIN IMMEDIATE')
+            try:
+                # Another process may have upgraded while we waited for the lock
+                version = get_schema_version(cur)
+                if mig_version <= version:
+                    cur.execute('COMMIT')
+                    continue
+                fn(cur)
+                cur.execute(f'PRAGMA user_version = {int(mig_version)}')
+                cur.execute('COMMIT')
+            except Exception:
+                cur.execute('ROLLBACK')
+                raise
+
+            version = mig_version
+            if verbose:
+                print(f"Applied migration {mig_version}: {description}")
+
+        return version
+    finally:
+        cur.close()
+        conn.isolation_level = isolation_level
+        if own_conn:
+            conn.close()
+
+
+def latest_version():
+    return MIGRATIONS[-1][0] if MIGRATIONS else 0
+
+
+if __name__ == '__main__':
+    conn = db.get_db_connection()
+    cur = conn.cursor()
+    if not has_base_schema(cur):
+        print("No gatepass schema found - run db_init.py first")
+        sys.exit(1)
+    print(f"Current schema version: {get_schema_version(cur)} (latest: {latest_version()})")
+    cur.close()
+
+    if '--status' not in sys.argv:
+        try:
+            version = migrate(conn, verbose=True)
+        except identities.IdentityConflict as e:
+            print(f"Migration refused: {e}")
+            conn.close()
+            sys.exit(1)
+        print(f"Database is at schema version {version}")
+    conn.close()
@@ -0,0 +1,91 @@
+"""
+Row Models for Hostel Gatepass Management System
+Typed gatepass rows built directly by a sqlite3 row factory
+"""
+
+from datetime import datetime
+from functools import lru_cache
+
+import timestamps
+
+
+DISPLAY_FORMAT = '%d %b, %I:%M %p'
+
+
+@lru_cache(maxsize=4096)
+def format_timestamp(value):
+    """
+    Format a stored timestamp for display, memoized per distinct value
+
+    Args:
+        value: datetime (as produced by the TIMESTAMP converter) or ISO 8601 string
+
+    Returns:
+        str: e.g. '15 Jan, 10:00 AM', the raw value if it can't be parsed,
+             or None for an empty value
+    """
+    if not value:
+        return None
+    try:
+        if isinstance(value, str):
+            value = datetime.fromisoformat(value.replace('Z', '+00:00'))
+        if value.tzinfo is not None:
+            value = value.astimezone(timestamps.LOCAL_TZ)
+        return value.strftime(DISPLAY_FORMAT)
+    except (ValueError, AttributeError):
+        return str(value)
+
+
+class GatepassRow:
+    """
+    One gatepass_requests row (optionally joined with the student's name)
+
+    Columns not selected by a query are None. date_time_out_display is
+    filled in when the row is built so templates never format timestamps.
+    """
+
+    __slots__ = (
+        'request_id', 'student_id', 'student_name', 'parent_email',
+        'date_time_out', 'duration_hours', 'destination', 'purpose',
+        'parent_approval_status', 'parent_approval_timestamp',
+        'created_at', 'expiry_timestamp', 'warden_status', 'security_guard_status',
+        'date_time_out_display',
+    )
+
+    def __init__(self, **fields):
+        for name in self.__slots__:
+            setattr(self, name, fields.get(name))
+        self.date_time_out_display = format_timestamp(self.date_time_out)
+
+    def __repr__(self):
+        return f"<GatepassRow #{self.request_id} {self.parent_approval_status}>"
+
+
+@lru_cache(maxsize=64)
+def _row_layout(description):
+    """Selected column names plus the slots the query did not select"""
+    names = tuple(column[0] for column in description)
+    unknown = set(names) - set(GatepassRow.__slots__)
+    if unknown:
+        raise ValueError(f"Columns not on GatepassRow: {', '.join(sorted(unknown))}")
+    missing = tuple(name for name in GatepassRow.__slots__ if name not in names)
+    return names, missing
+
+
+def gatepass_row_factory(cursor, row):
+    """sqlite3 row factory producing GatepassRow objects without an intermediate dict"""
+    names, missing = _row_layout(cursor.description)
+    obj = GatepassRow.__new__(GatepassRow)
+    for name, value in zip(names, row):
+        setattr(obj, name, value)
+    for name in missing:
+        setattr(obj, name, None)
+    obj.date_time_out_display = format_timestamp(obj.date_time_out)
+    return obj
+
+
+def gatepass_cursor(conn):
+    """Cursor on conn whose rows are GatepassRow objects"""
+    cur = conn.cursor()
+    cur.row_factory = gatepass_row_factory
+    return cur
@@ -0,0 +1,144 @@
+"""
+Keyset Pagination for Hostel Gatepass Management System
+Cursor-based paging over (sort column, request_id) so page cost stays constant
+"""
+
+import base64
+import json
+import os
+
+import timestamps
+
+
+DEFAULT_PAGE_SIZE = int(os.environ.get('DASHBOARD_PAGE_SIZE', 50))
+MAX_PAGE_SIZE = 200
+
+
+class Page:
+    """One page of dashboard rows plus the cursors for its neighbours"""
+
+    def __init__(self, rows, page_size, next_cursor=None, prev_cursor=None):
+        self.rows = rows
+        self.page_size = page_size
+        self.next_cursor = next_cursor
+        self.prev_cursor = prev_cursor
+        # Only carry page_size through links when it isn't the default
+        self.size_args = {} if page_size == DEFAULT_PAGE_SIZE else {'page_size': page_size}
+
+    @property
+    def has_next(self):
+        return self.next_cursor is not None
+
+    @property
+    def has_prev(self):
+        return self.prev_cursor is not None
+
+
+def encode_cursor(sort_value, request_id):
+    """Opaque, URL-safe cursor for the row with the given sort key"""
+    # Timestamp columns are stored as epochs, so that's what the cursor carries
+    raw = json.dumps([sort_value, request_id], separators=(',', ':'), default=timestamps.to_epoch)
+    return base64.urlsafe_b64encode(raw.encode()).decode().rstrip('=')
+
+
+def decode_cursor(cursor):
+    """Inverse of encode_cursor; returns None for a missing or malformed cursor"""
+    if not cursor:
+        return None
+    try:
+        raw = base64.urlsafe_b64decode(cursor + '=' * (-len(cursor) % 4))
+        sort_value, request_id = json.loads(raw)
+        request_id = int(request_id)
+    except (ValueError, TypeError, OverflowError):
+        return None
+    # Sort values are epochs or text; anything else would be bound into the keyset SQL
+    if isinstance(sort_value, bool) or not isinstance(sort_value, (int, str)):
+        return None
+    return sort_value, request_id
+
+
+def get_page_args(args):
+    """
+    Read paging parameters from a request's query string
+
+    Returns:
+        tuple: (after, before, page_size) with cursors decoded
+    """
+    try:
+        page_size = int(args.get('page_size', DEFAULT_PAGE_SIZE))
+    except ValueError:
+        page_size = DEFAULT_PAGE_SIZE
+    page_size = max(1, min(page_size, MAX_PAGE_SIZE))
+    return decode_cursor(args.get('after')), decode_cursor(args.get('before')), page_size
+
+
+def paginate(cur, base_query, params, sort_column, id_column, sort_attr,
+             after=None, before=None, page_size=DEFAULT_PAGE_SIZE):
+    """
+    Run base_query one page at a time, newest first
+
+    base_query must already contain a WHERE clause; the keyset predicate and
+    ORDER BY are appended here. Rows come back ordered by (sort_column,
+    id_column) descending, which the gatepass_requests indexes serve without a
+    sort because request_id is the rowid at the end of every index.
+
+    Args:
+        cur: Cursor to execute with, producing GatepassRow objects
+        base_query: SELECT ... WHERE ... without ORDER BY
+        params: Parameters for base_query
+        sort_column / id_column: SQL expressions for the sort key
+        sort_attr: GatepassRow attribute holding the sort column's value
+        after: Decoded cursor - return rows strictly older than it
+        before: Decoded cursor - return rows strictly newer than it
+        page_size: Rows per page
+
+    Returns:
+        Page: rows plus next/previous cursors
+    """
+    query = base_query
+    params = tuple(params)
+
+    if before is not None:
+        query += f" AND ({sort_column}, {id_column}) > (?, ?)"
+        query += f" ORDER BY {sort_column} ASC, {id_column} ASC LIMIT ?"
+        params += (before[0], before[1], page_size + 1)
+    else:
+        if after is not None:
+            query += f" AND ({sort_column}, {id_column}) < (?, ?)"
+            params += (after[0], after[1])
+        query += f" ORDER BY {sort_column} DESC, {id_column} DESC LIMIT ?"
+        params += (page_size + 1,)
+
+    cur.execute(query, params)
+    return make_page(cur.fetchall(), page_size, after, before, sort_attr)
+
+
+def make_page(rows, page_size, after, before, sort_attr):
+    """
+    Page from up to page_size + 1 rows fetched in keyset order
+
+    Args:
+        rows: Rows past the cursor, newest first - or, for a `before`
+              cursor, oldest first (as paginate's queries return them)
+        page_size / after / before: As passed to paginate
+        sort_attr: GatepassRow attribute holding the sort column's value
+
+    Returns:
+        Page: rows plus next/previous cursors
+    """
+    has_more = len(rows) > page_size
+    rows = rows[:page_size]
+
+    if before is not None:
+        rows.reverse()
+        has_next, has_prev = True, has_more
+    else:
+        has_next, has_prev = has_more, after is not None
+
+    next_cursor = prev_cursor = None
+    if rows and has_next:
+        next_cursor = encode_cursor(getattr(rows[-1], sort_attr), rows[-1].request_id)
+    if rows and has_prev:
+        prev_cursor = encode_cursor(getattr(rows[0], sort_attr), rows[0].request_id)
+
+    return Page(rows, page_size, next_cursor, prev_cursor)
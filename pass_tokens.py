@@ -0,0 +1,62 @@
+"""
+Pass Tokens for Hostel Gatepass Management System
+Compact HMAC-signed tokens naming a gatepass, shown as QR codes and read by gate scanners
+"""
+
+import base64
+import hashlib
+import hmac
+import os
+import re
+
+
+# Dedicated key if set, otherwise the Flask session secret
+SECRET = os.environ.get('PASS_TOKEN_SECRET') or os.environ.get('SESSION_SECRET', 'dev-secret-key')
+
+# 80-bit tag; tokens are only ever checked online, so forging means guessing it
+SIGNATURE_BYTES = 10
+
+# Upper-case letters, digits and '.' only, so QR codes use the dense alphanumeric mode
+_TOKEN_RE = re.compile(r'^GP(\d+)\.([A-Z2-7]+)$')
+
+
+def _signature(request_id, secret=None):
+    digest = hmac.new((secret or SECRET).encode('utf-8'), f'gatepass:{request_id}'.encode('ascii'),
+                      hashlib.sha256).digest()
+    return base64.b32encode(digest[:SIGNATURE_BYTES]).decode('ascii')
+
+
+def make_pass_token(request_id, secret=None):
+    """
+    Signed token for a gatepass, e.g. 'GP1234.ABCDEFGHIJKLMNOP'
+
+    Args:
+        request_id: gatepass_requests.request_id
+        secret: Signing key (defaults to PASS_TOKEN_SECRET / SESSION_SECRET)
+
+    Returns:
+        str: The token
+    """
+    return f'GP{int(request_id)}.{_signature(int(request_id), secret)}'
+
+
+def verify_pass_token(token, secret=None):
+    """
+    Check a scanned token's signature
+
+    Keyboard-wedge scanners may send lower case or trailing whitespace, so
+    both are tolerated. Whether the gatepass can actually be used is for the
+    caller's conditional UPDATE to decide.
+
+    Returns:
+        int: The request_id, or None if the token is malformed or forged
+    """
+    if not isinstance(token, str):
+        return None
+    match = _TOKEN_RE.match(token.strip().upper())
+    if not match:
+        return None
+    request_id = int(match.group(1))
+    if not hmac.compare_digest(match.group(2), _signature(request_id, secret)):
+        return None
+    return request_id
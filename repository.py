@@ -0,0 +1,1094 @@
+"""
+Storage Backends for Hostel Gatepass Management System
+One repository interface for every route, backed by SQLite or by in-memory hash indexes
+
+STORAGE_BACKEND picks the backend for the process:
+
+    sqlite   (default) the pooled database at DATABASE_PATH, as used by app.py
+    memory   everything in this process's memory, indexed by student_id,
+             parent_email and status; seeded from MEMORY_SEED_DB (a SQLite
+             file) or the demo accounts, and written to MEMORY_SNAPSHOT
+             (e.g. /tmp/gatepass-memory.json) so a warm serverless container
+             keeps its data between invocations
+
+The memory backend is per process: it suits the serverless demos and
+benchmarks, not several gunicorn workers sharing one set of data.
+"""
+
+import abc
+import atexit
+import bisect
+import heapq
+import json
+import os
+import random
+import sqlite3
+import threading
+from collections import defaultdict
+from datetime import datetime, timezone
+
+import change_feed
+import data_versions
+import db
+import expiry
+import gatepass_counts
+import gatepass_transitions
+import hashing
+import migrations
+import timestamps
+import user_registration
+from demo_credentials import DEMO_ACCOUNTS, DEMO_LINKS, DEMO_PASSWORD_HASH
+from models import GatepassRow, gatepass_cursor
+from pagination import DEFAULT_PAGE_SIZE, make_page, paginate
+from user_cache import invalidate_user
+from user_ids import USER_ID_SOURCES, format_user_id
+from user_registration import REJECTED_REGISTRATION_ERROR
+
+
+BACKEND = os.environ.get('STORAGE_BACKEND', 'sqlite').lower()
+MEMORY_SNAPSHOT = os.environ.get('MEMORY_SNAPSHOT')
+MEMORY_SEED_DB = os.environ.get('MEMORY_SEED_DB')
+# A burst of writes is snapshotted once, this many seconds after the first
+SNAPSHOT_INTERVAL = float(os.environ.get('MEMORY_SNAPSHOT_INTERVAL', 2))
+
+APPROVED = {'parent_approval_status': ('Approved',)}
+_REQUESTER_FILTERS = {
+    'all': {},
+    'pending': {'parent_approval_status': ('Pending',)},
+    'history': {'parent_approval_status': gatepass_counts.HISTORY_STATUSES},
+}
+
+# view -> filter_type -> {column: allowed values}; unknown filters show 'all'
+# (the warden and security dashboards only ever list parent-approved requests)
+VIEW_FILTERS = {
+    'student': _REQUESTER_FILTERS,
+    'parent': _REQUESTER_FILTERS,
+    'warden': {
+        'all': APPROVED,
+        'pending': dict(APPROVED, warden_status=('Open',)),
+        'history': dict(APPROVED, warden_status=('Closed',)),
+    },
+    'security': {
+        'all': APPROVED,
+        'checkout': dict(APPROVED, security_guard_status=('Pending',)),
+        'checkin': dict(APPROVED, security_guard_status=('Out',)),
+        'completed': dict(APPROVED, security_guard_status=('In',)),
+    },
+}
+
+# view -> (column matched against the view's key, sort column), newest first
+VIEW_KEYS = {
+    'student': ('student_id', 'created_at'),
+    'parent': ('parent_email', 'created_at'),
+    'warden': (None, 'date_time_out'),
+    'security': (None, 'date_time_out'),
+}
+
+# view -> (gatepass_status_counts scope, badge function)
+VIEW_COUNTS = {
+    'student': ('student', gatepass_counts.requester_badges),
+    'parent': ('parent', gatepass_counts.requester_badges),
+    'warden': ('global', gatepass_counts.warden_badges),
+    'security': ('global', gatepass_counts.security_badges),
+}
+
+GATEPASS_COLUMNS = (
+    'request_id', 'student_id', 'parent_email', 'date_time_out', 'duration_hours',
+    'destination', 'purpose', 'parent_approval_status', 'parent_approval_timestamp',
+    'created_at', 'expiry_timestamp', 'warden_status', 'security_guard_status',
+)
+TIMESTAMP_COLUMNS = ('date_time_out', 'parent_approval_timestamp', 'created_at', 'expiry_timestamp')
+
+REGISTRATION_FIELDS = {
+    'student': ('parent_id', 'hostel_block', 'room_number', 'course', 'year_of_study'),
+    'parent': ('student_id', 'relationship', 'address'),
+    'warden': ('designation', 'hostel_block'),
+    'security': ('shift', 'gate_assigned'),
+}
+
+
+def view_filter(view, filter_type):
+    """{column: allowed values} a row must match to appear on a dashboard view"""
+    filters = VIEW_FILTERS[view]
+    return filters.get(filter_type, filters['all'])
+
+
+class Repository(abc.ABC):
+    """
+    Everything the routes read and write, independent of where it is stored
+
+    Users are identified by (role, user_id) with role one of 'student',
+    'parent', 'warden', 'security'. Dashboard methods take a view (the same
+    role names) and, for students and parents, the key their rows are
+    matched on (student_id or parent_email). Results use the same shapes
+    as the SQL modules: GatepassRow lists and pagination.Page for
+    gatepasses, {'success': ...} dicts for writes.
+    """
+
+    name = None
+    # Whether the SSE change feed (change_feed.py) can see this store's writes
+    live_updates = False
+
+    def start_background_tasks(self):
+        """Start per-process background work; called before every request"""
+
+    # Users
+
+    @abc.abstractmethod
+    def get_user(self, role, user_id):
+        """(user_id, name) of an active user, or None"""
+
+    @abc.abstractmethod
+    def get_login(self, role, user_id):
+        """(user_id, name, password_hash) of an active user, or None"""
+
+    @abc.abstractmethod
+    def parent_email(self, parent_id):
+        """A parent's email, or None"""
+
+    @abc.abstractmethod
+    def student_name(self, student_id):
+        """A student's name, or None"""
+
+    @abc.abstractmethod
+    def student_parent(self, student_id):
+        """(email, name) of the parent linked to a student, or None"""
+
+    @abc.abstractmethod
+    def active_parent_by_email(self, email):
+        """(parent_id, name) of the active parent account with this email, or None"""
+
+    # Gatepasses
+
+    @abc.abstractmethod
+    def create_gatepass(self, student_id, parent_email, date_time_out, duration_hours,
+                        destination, purpose, created_at, expiry_timestamp):
+        """
+        Store a new Pending gatepass request
+
+        Returns:
+            int: The new request_id
+        """
+
+    @abc.abstractmethod
+    def list_gatepasses(self, view, key, filter_type, after=None, before=None, page_size=DEFAULT_PAGE_SIZE):
+        """
+        One page of a dashboard view, newest first
+
+        Args:
+            view: 'student', 'parent', 'warden' or 'security'
+            key: student_id / parent_email for the student and parent views
+            filter_type: Key of VIEW_FILTERS[view]
+            after / before / page_size: From pagination.get_page_args
+
+        Returns:
+            Page: GatepassRow objects (with student_name) plus cursors
+        """
+
+    @abc.abstractmethod
+    def search_approved(self, student_id):
+        """A student's parent-approved gatepasses, latest departure first"""
+
+    @abc.abstractmethod
+    def counts(self, view, key=None):
+        """Badge counts for a dashboard view (as gatepass_counts.*_counts)"""
+
+    @abc.abstractmethod
+    def versions(self, scopes):
+        """
+        Change counters for dashboard ETags (as data_versions.current)
+
+        Returns:
+            tuple: Store epoch, then one version per (scope, scope_key)
+        """
+
+    @abc.abstractmethod
+    def transition(self, name, request_id, owner=None):
+        """Apply a gatepass_transitions.TRANSITIONS entry (as gatepass_transitions.transition)"""
+
+    # Registrations
+
+    @abc.abstractmethod
+    def register_user(self, user_type, name, email, phone, password, **kwargs):
+        """Create a pending registration (as user_registration.register_new_user)"""
+
+    @abc.abstractmethod
+    def pending_registrations(self):
+        """Pending registrations as dicts, newest first"""
+
+    @abc.abstractmethod
+    def pending_registration_count(self):
+        """Number of pending registrations"""
+
+    @abc.abstractmethod
+    def approve_registrations(self, registration_ids, reviewed_by):
+        """Approve many registrations (as user_registration.approve_registrations)"""
+
+    @abc.abstractmethod
+    def reject_registrations(self, registration_ids, reviewed_by, reason):
+        """Reject many registrations (as user_registration.reject_registrations)"""
+
+    def approve_registration(self, registration_id, reviewed_by):
+        batch = self.approve_registrations([registration_id], reviewed_by)
+        if not batch['success']:
+            return batch
+        result = batch['results'][0]
+        if not result['success']:
+            return {'success': False, 'error': result['error']}
+        return {
+            'success': True,
+            'user_id': result['user_id'],
+            'message': f"Registration approved. User ID: {result['user_id']}"
+        }
+
+    def reject_registration(self, registration_id, reviewed_by, reason):
+        batch = self.reject_registrations([registration_id], reviewed_by, reason)
+        if not batch['success']:
+            return batch
+        result = batch['results'][0]
+        if not result['success']:
+            return {'success': False, 'error': result['error']}
+        return {'success': True, 'message': 'Registration rejected'}
+
+
+# view -> GatepassRow fields its SELECT fills (the memory backend fills the same ones)
+_VIEW_COLUMNS = {
+    'student': ('request_id', 'date_time_out', 'duration_hours', 'destination', 'purpose',
+                'parent_approval_status', 'created_at', 'expiry_timestamp', 'warden_status',
+                'security_guard_status'),
+    'parent': ('request_id', 'student_name', 'student_id', 'date_time_out', 'duration_hours',
+               'destination', 'purpose', 'parent_approval_status', 'created_at', 'expiry_timestamp'),
+}
+_VIEW_COLUMNS['warden'] = _VIEW_COLUMNS['security'] = (
+    'request_id', 'student_name', 'student_id', 'date_time_out', 'duration_hours', 'destination',
+    'purpose', 'parent_approval_status', 'warden_status', 'security_guard_status',
+)
+
+# view -> SELECT ... FROM gatepass_requests r ... (WHERE clauses are added per filter)
+_VIEW_SELECTS = {
+    'student': '''
+        SELECT r.request_id, r.date_time_out, r.duration_hours, r.destination, r.purpose,
+               r.parent_approval_status, r.created_at, r.expiry_timestamp, r.warden_status, r.security_guard_status
+        FROM gatepass_requests r
+    ''',
+    'parent': '''
+        SELECT r.request_id, s.name AS student_name, s.student_id, r.date_time_out, r.duration_hours,
+               r.destination, r.purpose, r.parent_approval_status, r.created_at, r.expiry_timestamp
+        FROM gatepass_requests r
+        JOIN students s ON r.student_id = s.student_id
+    ''',
+}
+_VIEW_SELECTS['warden'] = _VIEW_SELECTS['security'] = '''
+        SELECT r.request_id, s.name AS student_name, s.student_id, r.date_time_out, r.duration_hours,
+               r.destination, r.purpose, r.parent_approval_status, r.warden_status, r.security_guard_status
+        FROM gatepass_requests r
+        JOIN students s ON r.student_id = s.student_id
+    '''
+
+
+def _status_clause(column, allowed):
+    # Statuses are constants from VIEW_FILTERS, inlined so the planner sees them
+    if len(allowed) == 1:
+        return f"r.{column} = '{allowed[0]}'"
+    return f"r.{column} IN ({', '.join(repr(status) for status in allowed)})"
+
+
+class SqliteRepository(Repository):
+    """The pooled SQLite database (db.py), with the schema kept current by migrations.py"""
+
+    name = 'sqlite'
+
+    def __init__(self):
+        # Upgrade an existing database in place before serving requests
+        migrations.migrate()
+
+    @property
+    def live_updates(self):
+        return change_feed.ENABLED
+
+    def start_background_tasks(self):
+        # Started lazily so each forked worker gets its own thread
+        expiry.ensure_started()
+
+    def _fetchone(self, query, params):
+        conn = db.get_db_connection()
+        try:
+            return conn.execute(query, params).fetchone()
+        finally:
+            conn.close()
+
+    def get_user(self, role, user_id):
+        _, table, id_column = USER_ID_SOURCES[role]
+        return self._fetchone(f'SELECT {id_column}, name FROM {table} WHERE {id_column} = ? AND is_active = 1',
+                              (user_id,))
+
+    def get_login(self, role, user_id):
+        _, table, id_column = USER_ID_SOURCES[role]
+        return self._fetchone(f'SELECT {id_column}, name, password_hash FROM {table} '
+                              f'WHERE {id_column} = ? AND is_active = 1', (user_id,))
+
+    def parent_email(self, parent_id):
+        row = self._fetchone('SELECT email FROM parents WHERE parent_id = ?', (parent_id,))
+        return row[0] if row else None
+
+    def student_name(self, student_id):
+        row = self._fetchone('SELECT name FROM students WHERE student_id = ?', (student_id,))
+        return row[0] if row else None
+
+    def student_parent(self, student_id):
+        return self._fetchone('''
+            SELECT p.email, p.name
+            FROM parents p
+            JOIN student_parent_links spl ON p.parent_id = spl.parent_id
+            WHERE spl.student_id = ?
+        ''', (student_id,))
+
+    def active_parent_by_email(self, email):
+        # parents.email rather than identities: it names the parent even if
+        # another account type shares the address
+        return self._fetchone(
+            'SELECT parent_id, name FROM parents WHERE email = ? AND is_active = 1', (email,))
+
+    def create_gatepass(self, student_id, parent_email, date_time_out, duration_hours,
+                        destination, purpose, created_at, expiry_timestamp):
+        conn = db.get_db_connection()
+        try:
+            cur = conn.execute('''
+                INSERT INTO gatepass_requests
+                (student_id, parent_email, date_time_out, duration_hours, destination, purpose, created_at, expiry_timestamp)
+                VALUES (?, ?, ?, ?, ?, ?, ?, ?)
+            ''', (student_id, parent_email, date_time_out, duration_hours, destination, purpose,
+                  created_at, expiry_timestamp))
+            request_id = cur.lastrowid
+            conn.commit()
+        finally:
+            conn.close()
+        expiry.scheduler.schedule(request_id, expiry_timestamp)
+        return request_id
+
+    def list_gatepasses(self, view, key, filter_type, after=None, before=None, page_size=DEFAULT_PAGE_SIZE):
+        owner_column, sort_column = VIEW_KEYS[view]
+        clauses, params = [], ()
+        if owner_column:
+            clauses.append(f'r.{owner_column} = ?')
+            params = (key,)
+        clauses += [_status_clause(column, allowed) for column, allowed in view_filter(view, filter_type).items()]
+        base_query = _VIEW_SELECTS[view] + 'WHERE ' + ' AND '.join(clauses)
+
+        conn = db.get_db_connection()
+        try:
+            return paginate(gatepass_cursor(conn), base_query, params,
+                            f'r.{sort_column}', 'r.request_id', sort_column,
+                            after, before, page_size)
+        finally:
+            conn.close()
+
+    def search_approved(self, student_id):
+        conn = db.get_db_connection()
+        try:
+            cur = gatepass_cursor(conn)
+            cur.execute('''
+                SELECT r.request_id, r.student_id, s.name AS student_name, r.date_time_out, r.duration_hours,
+                       r.destination, r.purpose, r.parent_approval_status, r.warden_status, r.security_guard_status
+                FROM gatepass_requests r
+                JOIN students s ON r.student_id = s.student_id
+                WHERE r.student_id = ? AND r.parent_approval_status = 'Approved'
+                ORDER BY r.date_time_out DESC
+            ''', (student_id,))
+            return cur.fetchall()
+        finally:
+            conn.close()
+
+    def counts(self, view, key=None):
+        scope, badges = VIEW_COUNTS[view]
+        conn = db.get_db_connection()
+        try:
+            return badges(gatepass_counts.get_status_counts(conn.cursor(), scope, key or ''))
+        finally:
+            conn.close()
+
+    def versions(self, scopes):
+        conn = db.get_db_connection()
+        try:
+            return data_versions.current(conn.cursor(), scopes)
+        finally:
+            conn.close()
+
+    def transition(self, name, request_id, owner=None):
+        return gatepass_transitions.transition(name, request_id, owner=owner)
+
+    def register_user(self, user_type, name, email, phone, password, **kwargs):
+        return user_registration.register_new_user(user_type, name, email, phone, password, **kwargs)
+
+    def pending_registrations(self):
+        return user_registration.get_pending_registrations()
+
+    def pending_registration_count(self):
+        return self._fetchone("SELECT COUNT(*) FROM pending_registrations WHERE status = 'pending'", ())[0]
+
+    def approve_registrations(self, registration_ids, reviewed_by):
+        return user_registration.approve_registrations(registration_ids, reviewed_by)
+
+    def reject_registrations(self, registration_ids, reviewed_by, reason):
+        return user_registration.reject_registrations(registration_ids, reviewed_by, reason)
+
+
+class MemoryRepository(Repository):
+    """
+    All data in dicts, with hash indexes instead of table scans
+
+    Gatepasses are indexed by student_id, parent_email and (status column,
+    value), so a dashboard only looks at the rows of its smallest matching
+    index and keeps the top page with a heap. The warden and security views
+    walk Approved rows in date_time_out order instead, so their first page
+    costs the same however many gatepasses have been approved. Badge
+    counters and data versions are updated alongside every write, as the
+    SQLite triggers do. Pending requests are expired lazily: every read
+    first expires whatever is due on a heap of expiry times, so no
+    background thread is needed. Timestamps are stored as epochs, like the
+    SQLite backend.
+
+    One lock guards everything; it is only held for in-memory work.
+    """
+
+    name = 'memory'
+
+    def __init__(self, snapshot_path=None):
+        self.snapshot_path = snapshot_path
+        self._lock = threading.RLock()
+        self._snapshot_timer = None
+        # Versions from another store (or an earlier run) must never match
+        self._epoch = random.getrandbits(62)
+        self._reset()
+        if snapshot_path:
+            atexit.register(self.save_snapshot)
+
+    def _reset(self):
+        self._users = {user_type: {} for user_type in USER_ID_SOURCES}
+        self._identities = {}                     # email -> [user_type, user_id, status]
+        self._parent_emails = {}                  # email -> parent_id
+        self._parents_of = defaultdict(list)      # student_id -> [parent_id, ...]
+        self._last_user_id = {prefix: 0 for prefix, _, _ in USER_ID_SOURCES.values()}
+
+        self._gatepasses = {}                     # request_id -> record (epoch timestamps)
+        self._by_student = defaultdict(set)       # student_id -> {request_id}
+        self._by_parent = defaultdict(set)        # parent_email -> {request_id}
+        self._by_status = defaultdict(set)        # (status column, value) -> {request_id}
+        self._expiries = []                       # heap of (expiry epoch, request_id), Pending only
+        self._approved_order = None               # sorted [(date_time_out, request_id)], built on first use
+        self._last_request_id = 0
+
+        self._registrations = {}                  # registration_id -> dict
+        self._pending_registration_ids = set()
+        self._registration_emails = set()         # (user_type, email) of every registration, any status
+        self._last_registration_id = 0
+
+        self._counts = defaultdict(lambda: defaultdict(int))   # (scope, scope_key) -> {status_key: n}
+        self._versions = defaultdict(int)                       # (scope, scope_key) -> version
+
+    # Loading and snapshots
+
+    def load_demo(self):
+        """Start from the demo accounts (password: college123)"""
+        with self._lock:
+            self._reset()
+            for user_type, accounts in DEMO_ACCOUNTS.items():
+                for account in accounts:
+                    self._add_user(user_type, dict(account, password_hash=DEMO_PASSWORD_HASH, is_active=1))
+            for student_id, parent_id in DEMO_LINKS:
+                self._parents_of[student_id].append(parent_id)
+
+    def load_sqlite(self, path):
+        """Replace the contents with a copy of a SQLite database's users, links, gatepasses and registrations"""
+        conn = sqlite3.connect(path)
+        conn.row_factory = sqlite3.Row
+        try:
+            with self._lock:
+                self._reset()
+                for user_type, (_, table, _) in USER_ID_SOURCES.items():
+                    for row in conn.execute(f'SELECT * FROM {table}'):
+                        self._add_user(user_type, dict(row))
+                for student_id, parent_id in conn.execute('SELECT student_id, parent_id FROM student_parent_links'):
+                    self._parents_of[student_id].append(parent_id)
+                for row in conn.execute(f"SELECT {', '.join(GATEPASS_COLUMNS)} FROM gatepass_requests"):
+                    record = dict(row)
+                    for column in TIMESTAMP_COLUMNS:
+                        record[column] = timestamps.to_epoch(record[column])
+                    self._insert_gatepass(record)
+                for row in conn.execute('SELECT * FROM pending_registrations'):
+                    self._add_registration(dict(row))
+        finally:
+            conn.close()
+
+    def load_snapshot(self):
+        """
+        Replace the contents with the snapshot at snapshot_path
+
+        Returns:
+            bool: False if there is no snapshot to load
+        """
+        if not self.snapshot_path or not os.path.exists(self.snapshot_path):
+            return False
+        try:
+            with open(self.snapshot_path) as f:
+                state = json.load(f)
+        except (OSError, ValueError) as e:
+            print(f"Ignoring unreadable snapshot {self.snapshot_path}: {e}")
+            return False
+        with self._lock:
+            self._reset()
+            for user_type, users in state['users'].items():
+                for row in users:
+                    self._add_user(user_type, row)
+            for student_id, parent_ids in state['links'].items():
+                self._parents_of[student_id].extend(parent_ids)
+            for record in state['gatepasses']:
+                self._insert_gatepass(record)
+            for registration in state['registrations']:
+                self._add_registration(registration)
+            self._last_request_id = max(self._last_request_id, state['last_request_id'])
+            self._last_registration_id = max(self._last_registration_id, state['last_registration_id'])
+        return True
+
+    def save_snapshot(self):
+        """Write the contents to snapshot_path (atomically, via a temporary file)"""
+        if not self.snapshot_path:
+            return
+        with self._lock:
+            self._snapshot_timer = None
+            data = json.dumps({
+                'users': {user_type: list(users.values()) for user_type, users in self._users.items()},
+                'links': self._parents_of,
+                'gatepasses': list(self._gatepasses.values()),
+                'registrations': list(self._registrations.values()),
+                'last_request_id': self._last_request_id,
+                'last_registration_id': self._last_registration_id,
+            }, default=str)
+        tmp_path = f'{self.snapshot_path}.{os.getpid()}.tmp'
+        try:
+            with open(tmp_path, 'w') as f:
+                f.write(data)
+            os.replace(tmp_path, self.snapshot_path)
+        except OSError as e:
+            print(f"Could not write snapshot {self.snapshot_path}: {e}")
+
+    def _changed(self):
+        # Caller holds the lock; the snapshot is written off the request path
+        if self.snapshot_path and self._snapshot_timer is None:
+            self._snapshot_timer = threading.Timer(SNAPSHOT_INTERVAL, self.save_snapshot)
+            self._snapshot_timer.daemon = True
+            self._snapshot_timer.start()
+
+    # Index maintenance (caller holds the lock)
+
+    def _add_user(self, user_type, row):
+        prefix, _, id_column = USER_ID_SOURCES[user_type]
+        user_id = row[id_column]
+        row.setdefault('is_active', 1)
+        self._users[user_type][user_id] = row
+        if user_type == 'parent' and row.get('email'):
+            self._parent_emails[row['email']] = user_id
+        if row.get('email'):
+            # Accounts win over pending registrations for the same email
+            self._identities[row['email']] = [user_type, user_id, 'active' if row['is_active'] else 'inactive']
+        self._note_user_id(prefix, user_id)
+
+    def _note_user_id(self, prefix, user_id):
+        suffix = user_id[len(prefix):] if user_id.startswith(prefix) else ''
+        if suffix.isdigit():
+            self._last_user_id[prefix] = max(self._last_user_id[prefix], int(suffix))
+
+    def _add_registration(self, registration):
+        registration_id = registration['registration_id']
+        self._registrations[registration_id] = registration
+        self._last_registration_id = max(self._last_registration_id, registration_id)
+        self._registration_emails.add((registration['user_type'], registration['email']))
+        self._note_user_id(USER_ID_SOURCES[registration['user_type']][0], registration['proposed_user_id'])
+        if registration['status'] == 'pending':
+            self._pending_registration_ids.add(registration_id)
+            self._identities.setdefault(registration['email'],
+                                        [registration['user_type'], registration['proposed_user_id'], 'pending'])
+
+    def _index(self, record, delta):
+        """Add (delta=1) or remove (delta=-1) a record's index entries and counters"""
+        request_id = record['request_id']
+        entries = [self._by_student[record['student_id']], self._by_parent[record['parent_email']]]
+        entries += [self._by_status[(column, record[column])] for column in gatepass_transitions.STATUS_COLUMNS]
+        for ids in entries:
+            if delta > 0:
+                ids.add(request_id)
+            else:
+                ids.discard(request_id)
+        for scope, scope_key, status_key in gatepass_counts.row_counters(record):
+            self._counts[(scope, scope_key)][status_key] += delta
+        if self._approved_order is not None and record['parent_approval_status'] == 'Approved':
+            entry = (record['date_time_out'] or 0, request_id)
+            if delta > 0:
+                bisect.insort(self._approved_order, entry)
+            else:
+                del self._approved_order[bisect.bisect_left(self._approved_order, entry)]
+
+    def _bump_versions(self, *records):
+        # The scopes data_versions' triggers bump for the same change
+        for record in records:
+            self._versions[('student', record['student_id'] or '')] += 1
+            self._versions[('parent', record['parent_email'] or '')] += 1
+        if any(record['parent_approval_status'] == 'Approved' for record in records):
+            self._versions[('approved', '')] += 1
+
+    def _insert_gatepass(self, record):
+        self._gatepasses[record['request_id']] = record
+        self._last_request_id = max(self._last_request_id, record['request_id'])
+        self._index(record, 1)
+        if record['parent_approval_status'] == 'Pending' and record['expiry_timestamp'] is not None:
+            heapq.heappush(self._expiries, (record['expiry_timestamp'], record['request_id']))
+
+    def _update_gatepass(self, record, changes):
+        before = dict(record)
+        self._index(record, -1)
+        record.update(changes)
+        self._index(record, 1)
+        self._bump_versions(before, record)
+        self._changed()
+
+    def _expire_due(self):
+        """Expire Pending requests whose expiry_timestamp has passed"""
+        now = timestamps.to_epoch(timestamps.now())
+        expired = 0
+        while self._expiries and self._expiries[0][0] <= now:
+            expiry_epoch, request_id = heapq.heappop(self._expiries)
+            record = self._gatepasses.get(request_id)
+            if record and record['parent_approval_status'] == 'Pending' and record['expiry_timestamp'] == expiry_epoch:
+                self._update_gatepass(record, {'parent_approval_status': 'Expired'})
+                expired += 1
+        if expired:
+            gatepass_transitions.record_outcome('expire', 'ok', expired)
+
+    def _row(self, record, columns):
+        """GatepassRow with the given columns of a record, as the SQL for that view would select"""
+        fields = {column: record[column] for column in columns if column != 'student_name'}
+        for column in TIMESTAMP_COLUMNS:
+            if fields.get(column) is not None:
+                fields[column] = timestamps.from_epoch(fields[column])
+        if 'student_name' in columns:
+            student = self._users['student'].get(record['student_id'])
+            fields['student_name'] = student['name'] if student else None
+        return GatepassRow(**fields)
+
+    # Users
+
+    def _active_user(self, role, user_id):
+        user = self._users[role].get(user_id)
+        return user if user and user['is_active'] else None
+
+    def get_user(self, role, user_id):
+        with self._lock:
+            user = self._active_user(role, user_id)
+            return (user_id, user['name']) if user else None
+
+    def get_login(self, role, user_id):
+        with self._lock:
+            user = self._active_user(role, user_id)
+            return (user_id, user['name'], user['password_hash']) if user else None
+
+    def parent_email(self, parent_id):
+        with self._lock:
+            parent = self._users['parent'].get(parent_id)
+            return parent['email'] if parent else None
+
+    def student_name(self, student_id):
+        with self._lock:
+            student = self._users['student'].get(student_id)
+            return student['name'] if student else None
+
+    def student_parent(self, student_id):
+        with self._lock:
+            for parent_id in self._parents_of.get(student_id, ()):
+                parent = self._users['parent'].get(parent_id)
+                if parent:
+                    return (parent['email'], parent['name'])
+            return None
+
+    def active_parent_by_email(self, email):
+        with self._lock:
+            parent_id = self._parent_emails.get(email)
+            parent = self._users['parent'].get(parent_id)
+            if not parent or not parent['is_active']:
+                return None
+            return (parent_id, parent['name'])
+
+    # Gatepasses
+
+    def create_gatepass(self, student_id, parent_email, date_time_out, duration_hours,
+                        destination, purpose, created_at, expiry_timestamp):
+        with self._lock:
+            self._last_request_id += 1
+            record = {
+                'request_id': self._last_request_id,
+                'student_id': student_id,
+                'parent_email': parent_email,
+                'date_time_out': timestamps.to_epoch(date_time_out),
+                'duration_hours': duration_hours,
+                'destination': destination,
+                'purpose': purpose,
+                'parent_approval_status': 'Pending',
+                'parent_approval_timestamp': None,
+                'created_at': timestamps.to_epoch(created_at),
+                'expiry_timestamp': timestamps.to_epoch(expiry_timestamp),
+                'warden_status': 'Open',
+                'security_guard_status': 'Pending',
+            }
+            self._insert_gatepass(record)
+            self._bump_versions(record)
+            self._changed()
+            return record['request_id']
+
+    def _candidates(self, owner_column, key, conditions):
+        """
+        The smallest index holding every row that can match
+
+        Returns:
+            tuple: (request ids, conditions the index doesn't already guarantee)
+        """
+        options = []
+        if owner_column == 'student_id':
+            options.append((self._by_student.get(key, set()), None))
+        elif owner_column == 'parent_email':
+            options.append((self._by_parent.get(key, set()), None))
+        for column, allowed in conditions.items():
+            if len(allowed) == 1:
+                options.append((self._by_status.get((column, allowed[0]), set()), column))
+        if not options:
+            return self._gatepasses.keys(), list(conditions.items())
+        ids, covered = min(options, key=lambda option: len(option[0]))
+        remaining = [(column, allowed) for column, allowed in conditions.items() if column != covered]
+        if owner_column and covered is not None:
+            remaining.append((owner_column, (key,)))
+        return ids, remaining
+
+    def list_gatepasses(self, view, key, filter_type, after=None, before=None, page_size=DEFAULT_PAGE_SIZE):
+        owner_column, sort_column = VIEW_KEYS[view]
+        conditions = view_filter(view, filter_type)
+        after, before = _cursor_key(after), _cursor_key(before)
+
+        def sort_key(record):
+            return (record[sort_column] or 0, record['request_id'])
+
+        with self._lock:
+            self._expire_due()
+            if owner_column is None and sort_column == 'date_time_out' and \
+                    conditions.get('parent_approval_status') == APPROVED['parent_approval_status']:
+                rows = self._walk_approved(conditions, after, before, page_size)
+                return make_page(rows, page_size, after, before, sort_column)
+            ids, remaining = self._candidates(owner_column, key, conditions)
+            gatepasses = self._gatepasses
+            matches = (gatepasses[request_id] for request_id in ids)
+            # Only the checks the chosen index doesn't already answer run per row,
+            # which keeps a cold render of a global view to one pass over its status
+            if remaining:
+                matches = (record for record in matches
+                           if all(record[column] in allowed for column, allowed in remaining))
+            if before is not None:
+                matches = (record for record in matches if sort_key(record) > before)
+            elif after is not None:
+                matches = (record for record in matches if sort_key(record) < after)
+
+            # Same order as paginate's queries: oldest first after a `before` cursor
+            if before is not None:
+                records = heapq.nsmallest(page_size + 1, matches, key=sort_key)
+            else:
+                records = heapq.nlargest(page_size + 1, matches, key=sort_key)
+            rows = [self._row(record, _VIEW_COLUMNS[view]) for record in records]
+        return make_page(rows, page_size, after, before, sort_column)
+
+    def _walk_approved(self, conditions, after, before, page_size):
+        """
+        A global view's page read off the date_time_out ordering of Approved rows
+
+        Stops as soon as page_size + 1 rows match, so a view only pays for
+        the rows it skips over rather than for every approved gatepass.
+        """
+        if self._approved_order is None:
+            self._approved_order = sorted(
+                (self._gatepasses[request_id]['date_time_out'] or 0, request_id)
+                for request_id in self._by_status[('parent_approval_status', 'Approved')])
+        order = self._approved_order
+        remaining = [(column, allowed) for column, allowed in conditions.items()
+                     if column != 'parent_approval_status']
+        # Same order as paginate's queries: oldest first after a `before` cursor
+        if before is not None:
+            entries = (order[i] for i in range(bisect.bisect_right(order, before), len(order)))
+        else:
+            end = bisect.bisect_left(order, after) if after is not None else len(order)
+            entries = (order[i] for i in range(end - 1, -1, -1))
+        records = []
+        for _, request_id in entries:
+            record = self._gatepasses[request_id]
+            if all(record[column] in allowed for column, allowed in remaining):
+                records.append(record)
+                if len(records) > page_size:
+                    break
+        return [self._row(record, _VIEW_COLUMNS['warden']) for record in records]
+
+    def search_approved(self, student_id):
+        with self._lock:
+            self._expire_due()
+            records = [self._gatepasses[request_id] for request_id in self._by_student.get(student_id, ())]
+            records = [record for record in records if record['parent_approval_status'] == 'Approved']
+            records.sort(key=lambda record: record['date_time_out'], reverse=True)
+            return [self._row(record, _VIEW_COLUMNS['security']) for record in records]
+
+    def counts(self, view, key=None):
+        scope, badges = VIEW_COUNTS[view]
+        with self._lock:
+            self._expire_due()
+            return badges(dict(self._counts.get((scope, key or ''), {})))
+
+    def versions(self, scopes):
+        with self._lock:
+            # Expiring first bumps the versions, so an ETag never hides an expiry
+            self._expire_due()
+            return (self._epoch,) + tuple(self._versions.get(tuple(scope), 0) for scope in scopes)
+
+    def transition(self, name, request_id, owner=None):
+        if name not in gatepass_transitions.TRANSITIONS:
+            raise ValueError(f"Unknown gatepass transition: {name}")
+        transition = gatepass_transitions.TRANSITIONS[name]
+        now = timestamps.to_epoch(timestamps.now())
+
+        with self._lock:
+            record = self._gatepasses.get(request_id)
+            if record is None or (transition.owner_column and record[transition.owner_column] != owner):
+                gatepass_transitions.record_outcome(name, 'not_found')
+                return {'success': False, 'request_id': request_id, 'result': 'not_found',
+                        'error': f'Gatepass #{request_id} not found', 'status': None}
+
+            current = {column: record[column] for column in gatepass_transitions.STATUS_COLUMNS}
+            unexpired = record['expiry_timestamp'] is None or record['expiry_timestamp'] > now
+            error = transition.refusal(request_id, current, unexpired)
+            if error is not None:
+                gatepass_transitions.record_outcome(name, 'conflict')
+                return {'success': False, 'request_id': request_id, 'result': 'conflict',
+                        'error': error, 'status': current[transition.column]}
+
+            changes = {transition.column: transition.to_status}
+            if transition.stamp_column:
+                changes[transition.stamp_column] = now
+            self._update_gatepass(record, changes)
+            student = self._users['student'].get(record['student_id'])
+
+        gatepass_transitions.record_outcome(name, 'ok')
+        return {'success': True, 'request_id': request_id, 'student_id': record['student_id'],
+                'student_name': student['name'] if student else None, 'status': transition.to_status}
+
+    # Registrations
+
+    def _duplicate_email_error(self, user_type, email):
+        identity = self._identities.get(email)
+        if identity:
+            if identity[2] == 'pending':
+                return 'Registration already pending for this email'
+            return 'Email already registered'
+        # pending_registrations is UNIQUE(user_type, email) in SQLite too
+        if (user_type, email) in self._registration_emails:
+            return REJECTED_REGISTRATION_ERROR
+        return None
+
+    def register_user(self, user_type, name, email, phone, password, **kwargs):
+        if user_type not in USER_ID_SOURCES:
+            return {'success': False, 'error': f'Invalid user type: {user_type}'}
+        # Turn duplicates away before paying for the KDF, then check again once locked
+        with self._lock:
+            duplicate = self._duplicate_email_error(user_type, email)
+        if duplicate:
+            return {'success': False, 'error': duplicate}
+        try:
+            password_hash = hashing.hash_password(password)
+        except hashing.HashingBusy:
+            return {'success': False, 'error': 'Server is busy, please try again in a moment'}
+
+        with self._lock:
+            duplicate = self._duplicate_email_error(user_type, email)
+            if duplicate:
+                return {'success': False, 'error': duplicate}
+
+            prefix = USER_ID_SOURCES[user_type][0]
+            self._last_user_id[prefix] += 1
+            self._last_registration_id += 1
+            registration = {
+                'registration_id': self._last_registration_id,
+                'user_type': user_type,
+                'proposed_user_id': format_user_id(prefix, self._last_user_id[prefix]),
+                'name': name,
+                'email': email,
+                'phone': phone,
+                'password_hash': password_hash,
+                'verification_token': user_registration.generate_verification_token(),
+                'status': 'pending',
+                # As SQLite's CURRENT_TIMESTAMP writes it
+                'submitted_at': datetime.now(timezone.utc).strftime('%Y-%m-%d %H:%M:%S'),
+                'reviewed_at': None,
+                'reviewed_by': None,
+                'rejection_reason': None,
+            }
+            for fields in REGISTRATION_FIELDS.values():
+                for field in fields:
+                    registration.setdefault(field, None)
+            for field in REGISTRATION_FIELDS[user_type]:
+                registration[field] = kwargs.get(field)
+            self._add_registration(registration)
+            self._versions[('registrations', '')] += 1
+            self._changed()
+
+        return {
+            'success': True,
+            'registration_id': registration['registration_id'],
+            'proposed_user_id': registration['proposed_user_id'],
+            'verification_token': registration['verification_token'],
+            'message': 'Registration submitted successfully. Awaiting admin approval.'
+        }
+
+    def pending_registrations(self):
+        with self._lock:
+            registrations = [dict(self._registrations[registration_id])
+                             for registration_id in self._pending_registration_ids]
+        registrations.sort(key=lambda reg: (str(reg['submitted_at'] or ''), reg['registration_id']), reverse=True)
+        return registrations
+
+    def pending_registration_count(self):
+        with self._lock:
+            return len(self._pending_registration_ids)
+
+    def _review(self, registration, status, reviewed_by, reason=None):
+        registration.update(status=status, reviewed_at=timestamps.to_epoch(timestamps.now()),
+                            reviewed_by=reviewed_by)
+        if reason is not None:
+            registration['rejection_reason'] = reason
+        self._pending_registration_ids.discard(registration['registration_id'])
+        self._versions[('registrations', '')] += 1
+        self._changed()
+
+    def _create_account(self, registration):
+        user_type = registration['user_type']
+        _, _, id_column = USER_ID_SOURCES[user_type]
+        user_id = registration['proposed_user_id']
+        if user_id in self._users[user_type]:
+            return f'{user_id} already exists'
+        parent_link = registration.get('student_id') if user_type == 'parent' else None
+        if parent_link and parent_link not in self._users['student']:
+            return f'Student {parent_link} not found'
+
+        row = {id_column: user_id, 'is_active': 1}
+        for field in ('name', 'password_hash', 'email', 'phone') + REGISTRATION_FIELDS[user_type]:
+            if field not in ('parent_id', 'student_id'):
+                row[field] = registration.get(field)
+        self._add_user(user_type, row)
+        if user_type == 'student' and registration.get('parent_id'):
+            self._parents_of[user_id].append(registration['parent_id'])
+        elif parent_link:
+            self._parents_of[parent_link].append(user_id)
+        return None
+
+    def approve_registrations(self, registration_ids, reviewed_by):
+        registration_ids = list(dict.fromkeys(int(registration_id) for registration_id in registration_ids))
+        results, approved = [], []
+        with self._lock:
+            for registration_id in registration_ids:
+                registration = self._registrations.get(registration_id)
+                if registration is None or registration['status'] != 'pending':
+                    results.append({'registration_id': registration_id, 'success': False,
+                                    'error': 'Registration not found or already processed'})
+                    continue
+                error = self._create_account(registration)
+                if error:
+                    results.append({'registration_id': registration_id, 'success': False, 'error': error})
+                    continue
+                self._review(registration, 'approved', reviewed_by)
+                approved.append(registration)
+                results.append({'registration_id': registration_id, 'success': True,
+                                'user_id': registration['proposed_user_id']})
+
+        for registration in approved:
+            invalidate_user(registration['user_type'], registration['proposed_user_id'])
+        return {
+            'success': True,
+            'approved': len(approved),
+            'failed': len(results) - len(approved),
+            'results': results
+        }
+
+    def reject_registrations(self, registration_ids, reviewed_by, reason):
+        registration_ids = list(dict.fromkeys(int(registration_id) for registration_id in registration_ids))
+        results = []
+        with self._lock:
+            for registration_id in registration_ids:
+                registration = self._registrations.get(registration_id)
+                if registration is None or registration['status'] != 'pending':
+                    results.append({'registration_id': registration_id, 'success': False,
+                                    'error': 'Registration not found or already processed'})
+                    continue
+                self._review(registration, 'rejected', reviewed_by, reason)
+                identity = self._identities.get(registration['email'])
+                if identity and identity[2] == 'pending':
+                    del self._identities[registration['email']]
+                results.append({'registration_id': registration_id, 'success': True})
+
+        rejected = sum(1 for result in results if result['success'])
+        return {
+            'success': True,
+            'rejected': rejected,
+            'failed': len(results) - rejected,
+            'results': results
+        }
+
+
+def _cursor_key(cursor):
+    """A decoded pagination cursor as a comparable (epoch, request_id), or None if unusable"""
+    if cursor is None:
+        return None
+    try:
+        return (int(cursor[0]), int(cursor[1]))
+    except (TypeError, ValueError):
+        return None
+
+
+def create_repository(backend=None):
+    """
+    A new repository for STORAGE_BACKEND (or `backend`)
+
+    Raises:
+        ValueError: For an unknown backend name
+    """
+    backend = backend or BACKEND
+    if backend == 'sqlite':
+        return SqliteRepository()
+    if backend == 'memory':
+        repository = MemoryRepository(snapshot_path=MEMORY_SNAPSHOT)
+        if not repository.load_snapshot():
+            if MEMORY_SEED_DB:
+                repository.load_sqlite(MEMORY_SEED_DB)
+            else:
+                repository.load_demo()
+        return repository
+    raise ValueError(f"Unknown STORAGE_BACKEND: {backend}")
+
+
+_repository = None
+_repository_lock = threading.Lock()
+
+
+def get_repository():
+    """The process-wide repository, created on first use"""
+    global _repository
+    if _repository is None:
+        with _repository_lock:
+            if _repository is None:
+                _repository = create_repository()
+    return _repository
+
+
+def set_repository(repository):
+    """Replace the process-wide repository (benchmarks, tests, tools)"""
+    global _repository
+    with _repository_lock:
+        _repository = repository
@@ -0,0 +1,95 @@
+"""
+Single-Flight for Hostel Gatepass Management System
+Coalesces identical concurrent calls within a worker so one query serves them all
+"""
+
+import threading
+
+import metrics
+
+
+# Requests served by one flight; 1 means nobody else was waiting
+CALLER_BUCKETS = (1, 2, 3, 5, 10, 20, 50, 100)
+
+
+class _Flight:
+    """One in-progress call and everyone waiting on it"""
+
+    def __init__(self):
+        self.done = threading.Event()
+        self.callers = 1
+        self.result = None
+        self.error = None
+
+
+class SingleFlight:
+    """
+    Runs at most one call per key at a time in this process
+
+    A caller arriving while a call for the same key is in progress waits
+    for it and gets the same result (or exception) instead of running its
+    own. Nothing is kept once the call returns; caching is the caller's
+    business (see fragment_cache).
+    """
+
+    def __init__(self, name):
+        self.name = name
+        self._flights = {}
+        self._lock = threading.Lock()
+
+        # Statistics
+        self.flights = 0
+        self.coalesced = 0
+
+    def do(self, key, fn, label=None):
+        """
+        fn(), shared with concurrent callers passing the same key
+
+        Args:
+            key: Hashable identity of the call
+            fn: Zero-argument callable doing the work
+            label: 'query' label for the metrics (defaults to this group's name)
+
+        Returns:
+            The result of the one fn() call made for this flight
+
+        Raises:
+            Whatever fn() raised, in the caller that ran it and every waiter
+        """
+        with self._lock:
+            flight = self._flights.get(key)
+            leader = flight is None
+            if leader:
+                flight = self._flights[key] = _Flight()
+                self.flights += 1
+            else:
+                flight.callers += 1
+                self.coalesced += 1
+        if not leader:
+            flight.done.wait()
+            if flight.error is not None:
+                raise flight.error
+            return flight.result
+
+        try:
+            flight.result = fn()
+            return flight.result
+        except BaseException as e:
+            flight.error = e
+            raise
+        finally:
+            with self._lock:
+                del self._flights[key]
+                callers = flight.callers
+            flight.done.set()
+            metrics.histogram('single_flight_callers', 'Requests served by each coalesced query '
+                              '(1 = not shared)', buckets=CALLER_BUCKETS,
+                              query=label or self.name).observe(callers)
+
+    def stats(self):
+        with self._lock:
+            return {
+                'in_flight': len(self._flights),
+                'flights': self.flights,
+                'coalesced': self.coalesced,
+            }
@@ -0,0 +1,187 @@
+"""
+SQL Instrumentation for Hostel Gatepass Management System
+Per-request statement counts, SQL time and rows, plus a slow-query log with query plans
+"""
+
+import os
+import sqlite3
+import threading
+import time
+
+
+ENABLED = os.environ.get('SQL_INSTRUMENTATION', 'on').lower() not in ('0', 'off', 'false', 'no')
+
+# Statements slower than this (execute plus fetching its rows) are logged with their plan
+SLOW_QUERY_MS = float(os.environ.get('SLOW_QUERY_MS', 100))
+
+# Print one summary line per request when set
+LOG_REQUESTS = os.environ.get('SQL_LOG_REQUESTS', 'off').lower() in ('1', 'on', 'true', 'yes')
+
+# Statements EXPLAIN QUERY PLAN can describe
+_EXPLAINABLE = ('SELECT', 'WITH', 'INSERT', 'UPDATE', 'DELETE', 'REPLACE')
+
+_local = threading.local()
+
+
+class RequestSqlStats:
+    """SQL activity recorded on the current thread between start_request() and finish_request()"""
+
+    def __init__(self):
+        self.statements = 0
+        self.seconds = 0.0
+        self.rows = 0
+        self.slow = 0
+
+    def server_timing(self):
+        """Server-Timing header entry for the database time (durations are in ms)"""
+        return f'db;dur={self.seconds * 1000:.1f};desc="{self.statements} queries, {self.rows} rows"'
+
+    def summary(self):
+        text = f"{self.statements} queries, {self.seconds * 1000:.1f} ms SQL, {self.rows} rows"
+        if self.slow:
+            text += f", {self.slow} slow"
+        return text
+
+
+def start_request():
+    """Begin collecting SQL stats for the current thread's request"""
+    stats = RequestSqlStats()
+    _local.stats = stats
+    return stats
+
+
+def finish_request():
+    """
+    Stop collecting for the current thread
+
+    Returns:
+        RequestSqlStats: What was recorded, or None if start_request() wasn't called
+    """
+    stats = getattr(_local, 'stats', None)
+    _local.stats = None
+    return stats
+
+
+def current_stats():
+    return getattr(_local, 'stats', None)
+
+
+def explain(conn, sql, parameters=()):
+    """
+    EXPLAIN QUERY PLAN output for a statement, one indented line per plan step
+
+    Runs on a plain cursor so the plan lookup itself isn't instrumented.
+    """
+    if sql.lstrip().split(None, 1)[0].upper() not in _EXPLAINABLE:
+        return []
+    cur = sqlite3.Cursor(conn)
+    try:
+        cur.execute('EXPLAIN QUERY PLAN ' + sql, parameters)
+        depth = {0: 0}
+        lines = []
+        for node_id, parent_id, _, detail in cur.fetchall():
+            depth[node_id] = depth.get(parent_id, 0) + 1
+            lines.append('  ' * (depth[node_id] - 1) + detail)
+        return lines
+    except sqlite3.Error as e:
+        return [f"(no plan: {e})"]
+    finally:
+        cur.close()
+
+
+def _log_slow(conn, sql, parameters, seconds):
+    print(f"Slow query ({seconds * 1000:.1f} ms): {' '.join(sql.split())}")
+    for line in explain(conn, sql, parameters):
+        print(f"    {line}")
+
+
+class InstrumentedCursor(sqlite3.Cursor):
+    """
+    Cursor that times execute and fetch calls and counts rows
+
+    SQLite does most of a query's work lazily while rows are stepped, so a
+    statement's time is everything from execute() until the next execute(),
+    and the slow-query check runs after each call.
+    """
+
+    def _begin(self, sql, parameters):
+        self._sql = sql
+        self._parameters = parameters
+        self._elapsed = 0.0
+        self._logged = False
+
+    def _record(self, seconds, statements=0, rows=0):
+        stats = getattr(_local, 'stats', None)
+        if stats is not None:
+            stats.statements += statements
+            stats.seconds += seconds
+            stats.rows += rows
+
+        sql = getattr(self, '_sql', None)
+        if sql is None:
+            return
+        self._elapsed += seconds
+        if not self._logged and self._elapsed * 1000 >= SLOW_QUERY_MS:
+            self._logged = True
+            if stats is not None:
+                stats.slow += 1
+            _log_slow(self.connection, sql, self._parameters, self._elapsed)
+
+    def execute(self, sql, parameters=()):
+        self._begin(sql, parameters)
+        started = time.perf_counter()
+        try:
+            return super().execute(sql, parameters)
+        finally:
+            self._record(time.perf_counter() - started, statements=1)
+
+    def executemany(self, sql, seq_of_parameters):
+        # Materialised so the first row's parameters can be used for the plan
+        seq_of_parameters = list(seq_of_parameters)
+        self._begin(sql, seq_of_parameters[0] if seq_of_parameters else ())
+        started = time.perf_counter()
+        try:
+            return super().executemany(sql, seq_of_parameters)
+        finally:
+            self._record(time.perf_counter() - started, statements=1)
+
+    def executescript(self, sql_script):
+        self._sql = None
+        started = time.perf_counter()
+        try:
+            return super().executescript(sql_script)
+        finally:
+            self._record(time.perf_counter() - started, statements=1)
+
+    def fetchone(self):
+        started = time.perf_counter()
+        row = super().fetchone()
+        self._record(time.perf_counter() - started, rows=0 if row is None else 1)
+        return row
+
+    def fetchmany(self, size=None):
+        started = time.perf_counter()
+        rows = super().fetchmany(self.arraysize if size is None else size)
+        self._record(time.perf_counter() - started, rows=len(rows))
+        return rows
+
+    def fetchall(self):
+        started = time.perf_counter()
+        rows = super().fetchall()
+        self._record(time.perf_counter() - started, rows=len(rows))
+        return rows
+
+    def __next__(self):
+        started = time.perf_counter()
+        try:
+            row = super().__next__()
+        except StopIteration:
+            self._record(time.perf_counter() - started)
+            raise
+        self._record(time.perf_counter() - started, rows=1)
+        return row
+
+
+def cursor_factory():
+    """Cursor class pooled connections should hand out"""
+    return InstrumentedCursor if ENABLED else sqlite3.Cursor
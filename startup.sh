@@ -7,5 +7,18 @@ pip install -r requirements.txt
 # Initialize the database
 python db_init.py
 
+# Precompile templates so workers start without compiling them
+python template_cache.py
+
+# Per-worker metric files from a previous run would otherwise be summed in
+if [ -n "$METRICS_DIR" ]; then
+    mkdir -p "$METRICS_DIR"
+    rm -f "$METRICS_DIR"/metrics_*.db
+fi
+
 # Start the application
-exec gunicorn --bind 0.0.0.0:$PORT app:app
\ No newline at end of file
+# Threaded workers so live dashboard streams (SSE) do not each hold a whole worker.
+# Each of the WEB_CONCURRENCY workers starts its own password hashing pool of
+# HASH_WORKERS processes, by default CPUs / WEB_CONCURRENCY (at least 1), so the
+# pools together use one process per CPU. Set HASH_WORKERS to override.
+exec gunicorn --bind 0.0.0.0:$PORT --workers ${WEB_CONCURRENCY:-1} --worker-class gthread --threads ${GUNICORN_THREADS:-16} app:app
\ No newline at end of file
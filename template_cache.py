@@ -0,0 +1,78 @@
+"""
+Template Bytecode Cache for Hostel Gatepass Management System
+Compiled Jinja templates kept on disk so a cold start doesn't recompile every page
+
+Usage:
+    python template_cache.py            # precompile every template (run at build time)
+"""
+
+import os
+
+from jinja2 import FileSystemBytecodeCache
+
+
+ROOT = os.path.dirname(os.path.abspath(__file__))
+CACHE_DIR = os.environ.get('JINJA_CACHE_DIR', os.path.join(ROOT, '.jinja_cache'))
+
+
+class TemplateBytecodeCache(FileSystemBytecodeCache):
+    """
+    FileSystemBytecodeCache that tolerates read-only deployments
+
+    Entries are keyed by template name alone rather than name and absolute
+    path, so a cache built in one checkout is found at runtime in another
+    (Jinja still discards an entry whose template source has changed).
+    Serverless filesystems are usually read-only, so failing to write an
+    entry just leaves that template compiled in memory.
+    """
+
+    def get_cache_key(self, name, filename=None):
+        return super().get_cache_key(name)
+
+    def dump_bytecode(self, bucket):
+        try:
+            super().dump_bytecode(bucket)
+        except OSError:
+            pass
+
+
+def install(app, directory=None):
+    """
+    Give app's Jinja environment the on-disk bytecode cache
+
+    Must run before the first template is loaded.
+
+    Args:
+        app: Flask application
+        directory: Cache directory (defaults to JINJA_CACHE_DIR or ./.jinja_cache)
+    """
+    directory = directory or CACHE_DIR
+    try:
+        os.makedirs(directory, exist_ok=True)
+    except OSError:
+        # Read-only and not shipped with the build; loads simply miss
+        pass
+    app.jinja_env.bytecode_cache = TemplateBytecodeCache(directory)
+
+
+def precompile(app):
+    """
+    Compile every template app can load into the bytecode cache
+
+    Returns:
+        int: Number of templates compiled
+    """
+    names = app.jinja_env.list_templates()
+    for name in names:
+        app.jinja_env.get_template(name)
+    return len(names)
+
+
+if __name__ == '__main__':
+    from flask import Flask
+
+    # A bare app over the same templates; compiling needs no routes or database
+    build_app = Flask(__name__, template_folder=os.path.join(ROOT, 'templates'))
+    install(build_app)
+    count = precompile(build_app)
+    print(f"Compiled {count} templates into {CACHE_DIR}")
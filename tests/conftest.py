@@ -0,0 +1,54 @@
+"""
+Test Fixtures for Hostel Gatepass Management System
+Fresh SQLite databases and in-memory stores for each test
+"""
+
+import os
+import sys
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+# Read at import by the modules under test: hash inline, no background threads
+os.environ['HASH_WORKERS'] = '0'
+os.environ['EXPIRY_SCHEDULER'] = 'off'
+os.environ['LIVE_DASHBOARDS'] = 'off'
+
+import pytest
+
+
+@pytest.fixture
+def db_path(tmp_path, monkeypatch):
+    """DATABASE_PATH for a new database holding the demo accounts at the latest schema"""
+    import db_init
+    from user_cache import user_cache
+
+    path = str(tmp_path / 'gatepass.db')
+    monkeypatch.setenv('DATABASE_PATH', path)
+    db_init.init_database()
+    # User IDs repeat between tests' databases
+    user_cache.clear()
+    return path
+
+
+@pytest.fixture
+def conn(db_path):
+    """Pooled connection to the test database"""
+    import db
+
+    connection = db.get_db_connection()
+    yield connection
+    connection.close()
+
+
+@pytest.fixture(params=['sqlite', 'memory'])
+def repo(request):
+    """Each storage backend in turn, holding the demo accounts and no gatepasses"""
+    import repository
+
+    if request.param == 'sqlite':
+        request.getfixturevalue('db_path')
+        return repository.SqliteRepository()
+    store = repository.MemoryRepository()
+    store.load_demo()
+    return store
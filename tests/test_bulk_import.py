@@ -0,0 +1,84 @@
+"""
+Bulk Import Tests for Hostel Gatepass Management System
+Importing a small CSV, resuming, and the operator-selected password hash method
+"""
+
+import csv
+import json
+from concurrent.futures import ThreadPoolExecutor
+
+from werkzeug.security import check_password_hash
+
+import bulk_import
+
+
+def write_csv(path, count):
+    with open(path, 'w', newline='') as f:
+        writer = csv.writer(f)
+        writer.writerow(['user_type', 'name', 'email', 'phone', 'password', 'parent_email'])
+        for i in range(count):
+            writer.writerow(['parent', f'Parent {i}', f'parent{i}@example.com', '9000000000', f'pw{i}', ''])
+            writer.writerow(['student', f'Student {i}', f'student{i}@example.com', '', f'pw{i}',
+                             f'parent{i}@example.com'])
+    return str(path)
+
+
+def test_import_with_cheaper_hash_method(db_path, conn, tmp_path):
+    path = write_csv(tmp_path / 'users.csv', 5)
+    result = bulk_import.import_users(path, workers=0, verbose=False, hash_method='pbkdf2:sha256:1000')
+    assert result['success'], result
+    assert result['imported'] == {'student': 5, 'parent': 5}
+    assert result['links'] == 5
+
+    stored = conn.execute("SELECT password_hash FROM students WHERE email = 'student3@example.com'").fetchone()[0]
+    assert stored.startswith('pbkdf2:sha256:1000$')
+    assert check_password_hash(stored, 'pw3')
+
+    again = bulk_import.import_users(path, workers=0, verbose=False)
+    assert again['success'] is False and 'already been imported' in again['error']
+
+
+def test_mistyped_jsonl_fields_are_row_errors(db_path, conn, tmp_path):
+    good = {'user_type': 'parent', 'name': 'Good Parent', 'email': 'good@example.com',
+            'phone': '9000000000', 'password': 'pw'}
+    rows = [
+        dict(good, email='a@example.com', password=12345),
+        dict(good, email=12),
+        dict(good, email='b@example.com', user_type=['parent']),
+        dict(good, email='c@example.com', password_hash=7),
+        dict(good, email='d@example.com', name={'first': 'D'}),
+        dict(good, email='e@example.com', phone=9000000000),
+        dict(good, email='f@example.com', address=['1 Road']),
+        good,
+    ]
+    path = tmp_path / 'users.jsonl'
+    path.write_text(''.join(json.dumps(row) + '\n' for row in rows))
+
+    result = bulk_import.import_users(str(path), workers=0, verbose=False)
+    assert result['success'], result
+    assert result['imported'] == {'student': 0, 'parent': 1}
+    assert result['skipped'] == 7
+    assert result['errors'] == [
+        (1, 'password must be a string'),
+        (2, 'email must be a string'),
+        (3, 'user_type must be a string'),
+        (4, 'password_hash must be a string'),
+        (5, 'name must be a string'),
+        (6, 'phone must be a string'),
+        (7, 'address must be a string or number'),
+    ]
+    assert conn.execute("SELECT name FROM parents WHERE email = 'good@example.com'").fetchone() == ('Good Parent',)
+
+
+def test_invalid_hash_method_is_refused(db_path, tmp_path):
+    path = write_csv(tmp_path / 'users.csv', 1)
+    result = bulk_import.import_users(path, workers=0, verbose=False, hash_method='pbkdf2:sha256:abc')
+    assert result['success'] is False
+    assert result['error'].startswith("Invalid hash method 'pbkdf2:sha256:abc'")
+
+
+def test_pooled_hashing_batches_work():
+    passwords = [f'pw{i}' for i in range(20)]
+    with ThreadPoolExecutor(max_workers=2) as executor:
+        hashes = bulk_import._hash_passwords(executor, passwords, 'pbkdf2:sha256:1000', workers=2)
+    assert all(check_password_hash(h, p) for h, p in zip(hashes, passwords))
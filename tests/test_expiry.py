@@ -0,0 +1,84 @@
+"""
+Expiry Scheduler Tests for Hostel Gatepass Management System
+Loading pending requests into the heap and expiring the ones that are due
+"""
+
+import sqlite3
+from datetime import timedelta
+
+import db
+import expiry
+import timestamps
+
+
+def add_request(path, expires_in):
+    """Insert a pending request through a separate connection, as another worker would"""
+    now = timestamps.now()
+    other = sqlite3.connect(path)
+    cur = other.execute('''
+        INSERT INTO gatepass_requests
+        (student_id, parent_email, date_time_out, duration_hours, destination, purpose, created_at, expiry_timestamp)
+        VALUES ('STU001', 'rajesh.kumar@gmail.com', ?, 4, 'Goa', 'Trip', ?, ?)
+    ''', (timestamps.to_epoch(now + timedelta(days=1)), timestamps.to_epoch(now),
+          timestamps.to_epoch(now + expires_in)))
+    other.commit()
+    other.close()
+    return cur.lastrowid
+
+
+class InsertAfterFirstRead:
+    """Connection wrapper whose first fetchall() lets another worker insert a request"""
+
+    def __init__(self, conn, path):
+        self.conn = conn
+        self.path = path
+        self.inserted = None
+
+    def __getattr__(self, name):
+        return getattr(self.conn, name)
+
+    def cursor(self):
+        cur = self.conn.cursor()
+        wrapper = self
+
+        class Cursor:
+            def __getattr__(self, name):
+                return getattr(cur, name)
+
+            def fetchall(self):
+                rows = cur.fetchall()
+                if wrapper.inserted is None:
+                    wrapper.inserted = add_request(wrapper.path, timedelta(hours=-1))
+                return rows
+
+        return Cursor()
+
+
+def test_load_pending_and_sweep(db_path):
+    due = add_request(db_path, timedelta(hours=-1))
+    later = add_request(db_path, timedelta(hours=1))
+    scheduler = expiry.ExpiryScheduler()
+    scheduler._load_pending()
+    assert sorted(request_id for _, request_id in scheduler._heap) == [due, later]
+    assert scheduler._last_seen_id == later
+
+    assert scheduler.sweep() == 1
+    assert scheduler.expired_total == 1
+    assert [request_id for _, request_id in scheduler._heap] == [later]
+
+
+def test_request_inserted_between_reads_is_loaded_later(db_path, monkeypatch):
+    first = add_request(db_path, timedelta(hours=1))
+    wrapped = InsertAfterFirstRead(db.get_db_connection(), db_path)
+    scheduler = expiry.ExpiryScheduler()
+
+    get_db_connection = db.get_db_connection
+    monkeypatch.setattr(expiry.db, 'get_db_connection', lambda: wrapped)
+    scheduler._load_pending()
+    monkeypatch.setattr(expiry.db, 'get_db_connection', get_db_connection)
+    assert wrapped.inserted is not None
+    assert scheduler._last_seen_id == first
+
+    scheduler._load_pending(scheduler._last_seen_id)
+    assert wrapped.inserted in [request_id for _, request_id in scheduler._heap]
+    assert scheduler.sweep() == 1
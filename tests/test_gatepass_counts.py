@@ -0,0 +1,74 @@
+"""
+Badge Counter Tests for Hostel Gatepass Management System
+The gatepass_status_counts triggers against a from-scratch recount (gatepass_counts check)
+"""
+
+import random
+from datetime import timedelta
+
+import gatepass_counts
+import gatepass_transitions
+import timestamps
+
+
+STUDENTS = [('STU001', 'rajesh.kumar@gmail.com'), ('STU002', 'sunita.sharma@gmail.com')]
+
+
+def add_requests(conn, count):
+    now = timestamps.now()
+    conn.executemany('''
+        INSERT INTO gatepass_requests
+        (student_id, parent_email, date_time_out, duration_hours, destination, purpose, created_at, expiry_timestamp)
+        VALUES (?, ?, ?, 4, 'Goa', 'Trip', ?, ?)
+    ''', [STUDENTS[i % 2] + (now + timedelta(days=1, hours=i), now, now + timedelta(hours=2))
+          for i in range(count)])
+    conn.commit()
+
+
+def test_fresh_database_is_consistent(conn):
+    assert gatepass_counts.check_status_counts(conn.cursor()) == []
+
+
+def test_counters_follow_inserts_transitions_and_deletes(conn):
+    add_requests(conn, 40)
+    rng = random.Random(7)
+    owners = dict(conn.execute('SELECT request_id, parent_email FROM gatepass_requests').fetchall())
+    for _ in range(200):
+        name = rng.choice(list(gatepass_transitions.TRANSITIONS))
+        request_id = rng.randrange(1, 41)
+        owner = owners[request_id] if gatepass_transitions.TRANSITIONS[name].owner_column else None
+        gatepass_transitions.transition(name, request_id, owner=owner)
+
+    cur = conn.cursor()
+    assert gatepass_counts.check_status_counts(cur) == []
+
+    conn.execute("UPDATE gatepass_requests SET student_id = 'STU003' WHERE request_id = 1")
+    conn.execute('DELETE FROM gatepass_requests WHERE request_id IN (2, 3)')
+    conn.commit()
+    assert gatepass_counts.check_status_counts(cur) == []
+
+
+def test_badges_read_the_counters(conn):
+    add_requests(conn, 4)
+    assert gatepass_transitions.transition('approve', 1, owner='rajesh.kumar@gmail.com')['success']
+    assert gatepass_transitions.transition('approve', 3, owner='rajesh.kumar@gmail.com')['success']
+    assert gatepass_transitions.transition('checkout', 1)['success']
+    assert gatepass_transitions.transition('close', 3)['success']
+
+    cur = conn.cursor()
+    assert gatepass_counts.student_counts(cur, 'STU001') == {'all': 2, 'pending': 0, 'history': 2}
+    assert gatepass_counts.parent_counts(cur, 'sunita.sharma@gmail.com') == {'all': 2, 'pending': 2, 'history': 0}
+    assert gatepass_counts.warden_counts(cur) == {'all': 2, 'pending': 1, 'history': 1}
+    assert gatepass_counts.security_counts(cur) == {'all': 2, 'checkout': 1, 'checkin': 1, 'completed': 0}
+
+
+def test_check_reports_and_rebuild_repairs_drift(conn):
+    add_requests(conn, 3)
+    cur = conn.cursor()
+    cur.execute("UPDATE gatepass_status_counts SET count = count + 5 WHERE scope = 'global'")
+    mismatches = gatepass_counts.check_status_counts(cur)
+    assert ('global', '', 'parent:Pending', 8, 3) in mismatches
+
+    gatepass_counts.rebuild_status_counts(cur)
+    conn.commit()
+    assert gatepass_counts.check_status_counts(cur) == []
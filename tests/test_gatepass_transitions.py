@@ -0,0 +1,172 @@
+"""
+Gatepass Transition Tests for Hostel Gatepass Management System
+Compare-and-swap status changes, including concurrent attempts at the same change
+"""
+
+import threading
+from datetime import timedelta
+
+import pytest
+
+import gatepass_counts
+import gatepass_transitions
+import timestamps
+
+
+PARENT_EMAIL = 'rajesh.kumar@gmail.com'
+
+
+def add_request(conn, parent_status='Pending', security_status='Pending', expires_in=timedelta(hours=2)):
+    now = timestamps.now()
+    cur = conn.execute('''
+        INSERT INTO gatepass_requests
+        (student_id, parent_email, date_time_out, duration_hours, destination, purpose,
+         parent_approval_status, security_guard_status, created_at, expiry_timestamp)
+        VALUES ('STU001', ?, ?, 4, 'Goa', 'Trip', ?, ?, ?, ?)
+    ''', (PARENT_EMAIL, now + timedelta(days=1), parent_status, security_status, now, now + expires_in))
+    conn.commit()
+    return cur.lastrowid
+
+
+def status(conn, request_id):
+    return conn.execute('''
+        SELECT parent_approval_status, warden_status, security_guard_status
+        FROM gatepass_requests WHERE request_id = ?
+    ''', (request_id,)).fetchone()
+
+
+def race(name, request_id, owner=None, threads=8):
+    """Apply one transition from many threads at once; returns every result"""
+    barrier = threading.Barrier(threads)
+    results = []
+
+    def attempt():
+        barrier.wait()
+        results.append(gatepass_transitions.transition(name, request_id, owner=owner))
+
+    workers = [threading.Thread(target=attempt) for _ in range(threads)]
+    for worker in workers:
+        worker.start()
+    for worker in workers:
+        worker.join()
+    return results
+
+
+def test_approve_sets_status_and_timestamp(conn):
+    request_id = add_request(conn)
+    result = gatepass_transitions.transition('approve', request_id, owner=PARENT_EMAIL)
+    assert result == {'success': True, 'request_id': request_id, 'student_id': 'STU001',
+                      'student_name': 'Arjun Kumar', 'status': 'Approved'}
+    row = conn.execute('SELECT parent_approval_status, parent_approval_timestamp FROM gatepass_requests '
+                       'WHERE request_id = ?', (request_id,)).fetchone()
+    assert row[0] == 'Approved' and row[1] is not None
+
+
+def test_double_approve_conflicts(conn):
+    request_id = add_request(conn)
+    assert gatepass_transitions.transition('approve', request_id, owner=PARENT_EMAIL)['success']
+    again = gatepass_transitions.transition('approve', request_id, owner=PARENT_EMAIL)
+    assert again['result'] == 'conflict'
+    assert again['status'] == 'Approved'
+    assert again['error'] == f'Cannot approve gatepass #{request_id}: parent approval is already Approved'
+
+
+def test_reject_after_approve_conflicts(conn):
+    request_id = add_request(conn)
+    assert gatepass_transitions.transition('approve', request_id, owner=PARENT_EMAIL)['success']
+    assert gatepass_transitions.transition('reject', request_id, owner=PARENT_EMAIL)['result'] == 'conflict'
+    assert status(conn, request_id)[0] == 'Approved'
+
+
+def test_other_parent_sees_not_found(conn):
+    request_id = add_request(conn)
+    result = gatepass_transitions.transition('approve', request_id, owner='sunita.sharma@gmail.com')
+    assert result['result'] == 'not_found'
+    assert status(conn, request_id)[0] == 'Pending'
+
+
+def test_expired_request_cannot_be_approved(conn):
+    request_id = add_request(conn, expires_in=-timedelta(minutes=1))
+    result = gatepass_transitions.transition('approve', request_id, owner=PARENT_EMAIL)
+    assert result['result'] == 'conflict'
+    assert result['error'].endswith('it has expired')
+
+
+def test_checkout_requires_approval(conn):
+    request_id = add_request(conn)
+    result = gatepass_transitions.transition('checkout', request_id)
+    assert result['result'] == 'conflict'
+    assert result['error'] == f'Cannot check out gatepass #{request_id}: parent approval is Pending'
+
+
+def test_checkout_then_checkin(conn):
+    request_id = add_request(conn, parent_status='Approved')
+    not_out = gatepass_transitions.transition('checkin', request_id)
+    assert not_out['error'] == f'Cannot check in gatepass #{request_id}: student has not checked out'
+
+    assert gatepass_transitions.transition('checkout', request_id)['success']
+    double = gatepass_transitions.transition('checkout', request_id)
+    assert double['result'] == 'conflict' and double['status'] == 'Out'
+    assert gatepass_transitions.transition('checkin', request_id)['success']
+    assert status(conn, request_id) == ('Approved', 'Open', 'In')
+
+
+def test_warden_closed_pass_can_check_out(conn):
+    request_id = add_request(conn, parent_status='Approved')
+    assert gatepass_transitions.transition('close', request_id)['success']
+    assert gatepass_transitions.transition('checkout', request_id)['success']
+    assert status(conn, request_id) == ('Approved', 'Closed', 'Out')
+
+
+def test_unknown_transition_raises(conn):
+    with pytest.raises(ValueError):
+        gatepass_transitions.transition('teleport', 1)
+
+
+@pytest.mark.parametrize('name, parent_status, owner', [
+    ('approve', 'Pending', PARENT_EMAIL),
+    ('checkout', 'Approved', None),
+])
+def test_concurrent_attempts_succeed_once(conn, name, parent_status, owner):
+    request_id = add_request(conn, parent_status=parent_status)
+    results = race(name, request_id, owner=owner)
+    assert sum(result['success'] for result in results) == 1
+    assert {result['result'] for result in results if not result['success']} == {'conflict'}
+    assert gatepass_counts.check_status_counts(conn.cursor()) == []
+
+
+def test_concurrent_approve_and_reject_pick_one(conn):
+    request_id = add_request(conn)
+    barrier = threading.Barrier(2)
+    results = {}
+
+    def decide(name):
+        barrier.wait()
+        results[name] = gatepass_transitions.transition(name, request_id, owner=PARENT_EMAIL)
+
+    workers = [threading.Thread(target=decide, args=(name,)) for name in ('approve', 'reject')]
+    for worker in workers:
+        worker.start()
+    for worker in workers:
+        worker.join()
+
+    winners = [name for name, result in results.items() if result['success']]
+    assert len(winners) == 1
+    assert status(conn, request_id)[0] == {'approve': 'Approved', 'reject': 'Rejected'}[winners[0]]
+
+
+def test_bulk_expire_skips_answered_requests(conn):
+    pending = add_request(conn, expires_in=-timedelta(minutes=1))
+    answered = add_request(conn)
+    assert gatepass_transitions.transition('approve', answered, owner=PARENT_EMAIL)['success']
+
+    cur = conn.cursor()
+    assert gatepass_transitions.apply_transition_many(cur, 'expire', [pending, answered]) == 1
+    conn.commit()
+    assert status(conn, pending)[0] == 'Expired'
+    assert status(conn, answered)[0] == 'Approved'
+
+
+def test_bulk_rejects_owned_transitions(conn):
+    with pytest.raises(ValueError):
+        gatepass_transitions.apply_transition_many(conn.cursor(), 'approve', [1])
@@ -0,0 +1,23 @@
+"""
+Metrics Endpoint Tests for Hostel Gatepass Management System
+/metrics stays hidden unless METRICS_TOKEN is set, and then needs the token
+"""
+
+
+def test_metrics_hidden_without_token(db_path, monkeypatch):
+    from app import app
+
+    monkeypatch.delenv('METRICS_TOKEN', raising=False)
+    assert app.test_client().get('/metrics').status_code == 404
+
+
+def test_metrics_require_the_token(db_path, monkeypatch):
+    from app import app
+
+    monkeypatch.setenv('METRICS_TOKEN', 'scrape-secret')
+    client = app.test_client()
+    assert client.get('/metrics').status_code == 403
+    assert client.get('/metrics', headers={'Authorization': 'Bearer wrong'}).status_code == 403
+    response = client.get('/metrics', headers={'Authorization': 'Bearer scrape-secret'})
+    assert response.status_code == 200
+    assert b'students_out' in response.data
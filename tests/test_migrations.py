@@ -0,0 +1,138 @@
+"""
+Migration Tests for Hostel Gatepass Management System
+Upgrading a schema-version-0 database (as the original db_init.py left it) to the latest schema
+"""
+
+import sqlite3
+
+import pytest
+
+import db
+import db_init
+import gatepass_counts
+import identities
+import migrations
+import timestamps
+import user_ids
+from demo_credentials import DEMO_ACCOUNTS
+
+
+@pytest.fixture
+def v0_db(tmp_path, monkeypatch):
+    """
+    A version 0 database with demo users, text timestamps and a pending registration
+
+    Written through a plain sqlite3 connection, so timestamps are stored the
+    way the original app wrote them: datetime-local and str(datetime) text.
+    """
+    path = str(tmp_path / 'v0.db')
+    monkeypatch.setenv('DATABASE_PATH', path)
+    conn = sqlite3.connect(path)
+    cur = conn.cursor()
+    db_init.create_tables(cur)
+    db_init.seed_demo_data(cur)
+    cur.executemany('''
+        INSERT INTO gatepass_requests
+        (student_id, parent_email, date_time_out, duration_hours, destination, purpose,
+         parent_approval_status, parent_approval_timestamp, created_at, expiry_timestamp)
+        VALUES (?, ?, ?, 4, 'Goa', 'Trip', ?, ?, ?, ?)
+    ''', [
+        ('STU001', 'rajesh.kumar@gmail.com', '2030-01-15T10:00', 'Pending', None,
+         '2030-01-14 09:30:00.123456', '2030-01-14 11:30:00.123456'),
+        ('STU001', 'rajesh.kumar@gmail.com', '2030-01-16T08:00', 'Approved', '2030-01-14 10:00:00',
+         '2030-01-14 09:45:00', '2030-01-14 11:45:00'),
+        ('STU002', 'sunita.sharma@gmail.com', '2030-01-17T18:30', 'Rejected', '2030-01-15 12:00:00',
+         '2030-01-15 11:00:00', '2030-01-15 13:00:00'),
+    ])
+    cur.execute('''
+        INSERT INTO pending_registrations (user_type, proposed_user_id, name, email, password_hash)
+        VALUES ('student', 'STU007', 'Late Applicant', 'late@student.edu', 'x')
+    ''')
+    conn.commit()
+    conn.close()
+    return path
+
+
+def pooled():
+    return db.get_db_connection()
+
+
+def test_upgrades_to_latest(v0_db):
+    conn = pooled()
+    try:
+        assert migrations.get_schema_version(conn.cursor()) == 0
+        assert migrations.migrate(conn) == migrations.latest_version()
+        assert migrations.get_schema_version(conn.cursor()) == migrations.latest_version()
+        # Running again is a no-op
+        assert migrations.migrate(conn) == migrations.latest_version()
+    finally:
+        conn.close()
+
+
+def test_timestamps_become_epochs(v0_db):
+    conn = pooled()
+    try:
+        migrations.migrate(conn)
+        types = conn.execute('''
+            SELECT DISTINCT typeof(date_time_out), typeof(created_at), typeof(expiry_timestamp)
+            FROM gatepass_requests
+        ''').fetchall()
+        assert types == [('integer', 'integer', 'integer')]
+        # Read back through the TIMESTAMP converter as the same local wall-clock time
+        departure = conn.execute('SELECT date_time_out FROM gatepass_requests WHERE request_id = 1').fetchone()[0]
+        assert departure == timestamps.parse_local('2030-01-15T10:00')
+    finally:
+        conn.close()
+
+
+def test_derived_tables_are_backfilled(v0_db):
+    conn = pooled()
+    cur = conn.cursor()
+    try:
+        migrations.migrate(conn)
+        assert gatepass_counts.check_status_counts(cur) == []
+        assert gatepass_counts.student_counts(cur, 'STU001') == {'all': 2, 'pending': 1, 'history': 1}
+
+        accounts = sum(len(rows) for rows in DEMO_ACCOUNTS.values())
+        cur.execute("SELECT COUNT(*) FROM identities WHERE status = 'active'")
+        assert cur.fetchone()[0] == accounts
+        assert identities.find_identity(cur, 'late@student.edu') == ('student', 'STU007', 'pending')
+
+        # IDs continue past both existing accounts and proposed ones
+        assert user_ids.allocate_user_id(cur, 'student') == 'STU008'
+        assert user_ids.allocate_user_id(cur, 'parent') == 'PAR006'
+    finally:
+        conn.close()
+
+
+def test_shared_email_stops_the_upgrade(v0_db):
+    conn = sqlite3.connect(v0_db)
+    conn.execute("UPDATE wardens SET email = 'rajesh.kumar@gmail.com' WHERE warden_id = 'WAR002'")
+    conn.commit()
+    conn.close()
+
+    conn = pooled()
+    try:
+        with pytest.raises(identities.IdentityConflict) as raised:
+            migrations.migrate(conn)
+        assert raised.value.conflicts == [('rajesh.kumar@gmail.com', [('parent', 'PAR001'), ('warden', 'WAR002')])]
+        # Everything before the identities migration stays applied
+        assert migrations.get_schema_version(conn.cursor()) == 5
+    finally:
+        conn.close()
+
+
+def test_unparseable_timestamps_are_counted_and_kept(v0_db, capsys):
+    conn = sqlite3.connect(v0_db)
+    conn.execute("UPDATE gatepass_requests SET date_time_out = 'next tuesday' WHERE request_id IN (1, 2)")
+    conn.commit()
+    conn.close()
+
+    conn = pooled()
+    try:
+        migrations.migrate(conn)
+        assert 'Left 2 unparseable timestamp values as text (date_time_out: 2)' in capsys.readouterr().out
+        types = conn.execute('SELECT typeof(date_time_out) FROM gatepass_requests ORDER BY request_id').fetchall()
+        assert types == [('text',), ('text',), ('integer',)]
+    finally:
+        conn.close()
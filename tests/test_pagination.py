@@ -0,0 +1,138 @@
+"""
+Pagination Tests for Hostel Gatepass Management System
+Cursor encoding, malformed cursors and keyset paging through the dashboard queries
+"""
+
+import base64
+import json
+from datetime import datetime, timedelta
+
+import pytest
+
+import pagination
+import timestamps
+from models import gatepass_cursor
+from pagination import decode_cursor, encode_cursor, get_page_args, paginate
+
+
+def raw_cursor(value):
+    """A cursor carrying an arbitrary JSON value, as a client could forge"""
+    return base64.urlsafe_b64encode(json.dumps(value).encode()).decode().rstrip('=')
+
+
+def test_cursor_round_trip():
+    assert decode_cursor(encode_cursor(1700000000, 42)) == (1700000000, 42)
+    assert decode_cursor(encode_cursor('text', 7)) == ('text', 7)
+
+
+def test_cursor_carries_datetimes_as_epochs():
+    moment = timestamps.localize(datetime(2030, 1, 15, 10, 0))
+    assert decode_cursor(encode_cursor(moment, 3)) == (timestamps.to_epoch(moment), 3)
+
+
+@pytest.mark.parametrize('cursor', [
+    None,
+    '',
+    'not base64 !!',
+    raw_cursor('just a string'),
+    raw_cursor([1]),
+    raw_cursor([1, 2, 3]),
+    raw_cursor([[1, 2], 5]),
+    raw_cursor([{'a': 1}, 5]),
+    raw_cursor([None, 5]),
+    raw_cursor([True, 5]),
+    raw_cursor([1.5, 5]),
+    raw_cursor([1, 'x']),
+    raw_cursor([1, [5]]),
+])
+def test_malformed_cursor_is_none(cursor):
+    assert decode_cursor(cursor) is None
+
+
+def test_page_args_clamp_page_size():
+    assert get_page_args({'page_size': '0'})[2] == 1
+    assert get_page_args({'page_size': '100000'})[2] == pagination.MAX_PAGE_SIZE
+    assert get_page_args({'page_size': 'abc'})[2] == pagination.DEFAULT_PAGE_SIZE
+    assert get_page_args({'after': raw_cursor([[1, 2], 5])})[0] is None
+
+
+@pytest.fixture
+def gatepasses(conn):
+    """Ten approved gatepasses an hour apart (request_id 1 leaves first)"""
+    start = timestamps.now() + timedelta(days=1)
+    conn.executemany('''
+        INSERT INTO gatepass_requests
+        (student_id, parent_email, date_time_out, duration_hours, destination, purpose, parent_approval_status)
+        VALUES ('STU001', 'rajesh.kumar@gmail.com', ?, 4, 'Goa', 'Trip', 'Approved')
+    ''', [(start + timedelta(hours=i),) for i in range(10)])
+    conn.commit()
+    return conn
+
+
+def page_of(conn, after=None, before=None, page_size=4):
+    cur = gatepass_cursor(conn)
+    page = paginate(cur, "SELECT * FROM gatepass_requests r WHERE r.parent_approval_status = 'Approved'", (),
+                    'r.date_time_out', 'r.request_id', 'date_time_out',
+                    after=after, before=before, page_size=page_size)
+    return page, [row.request_id for row in page.rows]
+
+
+def test_forward_and_back(gatepasses):
+    first, ids = page_of(gatepasses)
+    assert ids == [10, 9, 8, 7]
+    assert first.has_next and not first.has_prev
+
+    second, ids = page_of(gatepasses, after=decode_cursor(first.next_cursor))
+    assert ids == [6, 5, 4, 3]
+    assert second.has_next and second.has_prev
+
+    last, ids = page_of(gatepasses, after=decode_cursor(second.next_cursor))
+    assert ids == [2, 1]
+    assert not last.has_next and last.has_prev
+
+    back, ids = page_of(gatepasses, before=decode_cursor(last.prev_cursor))
+    assert ids == [6, 5, 4, 3]
+    assert back.has_next and back.has_prev
+
+    start, ids = page_of(gatepasses, before=decode_cursor(back.prev_cursor))
+    assert ids == [10, 9, 8, 7]
+    assert start.has_next and not start.has_prev
+
+
+def test_pages_stay_stable_under_inserts(gatepasses):
+    first, _ = page_of(gatepasses)
+    # A newer gatepass arriving between page loads doesn't shift the next page
+    gatepasses.execute('''
+        INSERT INTO gatepass_requests
+        (student_id, parent_email, date_time_out, duration_hours, destination, purpose, parent_approval_status)
+        VALUES ('STU001', 'rajesh.kumar@gmail.com', ?, 4, 'Goa', 'Trip', 'Approved')
+    ''', (timestamps.now() + timedelta(days=30),))
+    gatepasses.commit()
+    _, ids = page_of(gatepasses, after=decode_cursor(first.next_cursor))
+    assert ids == [6, 5, 4, 3]
+
+
+@pytest.mark.parametrize('path, role, user_id', [
+    ('/warden/dashboard', 'warden', 'WAR001'),
+    ('/security/dashboard', 'security', 'SEC001'),
+    ('/student/dashboard', 'student', 'STU001'),
+])
+def test_dashboards_ignore_malformed_cursors(db_path, path, role, user_id):
+    from app import app
+
+    client = app.test_client()
+    client.post('/login', data={'user_id': user_id, 'password': 'college123', 'role': role})
+    for name in ('after', 'before'):
+        response = client.get(path, query_string={name: raw_cursor([[1, 2], 5])})
+        assert response.status_code == 200
+
+
+@pytest.mark.parametrize('filter_type', ['all', 'checkout', 'bogus'])
+def test_security_badge_counts_every_page(db_path, gatepasses, filter_type):
+    from app import app
+
+    client = app.test_client()
+    client.post('/login', data={'user_id': 'SEC001', 'password': 'college123', 'role': 'security'})
+    response = client.get(f'/security/dashboard/{filter_type}', query_string={'page_size': 4})
+    assert response.status_code == 200
+    assert b'10 requests</span>' in response.data
@@ -0,0 +1,79 @@
+"""
+Pass Token Tests for Hostel Gatepass Management System
+Signing and verifying the QR pass tokens, and the scanner endpoint's handling of bad input
+"""
+
+from datetime import timedelta
+
+import pytest
+
+import pass_tokens
+import timestamps
+
+
+SECRET = 'test-secret'
+
+
+def test_round_trip():
+    token = pass_tokens.make_pass_token(1234, SECRET)
+    assert token.startswith('GP1234.')
+    assert pass_tokens.verify_pass_token(token, SECRET) == 1234
+
+
+def test_scanner_noise_is_tolerated():
+    token = pass_tokens.make_pass_token(7, SECRET)
+    assert pass_tokens.verify_pass_token(f'  {token.lower()}\n', SECRET) == 7
+
+
+def test_other_key_rejected():
+    token = pass_tokens.make_pass_token(7, SECRET)
+    assert pass_tokens.verify_pass_token(token, 'other-secret') is None
+
+
+def test_signature_does_not_transfer_between_passes():
+    signature = pass_tokens.make_pass_token(7, SECRET).split('.')[1]
+    assert pass_tokens.verify_pass_token(f'GP8.{signature}', SECRET) is None
+
+
+@pytest.mark.parametrize('token', [None, '', 'GP', 'GP12', 'GP12.', 'XX12.ABCDEF', 'GP12.abc!', 5, ['GP1.A'], {}])
+def test_malformed_tokens_rejected(token):
+    assert pass_tokens.verify_pass_token(token, SECRET) is None
+
+
+@pytest.fixture
+def guard(db_path):
+    from app import app
+
+    client = app.test_client()
+    client.post('/login', data={'user_id': 'SEC001', 'password': 'college123', 'role': 'security'})
+    return client
+
+
+@pytest.mark.parametrize('body', [[1, 2], {'token': 5}, {}, 'GP1.ABC', None])
+def test_scan_rejects_malformed_payloads(guard, body):
+    response = guard.post('/security/scan/checkout', json=body)
+    assert response.status_code == 400
+    assert response.json['success'] is False
+
+
+def test_scan_checks_out_once(guard, conn):
+    conn.execute('''
+        INSERT INTO gatepass_requests
+        (student_id, parent_email, date_time_out, duration_hours, destination, purpose, parent_approval_status)
+        VALUES ('STU001', 'rajesh.kumar@gmail.com', ?, 4, 'Goa', 'Trip', 'Approved')
+    ''', (timestamps.now() + timedelta(days=1),))
+    conn.commit()
+    token = pass_tokens.make_pass_token(1)
+
+    first = guard.post('/security/scan/checkout', json={'token': token})
+    assert first.status_code == 200 and first.json['status'] == 'Out'
+    again = guard.post('/security/scan/checkout', json={'token': token})
+    assert again.status_code == 409
+    assert guard.post('/security/scan/checkout', json={'token': 'GP1.AAAAAAAAAAAAAAAA'}).status_code == 400
+
+
+def test_scan_requires_security_login(db_path):
+    from app import app
+
+    response = app.test_client().post('/security/scan/checkout', json={'token': 'GP1.AAAA'})
+    assert response.status_code == 403
@@ -0,0 +1,227 @@
+"""
+Repository Parity Tests for Hostel Gatepass Management System
+The same filter, pagination, transition and registration cases against every storage backend
+"""
+
+from datetime import timedelta
+
+import pytest
+
+import repository
+import timestamps
+from pagination import decode_cursor
+
+
+PARENT_EMAIL = 'rajesh.kumar@gmail.com'
+
+# Gatepasses 1-12 for STU001 after add_gatepasses(): 1-8 approved (1-2 closed
+# by the warden, 3 checked out and back in, 4-5 out), 9 rejected, 10-12 pending
+EXPECTED = {
+    ('warden', 'all'): [8, 7, 6, 5, 4, 3, 2, 1],
+    ('warden', 'pending'): [8, 7, 6, 5, 4, 3],
+    ('warden', 'history'): [2, 1],
+    ('security', 'all'): [8, 7, 6, 5, 4, 3, 2, 1],
+    ('security', 'checkout'): [8, 7, 6, 2, 1],
+    ('security', 'checkin'): [5, 4],
+    ('security', 'completed'): [3],
+    ('student', 'all'): [12, 11, 10, 9, 8, 7, 6, 5, 4, 3, 2, 1],
+    ('student', 'pending'): [12, 11, 10],
+    ('student', 'history'): [9, 8, 7, 6, 5, 4, 3, 2, 1],
+    ('parent', 'all'): [12, 11, 10, 9, 8, 7, 6, 5, 4, 3, 2, 1],
+    ('parent', 'pending'): [12, 11, 10],
+    ('parent', 'history'): [9, 8, 7, 6, 5, 4, 3, 2, 1],
+}
+VIEW_KEYS = {'student': 'STU001', 'parent': PARENT_EMAIL, 'warden': None, 'security': None}
+
+
+def add_gatepasses(store, count=12, now=None):
+    """Create `count` gatepasses for STU001 and move them through the workflow; returns their IDs"""
+    now = now or timestamps.now()
+    request_ids = []
+    for i in range(count):
+        request_ids.append(store.create_gatepass(
+            'STU001', PARENT_EMAIL, now + timedelta(days=1, hours=i), 4, f'Destination {i + 1}', 'Visit',
+            now - timedelta(minutes=count - i), now + timedelta(hours=2)))
+    for request_id in request_ids[:8]:
+        assert store.transition('approve', request_id, PARENT_EMAIL)['success']
+    assert store.transition('reject', request_ids[8], PARENT_EMAIL)['success']
+    for request_id in request_ids[:2]:
+        assert store.transition('close', request_id)['success']
+    for request_id in request_ids[2:5]:
+        assert store.transition('checkout', request_id)['success']
+    assert store.transition('checkin', request_ids[2])['success']
+    return request_ids
+
+
+def listed(store, view, filter_type, **page_args):
+    return [row.request_id for row in
+            store.list_gatepasses(view, VIEW_KEYS[view], filter_type, page_size=50, **page_args).rows]
+
+
+def test_incomplete_backend_fails_when_created():
+    class Incomplete(repository.Repository):
+        name = 'incomplete'
+
+        def get_user(self, role, user_id):
+            return None
+
+    with pytest.raises(TypeError):
+        Incomplete()
+
+
+def test_create_gatepass_returns_sequential_ids(repo):
+    assert add_gatepasses(repo) == list(range(1, 13))
+
+
+@pytest.mark.parametrize('view, filter_type', sorted(EXPECTED))
+def test_dashboard_filters(repo, view, filter_type):
+    add_gatepasses(repo)
+    assert listed(repo, view, filter_type) == EXPECTED[(view, filter_type)]
+
+
+@pytest.mark.parametrize('view', sorted(VIEW_KEYS))
+def test_badge_counts_match_filters(repo, view):
+    add_gatepasses(repo)
+    counts = repo.counts(view, VIEW_KEYS[view])
+    assert counts == {filter_type: len(EXPECTED[(view, filter_type)])
+                      for v, filter_type in EXPECTED if v == view}
+
+
+@pytest.mark.parametrize('view', ['warden', 'student'])
+def test_pagination_forward_and_back(repo, view):
+    add_gatepasses(repo)
+    expected = EXPECTED[(view, 'all')]
+    key = VIEW_KEYS[view]
+
+    pages, after = [], None
+    while True:
+        page = repo.list_gatepasses(view, key, 'all', after=after, page_size=3)
+        pages.append([row.request_id for row in page.rows])
+        if not page.has_next:
+            break
+        after = decode_cursor(page.next_cursor)
+    assert [request_id for rows in pages for request_id in rows] == expected
+    assert pages[0] == expected[:3]
+
+    # Back from the last page, one page at a time
+    before = decode_cursor(page.prev_cursor)
+    for rows in reversed(pages[:-1]):
+        back = repo.list_gatepasses(view, key, 'all', before=before, page_size=3)
+        assert [row.request_id for row in back.rows] == rows
+        before = decode_cursor(back.prev_cursor) if back.has_prev else None
+    assert before is None
+
+
+def test_search_approved(repo):
+    add_gatepasses(repo)
+    assert [row.request_id for row in repo.search_approved('STU001')] == EXPECTED[('warden', 'all')]
+    assert repo.search_approved('STU002') == []
+
+
+def test_transition_conflicts_and_ownership(repo):
+    request_id = repo.create_gatepass('STU001', PARENT_EMAIL, timestamps.now() + timedelta(days=1), 4,
+                                      'Goa', 'Trip', timestamps.now(), timestamps.now() + timedelta(hours=2))
+
+    wrong_parent = repo.transition('approve', request_id, 'sunita.sharma@gmail.com')
+    assert wrong_parent['result'] == 'not_found'
+
+    early = repo.transition('checkout', request_id)
+    assert early['result'] == 'conflict'
+    assert 'parent approval is Pending' in early['error']
+
+    approved = repo.transition('approve', request_id, PARENT_EMAIL)
+    assert approved['success'] and approved['student_name'] == 'Arjun Kumar'
+    again = repo.transition('approve', request_id, PARENT_EMAIL)
+    assert again['result'] == 'conflict' and again['status'] == 'Approved'
+
+    not_out = repo.transition('checkin', request_id)
+    assert not_out['error'] == f'Cannot check in gatepass #{request_id}: student has not checked out'
+
+    # A warden-closed pass can still be used to leave
+    assert repo.transition('close', request_id)['success']
+    assert repo.transition('checkout', request_id)['success']
+    assert repo.transition('checkout', request_id)['result'] == 'conflict'
+    assert repo.transition('checkin', request_id)['success']
+
+    assert repo.transition('approve', 999, PARENT_EMAIL)['result'] == 'not_found'
+
+
+def test_expired_request_cannot_be_approved(repo):
+    now = timestamps.now()
+    request_id = repo.create_gatepass('STU001', PARENT_EMAIL, now + timedelta(days=1), 4, 'Goa', 'Trip',
+                                      now - timedelta(hours=3), now - timedelta(hours=1))
+    result = repo.transition('approve', request_id, PARENT_EMAIL)
+    assert result['success'] is False
+    assert result['result'] == 'conflict'
+
+
+def test_registration_lifecycle(repo):
+    registered = repo.register_user('student', 'New Student', 'new.student@student.edu', '9000000000',
+                                    'secret123', parent_id='PAR001', hostel_block='Block A')
+    assert registered['success']
+    assert registered['proposed_user_id'] == 'STU006'
+
+    duplicate = repo.register_user('student', 'Again', 'new.student@student.edu', '1', 'secret123')
+    assert duplicate == {'success': False, 'error': 'Registration already pending for this email'}
+    taken = repo.register_user('parent', 'Taken', 'rajesh.kumar@gmail.com', '1', 'secret123')
+    assert taken == {'success': False, 'error': 'Email already registered'}
+
+    assert repo.pending_registration_count() == 1
+    [pending] = repo.pending_registrations()
+    assert pending['email'] == 'new.student@student.edu'
+
+    approved = repo.approve_registration(pending['registration_id'], 'WAR001')
+    assert approved['success'] and approved['user_id'] == 'STU006'
+    assert repo.approve_registration(pending['registration_id'], 'WAR001')['success'] is False
+    assert repo.get_user('student', 'STU006')[1] == 'New Student'
+    assert repo.student_parent('STU006')[0] == PARENT_EMAIL
+    assert repo.pending_registration_count() == 0
+
+
+def test_rejection_releases_email_for_other_types(repo):
+    registered = repo.register_user('parent', 'Maybe Parent', 'maybe@example.com', '1', 'secret123')
+    assert repo.reject_registration(registered['registration_id'], 'WAR001', 'Unknown')['success']
+    assert repo.pending_registrations() == []
+
+    same_type = repo.register_user('parent', 'Maybe Parent', 'maybe@example.com', '1', 'secret123')
+    assert same_type == {'success': False, 'error': 'A registration with this email was already rejected'}
+    assert repo.register_user('security', 'Maybe Guard', 'maybe@example.com', '1', 'secret123')['success']
+
+
+def test_duplicate_email_skips_the_hash(repo, monkeypatch):
+    assert repo.register_user('parent', 'Maybe Parent', 'maybe@example.com', '1', 'secret123')['success']
+
+    def fail(password):
+        raise AssertionError('hashed a password for a duplicate email')
+
+    monkeypatch.setattr(repository.hashing, 'hash_password', fail)
+    for email in ('maybe@example.com', PARENT_EMAIL):
+        assert repo.register_user('parent', 'Dup', email, '1', 'secret123')['success'] is False
+
+
+def test_active_parent_by_email(repo):
+    assert repo.active_parent_by_email(PARENT_EMAIL) == ('PAR001', 'Rajesh Kumar')
+    assert repo.active_parent_by_email('nobody@example.com') is None
+
+
+def test_backends_agree(db_path):
+    """Both backends fed the same writes list the same rows with the same statuses"""
+    stores = [repository.SqliteRepository(), repository.MemoryRepository()]
+    stores[1].load_demo()
+    now = timestamps.now()
+    for store in stores:
+        add_gatepasses(store, now=now)
+
+    def snapshot(store):
+        views = {}
+        for view, filter_type in EXPECTED:
+            page = store.list_gatepasses(view, VIEW_KEYS[view], filter_type, page_size=50)
+            views[(view, filter_type)] = [
+                (row.request_id, row.student_name, row.destination, row.parent_approval_status,
+                 row.warden_status, row.security_guard_status, timestamps.to_epoch(row.date_time_out))
+                for row in page.rows
+            ]
+        counts = {view: store.counts(view, key) for view, key in VIEW_KEYS.items()}
+        return views, counts
+
+    assert snapshot(stores[0]) == snapshot(stores[1])
@@ -0,0 +1,90 @@
+"""
+Timestamp Handling for Hostel Gatepass Management System
+Integer Unix epochs in the database, timezone-aware datetimes in Python
+"""
+
+import os
+import sqlite3
+from datetime import datetime, timezone
+
+
+def _load_timezone():
+    # GATEPASS_TIMEZONE (e.g. 'Asia/Kolkata') names the zone that naive
+    # datetimes and browser form values are in; default is the server's zone
+    name = os.environ.get('GATEPASS_TIMEZONE')
+    if name:
+        try:
+            from zoneinfo import ZoneInfo
+            return ZoneInfo(name)
+        except Exception:
+            print(f"Unknown GATEPASS_TIMEZONE '{name}', using the server's local time zone")
+    return datetime.now().astimezone().tzinfo
+
+
+LOCAL_TZ = _load_timezone()
+
+
+def now():
+    """Current time as an aware datetime in LOCAL_TZ"""
+    return datetime.now(LOCAL_TZ)
+
+
+def localize(value):
+    """Attach LOCAL_TZ to a naive datetime; aware datetimes are returned unchanged"""
+    if value.tzinfo is None:
+        return value.replace(tzinfo=LOCAL_TZ)
+    return value
+
+
+def parse_local(text):
+    """
+    Parse an ISO 8601 string such as a datetime-local form value
+
+    Strings without an offset are taken to be in LOCAL_TZ.
+
+    Raises:
+        ValueError: If the text is not a valid ISO 8601 timestamp
+    """
+    return localize(datetime.fromisoformat(text.strip().replace('Z', '+00:00')))
+
+
+def to_epoch(value):
+    """Integer Unix epoch for a datetime, ISO string or epoch (None passes through)"""
+    if value is None:
+        return None
+    if isinstance(value, (int, float)):
+        return int(value)
+    if isinstance(value, str):
+        value = parse_local(value)
+    return int(localize(value).timestamp())
+
+
+def from_epoch(epoch):
+    """Aware datetime in LOCAL_TZ for a Unix epoch"""
+    return datetime.fromtimestamp(int(epoch), timezone.utc).astimezone(LOCAL_TZ)
+
+
+def _convert_timestamp(raw):
+    """
+    Converter for columns declared TIMESTAMP
+
+    Integer epochs become aware datetimes. Text values (column defaults such
+    as CURRENT_TIMESTAMP) become naive datetimes, as with sqlite3's own
+    converter, and anything unparseable is returned as a string.
+    """
+    text = raw.decode()
+    if text.lstrip('-').isdigit():
+        return from_epoch(int(text))
+    try:
+        return datetime.fromisoformat(text)
+    except ValueError:
+        return text
+
+
+def register():
+    """Install the datetime adapter and TIMESTAMP converter (module import does this)"""
+    sqlite3.register_adapter(datetime, to_epoch)
+    sqlite3.register_converter('TIMESTAMP', _convert_timestamp)
+
+
+register()
@@ -0,0 +1,108 @@
+"""
+User ID Allocation for Hostel Gatepass Management System
+Per-prefix counters in id_sequences, allocated inside the caller's transaction
+"""
+
+import sys
+
+import db
+
+
+# user_type -> (ID prefix, user table, ID column)
+USER_ID_SOURCES = {
+    'student': ('STU', 'students', 'student_id'),
+    'parent': ('PAR', 'parents', 'parent_id'),
+    'warden': ('WAR', 'wardens', 'warden_id'),
+    'security': ('SEC', 'security_guards', 'guard_id'),
+}
+
+
+def format_user_id(prefix, number):
+    # STU001 ... STU999, then STU1000 onwards
+    return f"{prefix}{number:03d}"
+
+
+def _highest_in_use(cur, prefix, table, id_column):
+    """Largest numeric suffix among existing and proposed IDs with this prefix"""
+    highest = 0
+    for query, params in (
+        (f"SELECT {id_column} FROM {table} WHERE {id_column} LIKE ?", (prefix + '%',)),
+        ("SELECT proposed_user_id FROM pending_registrations WHERE proposed_user_id LIKE ?", (prefix + '%',)),
+    ):
+        cur.execute(query, params)
+        for (user_id,) in cur.fetchall():
+            suffix = user_id[len(prefix):]
+            if suffix.isdigit():
+                highest = max(highest, int(suffix))
+    return highest
+
+
+def install(cur):
+    """
+    Create id_sequences and bring every counter up to the highest ID in use
+
+    Idempotent: counters are only ever raised, never lowered, so running it
+    again (or against a database with hand-inserted users) is safe.
+    """
+    cur.execute('''
+        CREATE TABLE IF NOT EXISTS id_sequences (
+            prefix VARCHAR(10) PRIMARY KEY,
+            last_value INTEGER NOT NULL
+        )
+    ''')
+    for prefix, table, id_column in USER_ID_SOURCES.values():
+        cur.execute('''
+            INSERT INTO id_sequences (prefix, last_value) VALUES (?, ?)
+            ON CONFLICT (prefix) DO UPDATE SET last_value = MAX(last_value, excluded.last_value)
+        ''', (prefix, _highest_in_use(cur, prefix, table, id_column)))
+
+
+def reserve_user_ids(cur, user_type, count):
+    """
+    Reserve `count` consecutive user IDs
+
+    The counter row is bumped first, which takes SQLite's write lock, so no
+    other connection can allocate until the caller's transaction ends; if
+    that transaction rolls back, the IDs are simply handed out again.
+
+    Args:
+        cur: Cursor inside the caller's (write) transaction
+        user_type: 'student', 'parent', 'warden', or 'security'
+        count: Number of IDs to reserve
+
+    Returns:
+        list: The reserved IDs in ascending order
+
+    Raises:
+        ValueError: For an unknown user type or a non-positive count
+    """
+    if user_type not in USER_ID_SOURCES:
+        raise ValueError(f"Invalid user type: {user_type}")
+    if count < 1:
+        raise ValueError(f"Cannot reserve {count} IDs")
+    prefix = USER_ID_SOURCES[user_type][0]
+
+    cur.execute('UPDATE id_sequences SET last_value = last_value + ? WHERE prefix = ?', (count, prefix))
+    if cur.rowcount == 0:
+        raise ValueError(f"No id_sequences row for {prefix}; run migrations.py")
+    cur.execute('SELECT last_value FROM id_sequences WHERE prefix = ?', (prefix,))
+    last_value = cur.fetchone()[0]
+
+    return [format_user_id(prefix, number) for number in range(last_value - count + 1, last_value + 1)]
+
+
+def allocate_user_id(cur, user_type):
+    """Allocate the next user ID for user_type inside the caller's transaction"""
+    return reserve_user_ids(cur, user_type, 1)[0]
+
+
+if __name__ == '__main__':
+    conn = db.get_db_connection()
+    cur = conn.cursor()
+    if '--sync' in sys.argv:
+        install(cur)
+        conn.commit()
+    cur.execute('SELECT prefix, last_value FROM id_sequences ORDER BY prefix')
+    for prefix, last_value in cur.fetchall():
+        print(f"{prefix}: last issued {format_user_id(prefix, last_value)}")
+    conn.close()
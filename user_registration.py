@@ -6,59 +6,45 @@ Handles new user sign-ups and credential management
 import sqlite3
 import secrets
 import string
-from datetime import datetime, timedelta
-from werkzeug.security import generate_password_hash, check_password_hash
-import os
-import sqlite3
+from datetime import datetime
+
+import db
+import hashing
+import identities
+import user_ids
+from user_cache import invalidate_user
+
+
+# pending_registrations is UNIQUE(user_type, email), so a rejected email can't re-register as the same type
+REJECTED_REGISTRATION_ERROR = 'A registration with this email was already rejected'
+
 
 def get_db_connection():
-    # Use SQLite for easier development setup - same as app.py
-    db_path = os.environ.get('DATABASE_PATH', 'gatepass.db')
-    conn = sqlite3.connect(db_path)
-    conn.row_factory = sqlite3.Row  # Enable column access by name
-    return conn
+    # Shared pool from db.py, with column access by name
+    return db.get_db_connection(row_factory=sqlite3.Row)
 
 
-def generate_user_id(user_type):
-    """Generate a unique user ID based on user type"""
-    conn = get_db_connection()
-    cur = conn.cursor()
-    
-    prefix_map = {
-        'student': 'STU',
-        'parent': 'PAR',
-        'warden': 'WAR',
-        'security': 'SEC'
-    }
-    
-    prefix = prefix_map.get(user_type)
-    if not prefix:
-        raise ValueError(f"Invalid user type: {user_type}")
-    
-    # Get the highest existing ID for this user type
-    table_map = {
-        'student': 'students',
-        'parent': 'parents',
-        'warden': 'wardens',
-        'security': 'security_guards'
-    }
-    
-    table = table_map[user_type]
-    id_column = 'student_id' if user_type == 'student' else \
-                'parent_id' if user_type == 'parent' else \
-                'warden_id' if user_type == 'warden' else 'guard_id'
-    
-    cur.execute(f"SELECT {id_column} FROM {table} ORDER BY {id_column} DESC LIMIT 1")
-    result = cur.fetchone()
+def generate_user_id(user_type, cur=None):
+    """
+    Allocate the next user ID for a user type from id_sequences
+
+    Pass the cursor of the transaction that will use the ID so allocation and
+    insert commit (or roll back) together; without one the ID is allocated
+    and committed on a pooled connection of its own.
     
-    if result:
-        last_id = result[0]
-        number = int(last_id.replace(prefix, '')) + 1
-    else:
-        number = 1
+    Raises:
+        ValueError: For an invalid user type
+    """
+    if cur is not None:
+        return user_ids.allocate_user_id(cur, user_type)
     
-    conn.close()
-    return f"{prefix}{number:03d}"
+    conn = get_db_connection()
+    try:
+        user_id = user_ids.allocate_user_id(conn.cursor(), user_type)
+        conn.commit()
+        return user_id
+    finally:
+        conn.close()
 
 
 def generate_verification_token():
@@ -66,6 +52,27 @@ def generate_verification_token():
     return ''.join(secrets.choice(string.ascii_letters + string.digits) for _ in range(32))
 
 
+def _duplicate_email_error(email, cur=None):
+    """
+    Why an email can't register, from one identities probe
+
+    Returns:
+        str: The error message, or None if the email is free
+    """
+    if cur is None:
+        conn = get_db_connection()
+        try:
+            return _duplicate_email_error(email, conn.cursor())
+        finally:
+            conn.close()
+    identity = identities.find_identity(cur, email)
+    if not identity:
+        return None
+    if identity[2] == 'pending':
+        return 'Registration already pending for this email'
+    return 'Email already registered'
+
+
 def register_new_user(user_type, name, email, phone, password, **kwargs):
     """
     Register a new user (creates a pending registration)
@@ -81,30 +88,29 @@ def register_new_user(user_type, name, email, phone, password, **kwargs):
     Returns:
         dict: Registration details including proposed_user_id and verification_token
     """
+    # Turn duplicates away before paying for the KDF; add_pending below still
+    # catches one that registers between this check and the insert
+    duplicate = _duplicate_email_error(email)
+    if duplicate:
+        return {'success': False, 'error': duplicate}
+    
+    # Hash before taking a pooled connection so the slot isn't held during the KDF
+    try:
+        password_hash = hashing.hash_password(password)
+    except hashing.HashingBusy:
+        return {'success': False, 'error': 'Server is busy, please try again in a moment'}
+    
     conn = get_db_connection()
     cur = conn.cursor()
     
     try:
-        # Check if email already exists in any table
-        for table, email_col in [
-            ('students', 'email'),
-            ('parents', 'email'),
-            ('wardens', 'email'),
-            ('security_guards', 'email')
-        ]:
-            cur.execute(f"SELECT {email_col} FROM {table} WHERE {email_col} = ?", (email,))
-            if cur.fetchone():
-                return {'success': False, 'error': 'Email already registered'}
-        
-        # Check if email exists in pending registrations
-        cur.execute("SELECT email FROM pending_registrations WHERE email = ? AND status = 'pending'", (email,))
-        if cur.fetchone():
-            return {'success': False, 'error': 'Registration already pending for this email'}
+        duplicate = _duplicate_email_error(email, cur)
+        if duplicate:
+            return {'success': False, 'error': duplicate}
         
         # Generate user ID and verification token
-        proposed_user_id = generate_user_id(user_type)
+        proposed_user_id = generate_user_id(user_type, cur)
         verification_token = generate_verification_token()
-        password_hash = generate_password_hash(password)
         
         # Prepare base fields
         fields = {
@@ -152,9 +158,12 @@ def register_new_user(user_type, name, email, phone, password, **kwargs):
             INSERT INTO pending_registrations ({columns})
             VALUES ({placeholders})
         """, values)
+        registration_id = cur.lastrowid
+        
+        # Claims the email; fails if a concurrent registration got there first
+        identities.add_pending(cur, email, user_type, proposed_user_id)
         
         conn.commit()
-        registration_id = cur.lastrowid
         
         return {
             'success': True,
@@ -165,6 +174,173 @@ def register_new_user(user_type, name, email, phone, password, **kwargs):
         }
         
     except sqlite3.IntegrityError as e:
+        if 'identities.email' in str(e):
+            return {'success': False, 'error': 'Email already registered'}
+        if 'pending_registrations.user_type, pending_registrations.email' in str(e):
+            # Pending and approved ones hold an identity, so this one was rejected
+            return {'success': False, 'error': REJECTED_REGISTRATION_ERROR}
+        return {'success': False, 'error': f'Database error: {str(e)}'}
+    finally:
+        conn.close()
+
+
+def _create_account(cur, reg_dict):
+    """Insert the user row (and any parent/student link) for an approved registration"""
+    user_type = reg_dict['user_type']
+    
+    if user_type == 'student':
+        cur.execute("""
+            INSERT INTO students (student_id, name, password_hash, email, phone, 
+                                 hostel_block, room_number, course, year_of_study)
+            VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)
+        """, (
+            reg_dict['proposed_user_id'], reg_dict['name'], reg_dict['password_hash'],
+            reg_dict['email'], reg_dict['phone'], reg_dict['hostel_block'],
+            reg_dict['room_number'], reg_dict['course'], reg_dict['year_of_study']
+        ))
+        
+        # Link with parent if parent_id provided
+        if reg_dict.get('parent_id'):
+            cur.execute("""
+                INSERT INTO student_parent_links (student_id, parent_id)
+                VALUES (?, ?)
+            """, (reg_dict['proposed_user_id'], reg_dict['parent_id']))
+            
+    elif user_type == 'parent':
+        cur.execute("""
+            INSERT INTO parents (parent_id, name, password_hash, email, phone, 
+                                relationship, address)
+            VALUES (?, ?, ?, ?, ?, ?, ?)
+        """, (
+            reg_dict['proposed_user_id'], reg_dict['name'], reg_dict['password_hash'],
+            reg_dict['email'], reg_dict['phone'], reg_dict['relationship'],
+            reg_dict['address']
+        ))
+        
+        # Link with student if student_id provided
+        if reg_dict.get('student_id'):
+            cur.execute("""
+                INSERT INTO student_parent_links (student_id, parent_id)
+                VALUES (?, ?)
+            """, (reg_dict['student_id'], reg_dict['proposed_user_id']))
+            
+    elif user_type == 'warden':
+        cur.execute("""
+            INSERT INTO wardens (warden_id, name, password_hash, email, phone,
+                                hostel_block, designation)
+            VALUES (?, ?, ?, ?, ?, ?, ?)
+        """, (
+            reg_dict['proposed_user_id'], reg_dict['name'], reg_dict['password_hash'],
+            reg_dict['email'], reg_dict['phone'], reg_dict['hostel_block'],
+            reg_dict['designation']
+        ))
+        
+    elif user_type == 'security':
+        cur.execute("""
+            INSERT INTO security_guards (guard_id, name, password_hash, email, phone,
+                                        shift, gate_assigned)
+            VALUES (?, ?, ?, ?, ?, ?, ?)
+        """, (
+            reg_dict['proposed_user_id'], reg_dict['name'], reg_dict['password_hash'],
+            reg_dict['email'], reg_dict['phone'], reg_dict['shift'],
+            reg_dict['gate_assigned']
+        ))
+    
+    identities.activate(cur, reg_dict['email'], user_type, reg_dict['proposed_user_id'])
+
+
+def _fetch_pending(cur, registration_ids):
+    """Pending registrations among registration_ids, keyed by ID"""
+    found = {}
+    for start in range(0, len(registration_ids), 500):
+        batch = registration_ids[start:start + 500]
+        placeholders = ', '.join('?' for _ in batch)
+        cur.execute(f"""
+            SELECT * FROM pending_registrations 
+            WHERE status = 'pending' AND registration_id IN ({placeholders})
+        """, batch)
+        for row in cur.fetchall():
+            found[row['registration_id']] = dict(row)
+    return found
+
+
+def _unique_ids(registration_ids):
+    return list(dict.fromkeys(int(registration_id) for registration_id in registration_ids))
+
+
+def approve_registrations(registration_ids, reviewed_by):
+    """
+    Approve many pending registrations in one transaction
+    
+    Each registration gets its own savepoint, so one that fails (e.g. a
+    parent link to a missing student) is skipped without undoing the rest.
+    
+    Args:
+        registration_ids: IDs of the pending registrations
+        reviewed_by: User ID of the admin/warden approving them
+        
+    Returns:
+        dict: Success status, approved/failed counts and per-ID results
+              ({'registration_id', 'success', 'user_id' or 'error'})
+    """
+    registration_ids = _unique_ids(registration_ids)
+    conn = get_db_connection()
+    cur = conn.cursor()
+    
+    try:
+        # Take the write lock up front so nobody else reviews these meanwhile
+        cur.execute('BEGIN IMMEDIATE')
+        pending = _fetch_pending(cur, registration_ids)
+        now = datetime.now()
+        
+        results, approved, logs = [], [], []
+        for registration_id in registration_ids:
+            reg_dict = pending.get(registration_id)
+            if reg_dict is None:
+                results.append({'registration_id': registration_id, 'success': False,
+                                'error': 'Registration not found or already processed'})
+                continue
+            
+            cur.execute('SAVEPOINT approve_one')
+            try:
+                _create_account(cur, reg_dict)
+            except sqlite3.IntegrityError as e:
+                cur.execute('ROLLBACK TO approve_one')
+                cur.execute('RELEASE approve_one')
+                results.append({'registration_id': registration_id, 'success': False,
+                                'error': f'Database error: {str(e)}'})
+                continue
+            cur.execute('RELEASE approve_one')
+            
+            approved.append(reg_dict)
+            results.append({'registration_id': registration_id, 'success': True,
+                            'user_id': reg_dict['proposed_user_id']})
+            logs.append((reviewed_by, f"Approved registration for {reg_dict['name']} ({reg_dict['proposed_user_id']})"))
+        
+        cur.executemany("""
+            UPDATE pending_registrations 
+            SET status = 'approved', reviewed_at = ?, reviewed_by = ?
+            WHERE registration_id = ?
+        """, [(now, reviewed_by, reg_dict['registration_id']) for reg_dict in approved])
+        
+        cur.executemany("""
+            INSERT INTO activity_logs (user_id, user_type, action, description)
+            VALUES (?, 'system', 'registration_approved', ?)
+        """, logs)
+        
+        conn.commit()
+        for reg_dict in approved:
+            invalidate_user(reg_dict['user_type'], reg_dict['proposed_user_id'])
+        
+        return {
+            'success': True,
+            'approved': len(approved),
+            'failed': len(results) - len(approved),
+            'results': results
+        }
+        
+    except sqlite3.Error as e:
+        conn.rollback()
         return {'success': False, 'error': f'Database error: {str(e)}'}
     finally:
         conn.close()
@@ -181,105 +357,74 @@ def approve_registration(registration_id, reviewed_by):
     Returns:
         dict: Success status and message
     """
+    batch = approve_registrations([registration_id], reviewed_by)
+    if not batch['success']:
+        return batch
+    
+    result = batch['results'][0]
+    if not result['success']:
+        return {'success': False, 'error': result['error']}
+    return {
+        'success': True,
+        'user_id': result['user_id'],
+        'message': f"Registration approved. User ID: {result['user_id']}"
+    }
+
+
+def reject_registrations(registration_ids, reviewed_by, reason):
+    """
+    Reject many pending registrations in one transaction
+    
+    Args:
+        registration_ids: IDs of the pending registrations
+        reviewed_by: User ID of the admin/warden rejecting them
+        reason: Reason for rejection, recorded on every registration
+        
+    Returns:
+        dict: Success status, rejected/failed counts and per-ID results
+    """
+    registration_ids = _unique_ids(registration_ids)
     conn = get_db_connection()
     cur = conn.cursor()
     
     try:
-        # Get pending registration details
-        cur.execute("""
-            SELECT * FROM pending_registrations 
-            WHERE registration_id = ? AND status = 'pending'
-        """, (registration_id,))
-        
-        registration = cur.fetchone()
-        if not registration:
-            return {'success': False, 'error': 'Registration not found or already processed'}
+        cur.execute('BEGIN IMMEDIATE')
+        pending = _fetch_pending(cur, registration_ids)
+        now = datetime.now()
+        rejected = [pending[registration_id] for registration_id in registration_ids if registration_id in pending]
         
-        # Convert to dict for easier access
-        reg_dict = dict(registration)
-        user_type = reg_dict['user_type']
-        
-        # Insert into appropriate user table
-        if user_type == 'student':
-            cur.execute("""
-                INSERT INTO students (student_id, name, password_hash, email, phone, 
-                                     hostel_block, room_number, course, year_of_study)
-                VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)
-            """, (
-                reg_dict['proposed_user_id'], reg_dict['name'], reg_dict['password_hash'],
-                reg_dict['email'], reg_dict['phone'], reg_dict['hostel_block'],
-                reg_dict['room_number'], reg_dict['course'], reg_dict['year_of_study']
-            ))
-            
-            # Link with parent if parent_id provided
-            if reg_dict.get('parent_id'):
-                cur.execute("""
-                    INSERT INTO student_parent_links (student_id, parent_id)
-                    VALUES (?, ?)
-                """, (reg_dict['proposed_user_id'], reg_dict['parent_id']))
-                
-        elif user_type == 'parent':
-            cur.execute("""
-                INSERT INTO parents (parent_id, name, password_hash, email, phone, 
-                                    relationship, address)
-                VALUES (?, ?, ?, ?, ?, ?, ?)
-            """, (
-                reg_dict['proposed_user_id'], reg_dict['name'], reg_dict['password_hash'],
-                reg_dict['email'], reg_dict['phone'], reg_dict['relationship'],
-                reg_dict['address']
-            ))
-            
-            # Link with student if student_id provided
-            if reg_dict.get('student_id'):
-                cur.execute("""
-                    INSERT INTO student_parent_links (student_id, parent_id)
-                    VALUES (?, ?)
-                """, (reg_dict['student_id'], reg_dict['proposed_user_id']))
-                
-        elif user_type == 'warden':
-            cur.execute("""
-                INSERT INTO wardens (warden_id, name, password_hash, email, phone,
-                                    hostel_block, designation)
-                VALUES (?, ?, ?, ?, ?, ?, ?)
-            """, (
-                reg_dict['proposed_user_id'], reg_dict['name'], reg_dict['password_hash'],
-                reg_dict['email'], reg_dict['phone'], reg_dict['hostel_block'],
-                reg_dict['designation']
-            ))
-            
-        elif user_type == 'security':
-            cur.execute("""
-                INSERT INTO security_guards (guard_id, name, password_hash, email, phone,
-                                            shift, gate_assigned)
-                VALUES (?, ?, ?, ?, ?, ?, ?)
-            """, (
-                reg_dict['proposed_user_id'], reg_dict['name'], reg_dict['password_hash'],
-                reg_dict['email'], reg_dict['phone'], reg_dict['shift'],
-                reg_dict['gate_assigned']
-            ))
-        
-        # Update registration status
-        cur.execute("""
+        cur.executemany("""
             UPDATE pending_registrations 
-            SET status = 'approved', reviewed_at = ?, reviewed_by = ?
+            SET status = 'rejected', reviewed_at = ?, reviewed_by = ?, rejection_reason = ?
             WHERE registration_id = ?
-        """, (datetime.now(), reviewed_by, registration_id))
+        """, [(now, reviewed_by, reason, reg_dict['registration_id']) for reg_dict in rejected])
         
-        # Log the activity
-        cur.execute("""
+        for reg_dict in rejected:
+            identities.release_pending(cur, reg_dict['email'])
+        
+        cur.executemany("""
             INSERT INTO activity_logs (user_id, user_type, action, description)
-            VALUES (?, 'system', 'registration_approved', ?)
-        """, (reviewed_by, f"Approved registration for {reg_dict['name']} ({reg_dict['proposed_user_id']})"))
+            VALUES (?, 'system', 'registration_rejected', ?)
+        """, [(reviewed_by, f"Rejected registration for {reg_dict['name']} ({reg_dict['proposed_user_id']})")
+              for reg_dict in rejected])
         
         conn.commit()
         
+        results = []
+        for registration_id in registration_ids:
+            if registration_id in pending:
+                results.append({'registration_id': registration_id, 'success': True})
+            else:
+                results.append({'registration_id': registration_id, 'success': False,
+                                'error': 'Registration not found or already processed'})
         return {
             'success': True,
-            'user_id': reg_dict['proposed_user_id'],
-            'message': f"Registration approved. User ID: {reg_dict['proposed_user_id']}"
+            'rejected': len(rejected),
+            'failed': len(results) - len(rejected),
+            'results': results
         }
         
-    except sqlite3.IntegrityError as e:
+    except sqlite3.Error as e:
         conn.rollback()
         return {'success': False, 'error': f'Database error: {str(e)}'}
     finally:
@@ -298,23 +443,59 @@ def reject_registration(registration_id, reviewed_by, reason):
     Returns:
         dict: Success status and message
     """
+    batch = reject_registrations([registration_id], reviewed_by, reason)
+    if not batch['success']:
+        return batch
+    
+    result = batch['results'][0]
+    if not result['success']:
+        return {'success': False, 'error': result['error']}
+    return {'success': True, 'message': 'Registration rejected'}
+
+
+def deactivate_user(user_type, user_id, deactivated_by=None):
+    """
+    Deactivate a user account so it can no longer log in
+    
+    Args:
+        user_type: Type of user (student, parent, warden, security)
+        user_id: ID of the user to deactivate
+        deactivated_by: User ID of the admin/warden deactivating the account
+        
+    Returns:
+        dict: Success status and message
+    """
+    if user_type not in user_ids.USER_ID_SOURCES:
+        return {'success': False, 'error': f'Invalid user type: {user_type}'}
+    _, table, id_column = user_ids.USER_ID_SOURCES[user_type]
+    
     conn = get_db_connection()
     cur = conn.cursor()
     
     try:
-        cur.execute("""
-            UPDATE pending_registrations 
-            SET status = 'rejected', reviewed_at = ?, reviewed_by = ?, rejection_reason = ?
-            WHERE registration_id = ? AND status = 'pending'
-        """, (datetime.now(), reviewed_by, reason, registration_id))
+        cur.execute(f"""
+            UPDATE {table} SET is_active = 0
+            WHERE {id_column} = ? AND is_active = 1
+        """, (user_id,))
         
         if cur.rowcount == 0:
-            return {'success': False, 'error': 'Registration not found or already processed'}
+            return {'success': False, 'error': 'User not found or already inactive'}
+        
+        identities.set_status(cur, user_type, user_id, 'inactive')
+        
+        cur.execute("""
+            INSERT INTO activity_logs (user_id, user_type, action, description)
+            VALUES (?, 'system', 'user_deactivated', ?)
+        """, (deactivated_by, f"Deactivated {user_type} {user_id}"))
         
         conn.commit()
-        return {'success': True, 'message': 'Registration rejected'}
+        # Sessions in this process are logged out on their next request;
+        # other workers drop their cached copy within USER_CACHE_TTL
+        invalidate_user(user_type, user_id)
+        return {'success': True, 'message': f'User {user_id} deactivated'}
         
     except sqlite3.Error as e:
+        conn.rollback()
         return {'success': False, 'error': f'Database error: {str(e)}'}
     finally:
         conn.close()